@@ -1,6 +1,9 @@
 import numpy as np
 import matplotlib.pyplot as plt
-import tpqoa
+
+from backtesting.IndicatorEngine import IndicatorEngine
+from helpers.CandleCache import CandleCache
+from helpers.LagFeatures import LagFeatures
 
 
 class Backtester:
@@ -24,6 +27,11 @@ class Backtester:
 
         self._results = None
 
+        # reusable work arrays of score(), the indicator engine of the dataset's prices and its lag features
+        self._buffers = {}
+        self._engine = None
+        self._return_features = None
+
         self._data = self.acquire_data()
         self._data = self.prepare_data()
 
@@ -36,9 +44,9 @@ class Backtester:
         """
         print("Downloading historical data...")
 
-        oanda = tpqoa.tpqoa("oanda.cfg")
+        cache = CandleCache("oanda.cfg")
 
-        df = oanda.get_history(
+        df = cache.get_history(
             self._instrument, self._start, self._end, self._granularity, "M"
         )
 
@@ -106,12 +114,151 @@ class Backtester:
         """
         pass
 
+    def score(self, *args, **kwargs):
+        """
+        Scores the strategy like test(mute=True) does, but only on numpy views of the dataset:
+        no results dataframe is built and no array the size of the dataset is allocated per call,
+        which makes it the cheap option when sweeping parameters. Takes the same arguments as test().
+
+        Returns:
+            Returns a tuple, (float: performance, float: out_performance)
+            -> "performance" is the percentage of return on the interval [start, end]
+            -> "out_performance" is the performance when compared to a buy & hold on the same interval
+        """
+        positions, first = self._positions(*args, **kwargs)
+        returns = self._data["returns"].values
+
+        strategy = np.dot(positions[first - 1:-1], returns[first:])
+
+        changes = self._buffer("changes")[first + 1:]
+        np.subtract(positions[first + 1:], positions[first:-1], out=changes)
+        trades = np.abs(changes, out=changes).sum()
+
+        performance = np.exp(strategy - trades * self._tc)
+        # out_performance is our strats performance vs a buy and hold on the interval
+        out_performance = performance - np.exp(returns[first:].sum())
+
+        return performance, out_performance
+
     def optimize(self):
         """
         Optimizes the strategy on the interval [start,end] which allows for the greatest return.
         """
         pass
 
+    def _positions(self, *args, **kwargs):
+        """
+        Computes the strategy's position on every bar for score(), into a reusable buffer.
+        Implemented by the strategies that support score().
+
+        Returns:
+            Returns a tuple, (numpy array: positions, int: first)
+            -> "positions" holds the position of every bar, valid from first - 1 onwards
+            -> "first" is the first bar with a strategy return, IE the first row test() keeps after dropping NaN values
+        """
+        raise NotImplementedError("This strategy does not support score().")
+
+    def _window_positions(self, window, direction):
+        """
+        Writes direction * sign(price[t] - price[t - window]) into the positions buffer, IE the sign of the rolling
+        mean return over the window, taken on the price change in ticks. Used by the Momentum and Contrarian strategies.
+
+        Args:
+            window (int): Length of lags that drives the position
+            direction (int): 1 to follow the sign (Momentum), -1 to go against it (Contrarian)
+
+        Returns:
+            Returns a tuple, (numpy array: positions, int: first)
+        """
+        prices = self._indicators().scaled_values
+        positions = self._buffer("positions")
+
+        changes = positions[window:]
+        np.subtract(prices[window:], prices[:-window], out=changes)
+        np.sign(changes, out=changes)
+
+        if direction < 0:
+            np.negative(changes, out=changes)
+
+        return positions, window + 1
+
+    def _buffer(self, name, dtype=float):
+        """Returns a reusable array named name, the length of the dataset."""
+        buffer = self._buffers.get(name)
+        if buffer is None or len(buffer) != len(self._data) or buffer.dtype != dtype:
+            buffer = np.empty(len(self._data), dtype=dtype)
+            self._buffers[name] = buffer
+        return buffer
+
+    def _indicators(self):
+        """Returns the IndicatorEngine of the dataset's prices, built on first use."""
+        if self._engine is None:
+            self._engine = IndicatorEngine(self._data["price"].values)
+        return self._engine
+
+    def _lag_features(self):
+        """Returns the LagFeatures of the dataset's returns, built on first use."""
+        if self._return_features is None:
+            self._return_features = LagFeatures(self._data["returns"].values)
+        return self._return_features
+
+    @staticmethod
+    def _evaluate_grid(price, returns, trading_cost, **grid):
+        """
+        Evaluates the strategy for every combination of the grid's parameter values on raw numpy arrays.
+        Implemented by the vectorized strategies, and what ParallelOptimizer runs in its workers.
+
+        Args:
+            price (numpy array): Prices of the instrument
+            returns (numpy array): Log returns of the instrument
+            trading_cost (float): A static trading cost considered when calculating returns
+            grid (list): The values to evaluate for each of the strategy's parameters
+
+        Returns:
+            Returns a Pandas dataframe with one row per combination, holding its parameters,
+            performance, out_performance and trades
+        """
+        raise NotImplementedError("This strategy does not support grid evaluation.")
+
+    @staticmethod
+    def _score_positions(positions, returns, first, trading_cost=0):
+        """
+        Scores one or many position series at once, working on numpy arrays only.
+        Follows the same arithmetic as test(): the strategy return of bar t is position[t-1] * returns[t],
+        minus trading_cost for every unit the position changes by.
+
+        Args:
+            positions (numpy array): Positions of shape (bars,) or (bars, strategies)
+            returns (numpy array): Log returns of shape (bars,)
+            first (int or numpy array): First bar (per strategy) that has a strategy return, IE the first
+                row remaining after test() drops its NaN values
+            trading_cost (float) <DEFAULT = 0.00>: A static trading cost considered when calculating returns
+
+        Returns:
+            Returns a tuple of numpy arrays, (performance, out_performance, trades), one entry per strategy
+        """
+        positions = np.asarray(positions, dtype=float)
+        if positions.ndim == 1:
+            positions = positions[:, None]
+
+        bars = len(returns)
+        first = np.broadcast_to(np.asarray(first), (positions.shape[1],))
+        bar = np.arange(1, bars)[:, None]
+
+        with np.errstate(invalid="ignore"):
+            strategy = np.where(bar >= first, positions[:-1] * returns[1:, None], 0).sum(axis=0)
+            trades = np.where(bar > first, np.abs(np.diff(positions, axis=0)), 0).sum(axis=0)
+
+        # buy and hold over the same bars
+        cumulative_returns = np.concatenate(([0.0], np.cumsum(np.nan_to_num(returns))))
+        buy_and_hold = cumulative_returns[bars] - cumulative_returns[first]
+
+        performance = np.exp(strategy - trades * trading_cost)
+        out_performance = performance - np.exp(buy_and_hold)
+
+        # positions move in whole units, so the trades are counts
+        return performance, out_performance, np.rint(trades).astype(np.int64)
+
     def plot_results(self):
         """
         Plots the results of test() or optimize().
@@ -1,5 +1,8 @@
 import numpy as np
+import pandas as pd
+
 from backtesting.Backtester import Backtester
+from backtesting.IndicatorEngine import IndicatorEngine
 
 
 class BollingerBandsBacktest(Backtester):
@@ -16,7 +19,7 @@ class BollingerBandsBacktest(Backtester):
             start (string): The start date of the testing period
             end (string): The end date of the testing period
             sma (int) <DEFAULT = 20>: Length of sliding average lags
-            deviation (int) <DEFAULT = 2>: Standard deviation multiplier for upper and lower bands
+            deviation (float) <DEFAULT = 2>: Standard deviation multiplier for upper and lower bands
             granularity (string) <DEFAULT = "D">: Length of each candlestick for the respective instrument
             trading_cost (float) <DEFAULT = 0.00>: A static trading cost considered when calculating returns
         """
@@ -57,34 +60,25 @@ class BollingerBandsBacktest(Backtester):
 
         Args:
             sma (int): The new sma
-            deviation (int): The new deviation
+            deviation (float): The new deviation
         """
         if sma is not None:
             self._sma = sma
-            self._data["sma"] = self._data.price.rolling(self._sma).mean()
-
-            # error with python... https://github.com/pandas-dev/pandas/issues/21786 .std() doesnt work
-            self._data["lower"] = (
-                self._data["sma"]
-                - self._data.price.rolling(self._sma).apply(lambda x: np.std(x))
-                * self._deviation
-            )
-            self._data["upper"] = (
-                self._data["sma"]
-                + self._data.price.rolling(self._sma).apply(lambda x: np.std(x))
-                * self._deviation
-            )
-
         if deviation is not None:
             self._deviation = deviation
-            self._data["lower"] = self._data["sma"] - (
-                self._data.price.rolling(self._sma).apply(lambda x: np.std(x))
-                * deviation
-            )
-            self._data["upper"] = self._data["sma"] + (
-                self._data.price.rolling(self._sma).apply(lambda x: np.std(x))
-                * deviation
-            )
+
+        if sma is not None or deviation is not None:
+            engine = self._indicators()
+
+            # population standard deviation, IE np.std (https://github.com/pandas-dev/pandas/issues/21786)
+            mean = engine.rolling_mean(self._sma, scaled=True)
+            std = engine.rolling_std(self._sma, scaled=True)
+
+            # the bands are computed in the engine's units like evaluate_grid() does, so a price sitting exactly on
+            # a band compares the same way in test() and score()
+            self._data["sma"] = engine.unscale(mean)
+            self._data["lower"] = engine.unscale(mean - std * self._deviation)
+            self._data["upper"] = engine.unscale(mean + std * self._deviation)
 
     def test(self, mute=False):
         """
@@ -139,52 +133,191 @@ class BollingerBandsBacktest(Backtester):
 
         return performance, out_performance
 
-    def optimize(self, sma_range=(1, 252), dev_range=(1, 3)):
+    def _positions(self):
+        """
+        Computes the position on every bar for score(), following the same rules as test().
+
+        Returns:
+            Returns a tuple, (numpy array: positions, int: first)
+        """
+        # the first bar test() keeps after dropping NaN values
+        start = max(self._sma - 1, 1)
+
+        price = self._data["price"].values[start:]
+        sma = self._data["sma"].values[start:]
+
+        signals = self._buffer("signals")[start:]
+        flags = self._buffer("flags", dtype=bool)[start:]
+        distance = self._buffer("distance")[start:]
+
+        signals.fill(np.nan)
+
+        with np.errstate(invalid="ignore"):
+            # if price is lower than lower band, indicates oversold, and to go long
+            np.less(price, self._data["lower"].values[start:], out=flags)
+            np.copyto(signals, 1.0, where=flags)
+
+            # if price is higher than upper band, indicates overbought, and to go short
+            np.greater(price, self._data["upper"].values[start:], out=flags)
+            np.copyto(signals, -1.0, where=flags)
+
+            # if we have crossed the sma line, we want to close our current position (be neutral, position=0)
+            np.subtract(price, sma, out=distance)
+            crossing = self._buffer("crossing")[start:]
+            np.multiply(distance[1:], distance[:-1], out=crossing[1:])
+            np.less(crossing[1:], 0, out=flags[1:])
+            flags[0] = False
+            np.copyto(signals, 0.0, where=flags)
+
+        # forward fill, each bar takes the signal of the last bar (up to itself) that had one
+        rows = self._buffer("rows", dtype=np.int64)[start:]
+        rows.fill(1)
+        rows[0] = 0
+        np.cumsum(rows, out=rows)
+        np.isnan(signals, out=flags)
+        np.copyto(rows, 0, where=flags)
+        np.maximum.accumulate(rows, out=rows)
+
+        positions = self._buffer("positions")
+        np.take(signals, rows, out=positions[start:])
+
+        # clean up any NAN values/holiday vacancies
+        np.nan_to_num(positions[start:], copy=False)
+
+        return positions, start + 1
+
+    def evaluate_grid(self, sma_range=(1, 252), dev_range=(1, 3), dev_step=1):
+        """
+        Evaluates every combination of sma and deviation in one vectorized pass.
+
+        Args:
+            sma_range (tuple(int, int)) <DEFAULT = (1,252)>: Range of values for the sma
+            dev_range (tuple(float, float)) <DEFAULT = (1,3)>: Range of values for the deviation
+            dev_step (float) <DEFAULT = 1>: Step between deviations, IE 0.25 for 1, 1.25, 1.5, ...
+
+        Returns:
+            Returns a Pandas dataframe of performances, indexed by sma (rows) and deviation (columns)
+        """
+        results = self._evaluate_grid(
+            self._data["price"].values,
+            self._data["returns"].values,
+            self._tc,
+            sma=range(*sma_range),
+            deviation=np.arange(dev_range[0], dev_range[1], dev_step),
+        )
+
+        return results.pivot(index="sma", columns="deviation", values="performance")
+
+    @staticmethod
+    def _evaluate_grid(price, returns, trading_cost, sma, deviation):
+        """
+        Evaluates the Bollinger Bands strategy for every (sma, deviation) pair on raw numpy arrays.
+        The rolling mean and standard deviation of each sma are computed once, and the deviation
+        multiplier is broadcast against them, so every deviation is scored at once per sma.
+
+        Args:
+            price (numpy array): Prices of the instrument
+            returns (numpy array): Log returns of the instrument
+            trading_cost (float): A static trading cost considered when calculating returns
+            sma (list(int)): Values of the sma
+            deviation (list(float)): Values of the deviation
+
+        Returns:
+            Returns a Pandas dataframe with one row per (sma, deviation) pair
+        """
+        engine = IndicatorEngine(price)
+
+        # the results keep the grid's own values (IE integers), the bands are computed in floats
+        values = np.asarray(deviation)
+        deviation = values.astype(float)
+
+        results = []
+        for window in sma:
+            # the first bar test() keeps after dropping NaN values
+            start = max(window - 1, 1)
+
+            # compared in the engine's own units, where a flat window sits exactly on its mean
+            mean = engine.rolling_mean(window, scaled=True)[start:, None]
+            std = engine.rolling_std(window, scaled=True)[start:, None]
+            prices = engine.scaled_values[start:, None]
+
+            lower = mean - std * deviation
+            upper = mean + std * deviation
+
+            # if price is lower than lower band, indicates oversold, and to go long
+            positions = np.where(prices < lower, 1.0, np.nan)
+            # if price is higher than upper band, indicates overbought, and to go short
+            positions = np.where(prices > upper, -1.0, positions)
+
+            # if we have crossed the sma line, we want to close our current position (be neutral, position=0)
+            distance = (prices - mean)[:, 0]
+            crossed = np.zeros(len(distance), dtype=bool)
+            crossed[1:] = distance[1:] * distance[:-1] < 0
+            positions[crossed] = 0
+
+            positions = np.nan_to_num(BollingerBandsBacktest._forward_fill(positions))
+
+            performance, out_performance, trades = Backtester._score_positions(
+                positions, returns[start:], 1, trading_cost
+            )
+
+            results.append(
+                pd.DataFrame(
+                    {
+                        "sma": window,
+                        "deviation": values,
+                        "performance": performance,
+                        "out_performance": out_performance,
+                        "trades": trades,
+                    }
+                )
+            )
+
+        return pd.concat(results, ignore_index=True)
+
+    @staticmethod
+    def _forward_fill(values):
+        """Forward fills NaN values down each column of a 2D numpy array."""
+        rows = np.where(np.isnan(values), 0, np.arange(len(values))[:, None])
+        np.maximum.accumulate(rows, axis=0, out=rows)
+        return values[rows, np.arange(values.shape[1])]
+
+    def optimize(self, sma_range=(1, 252), dev_range=(1, 3), dev_step=1):
         """
         Optimizes the sma and deviation on the interval [start,end] which allows for the greatest return.
+        Every combination is evaluated in a single vectorized pass, so fractional deviation grids
+        (IE dev_step=0.25) are cheap to sweep.
+
+        Args:
+            sma_range (tuple(int, int)) <DEFAULT = (1,252)>: Range of values for the sma
+            dev_range (tuple(float, float)) <DEFAULT = (1,3)>: Range of values for the deviation
+            dev_step (float) <DEFAULT = 1>: Step between deviations
 
         Returns:
-            Returns a tuple, (float: max_return, int: best_sma, int: best_dev)
+            Returns a tuple, (float: max_return, int: best_sma, int or float: best_dev)
             -> "max_return" is the optimized (maximum) return rate of the instrument on the interval [start,end]
             -> "best_sma" is the optimized global best_sma value that maximizes return
             -> "best_dev" is the optimized global best_dev value that maximizes return
         """
-        ###############################################
-        print("Warning: There is a current issue that will cause this optimization to take a long time.")
-        ###############################################
-
         if sma_range[0] >= sma_range[1] or dev_range[0] >= dev_range[1]:
             print("The ranges must satisfy: (X,Y) -> X < Y")
             return
 
         print("Optimizing strategy...")
 
-        max_return = float("-inf")
-        best_sma = -1
-        best_dev = -1
-        for sma in range(sma_range[0], sma_range[1]):
+        surface = self.evaluate_grid(sma_range, dev_range, dev_step)
 
-            if sma == sma_range[1] / 4:
-                print("25%...")
-            if sma == sma_range[1] / 2:
-                print("50%...")
-            if sma == sma_range[1] / 1.5:
-                print("75%...")
-
-            for dev in range(dev_range[0], dev_range[1]):
-                self.set_params(sma, dev)
-                current_return = self.test(mute=True)[0]
-
-                if current_return > max_return:
-                    max_return = current_return
-                    best_sma = sma
-                    best_dev = dev
+        # first maximum in (sma, deviation) order, the same pair a nested loop would settle on
+        row, column = np.unravel_index(np.nanargmax(surface.values), surface.shape)
+        max_return = surface.values[row, column]
+        best_sma = int(surface.index[row])
+        # in the grid's dtype, IE an int for the default integer deviations
+        best_dev = np.asarray(surface.columns)[column].item()
 
         self.set_params(best_sma, best_dev)
         self.test(mute=True)
 
         print(f"Strategy optimized on interval {self._start} - {self._end}")
-        print(f"Max Return: {round(max_return * 100 - 100, 2) - 100}%, Best SMA: {best_sma} ({self._granularity}), Best Deviation: {best_dev}")
+        print(f"Max Return: {round(max_return * 100 - 100, 2)}%, Best SMA: {best_sma} ({self._granularity}), Best Deviation: {best_dev}")
 
         return max_return, best_sma, best_dev
-
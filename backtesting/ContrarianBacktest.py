@@ -1,6 +1,7 @@
 import numpy as np
 
 from backtesting.Backtester import Backtester
+from backtesting.MomentumBacktest import MomentumBacktest
 
 
 class ContrarianBacktest(Backtester):
@@ -51,7 +52,9 @@ class ContrarianBacktest(Backtester):
 
         data = self._data.copy()
 
-        data["position"] = -np.sign(data["returns"].rolling(window).mean())
+        # the sign of the rolling mean return, taken on the price change in ticks like score() and optimize() do
+        positions, first = self._window_positions(window, direction=-1)
+        data["position"] = np.where(np.arange(len(data)) >= first - 1, positions, np.nan)
         data["strategy"] = data["position"].shift(1) * data["returns"]
 
         data.dropna(inplace=True)
@@ -76,9 +79,59 @@ class ContrarianBacktest(Backtester):
 
         return performance, out_performance
 
+    def _positions(self, window=1):
+        """
+        Computes the position on every bar for score(), against the sign of the price change over the window.
+
+        Args:
+            window (int) <DEFAULT = 1>: Length of lags that drives the position, the stored window if left as 1
+
+        Returns:
+            Returns a tuple, (numpy array: positions, int: first)
+        """
+        if self._window != 1 and window == 1:
+            window = self._window
+
+        return self._window_positions(window, direction=-1)
+
+    def evaluate_windows(self, window_range=(1, 252)):
+        """
+        Evaluates every window in window_range in one vectorized pass.
+
+        Args:
+            window_range (tuple(int, int)) <DEFAULT>=(1,252): Range of values for the sliding window
+
+        Returns:
+            Returns a Pandas dataframe indexed by window, with the performance, out_performance and trades of each
+        """
+        return self._evaluate_grid(
+            self._data["price"].values,
+            self._data["returns"].values,
+            self._tc,
+            window=range(*window_range),
+        ).set_index("window")
+
+    @staticmethod
+    def _evaluate_grid(price, returns, trading_cost, window):
+        """
+        Evaluates the Contrarian strategy for every window on raw numpy arrays.
+        This is the Momentum evaluation with every position reversed.
+
+        Args:
+            price (numpy array): Prices of the instrument
+            returns (numpy array): Log returns of the instrument
+            trading_cost (float): A static trading cost considered when calculating returns
+            window (list(int)): Values of the sliding window
+
+        Returns:
+            Returns a Pandas dataframe with one row per window
+        """
+        return MomentumBacktest._evaluate_windows(price, returns, trading_cost, window, direction=-1)
+
     def optimize(self, window_range=(1, 252)):
         """
         Optimizes the lags on the interval [start,end] which allows for the greatest return.
+        Every window is evaluated in a single vectorized pass.
 
         Args:
             window_range (tuple(int, int)) <DEFAULT>=(1,252): Range of values for optimization of sliding lags
@@ -94,23 +147,11 @@ class ContrarianBacktest(Backtester):
 
         print("Optimizing strategy...")
 
-        max_return = float("-inf")
-        best_window = 1
-
-        for window in range(window_range[0], window_range[1]):
-
-            if window == (window_range[1] / 4):
-                print("25%...")
-            if window == (window_range[1] / 2):
-                print("50%...")
-            if window == (window_range[1] / 1.5):
-                print("75%...")
-
-            current_return = self.test(window, mute=True)[0]
+        performance = self.evaluate_windows(window_range)["performance"]
 
-            if current_return > max_return:
-                max_return = current_return
-                best_window = window
+        # first maximum, the same window a loop would settle on
+        best_window = int(performance.idxmax())
+        max_return = performance[best_window]
 
         # save the optimized lags
         self._window = best_window
@@ -119,6 +160,6 @@ class ContrarianBacktest(Backtester):
         self.test(self._window, mute=True)
 
         print(f"Strategy optimized on interval {self._start} - {self._end}")
-        print(f"Max Return: {round(max_return * 100 - 100,2) - 100}%, Best Window: {best_window} ({self._granularity})")
+        print(f"Max Return: {round(max_return * 100 - 100,2)}%, Best Window: {best_window} ({self._granularity})")
 
         return max_return, best_window
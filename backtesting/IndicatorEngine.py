@@ -0,0 +1,165 @@
+import numpy as np
+
+
+class IndicatorEngine:
+
+    """
+    Class computing rolling indicators of a price series for many window lengths at once.
+    The cumulative sums of the series and of its squares are taken a single time, after which the rolling
+    mean and standard deviation of any window are just differences of two of their entries.
+
+    OANDA quotes prices with a fixed number of decimals, so whenever the series lies on such a grid the sums
+    are taken over integer ticks, which keeps them exact: a flat window has a standard deviation of exactly 0
+    and a mean of exactly its price. Otherwise the series is centered and summed as floats.
+    """
+    def __init__(self, values, decimals=None):
+        """
+        Initializes the IndicatorEngine object.
+
+        Args:
+            values (array-like): The series (IE prices) to compute indicators on, must not contain NaN values
+            decimals (int) <DEFAULT = None>: Number of decimals the series is quoted in, detected if None
+        """
+        values = np.asarray(values, dtype=float)
+        self._length = len(values)
+
+        if decimals is None:
+            decimals = self._detect_decimals(values)
+
+        if decimals is not None:
+            self._scale = 10.0 ** decimals
+            self._offset = 0.0
+            self._scaled = np.round(values * self._scale).astype(np.int64)
+
+            # largest window whose window * sum(x^2) still fits in an int64
+            largest = max(int(np.abs(self._scaled).max()), 1)
+            self._max_exact_window = int(np.sqrt(2 ** 62 / largest ** 2))
+        else:
+            # centering keeps the cumulative sums small, which keeps the rounding error of their differences small
+            self._scale = 1.0
+            self._offset = values[0] if len(values) else 0.0
+            self._scaled = values - self._offset
+            self._max_exact_window = 0
+
+        self._sum = self._cumulative(self._scaled)
+        self._sum_squares = None
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def scaled_values(self):
+        """
+        The series in the units indicators are computed in when scaled=True (integer ticks, or centered values).
+        Comparisons against scaled indicators are exact wherever the math is, IE a price equal to its own mean.
+        """
+        return self._scaled
+
+    def unscale(self, values):
+        """
+        Converts values in the units of scaled_values (IE scaled indicators) back to prices.
+        A value equal to a scaled price converts back to exactly that price.
+
+        Args:
+            values (numpy array): Values in the units of scaled_values
+
+        Returns:
+            Returns a numpy array of the same shape, in prices
+        """
+        return values / self._scale + self._offset
+
+    def rolling_mean(self, windows, scaled=False):
+        """
+        Computes the rolling mean for one or many window lengths.
+
+        Args:
+            windows (int or list(int)): The window length(s)
+            scaled (bool) <DEFAULT = False>: Returns the means in the units of scaled_values instead of prices
+
+        Returns:
+            Returns a numpy array of shape (len(values),) for a single window, or (len(values), len(windows))
+            otherwise, with NaN where fewer than window values are available (like Pandas' rolling().mean())
+        """
+        single = np.ndim(windows) == 0
+        windows = np.atleast_1d(windows).astype(int)
+
+        out = np.full((self._length, len(windows)), np.nan)
+
+        for column, window in enumerate(windows):
+            if 0 < window <= self._length:
+                out[window - 1:, column] = self._window_sum(self._sum, window) / window
+
+        if not scaled:
+            out = self.unscale(out)
+
+        return out[:, 0] if single else out
+
+    def rolling_std(self, windows, ddof=0, scaled=False):
+        """
+        Computes the rolling standard deviation for one or many window lengths.
+
+        Args:
+            windows (int or list(int)): The window length(s)
+            ddof (int) <DEFAULT = 0>: Delta degrees of freedom, 0 matches np.std and 1 matches Pandas' rolling().std()
+            scaled (bool) <DEFAULT = False>: Returns the deviations in the units of scaled_values instead of prices
+
+        Returns:
+            Returns a numpy array of shape (len(values),) for a single window, or (len(values), len(windows))
+            otherwise, with NaN where fewer than window values are available
+        """
+        single = np.ndim(windows) == 0
+        windows = np.atleast_1d(windows).astype(int)
+
+        # only needed by the standard deviation, so the squares are summed on first use
+        if self._sum_squares is None:
+            self._sum_squares = self._cumulative(self._scaled ** 2)
+
+        out = np.full((self._length, len(windows)), np.nan)
+
+        for column, window in enumerate(windows):
+            if window <= ddof or window > self._length:
+                continue
+
+            total = self._window_sum(self._sum, window)
+            total_squares = self._window_sum(self._sum_squares, window)
+
+            if self._scaled.dtype.kind == "i" and window < self._max_exact_window:
+                # window * sum(x^2) - sum(x)^2 in integers, exact, so a flat window has a deviation of exactly 0
+                spread = (total_squares * window - total ** 2).astype(float)
+            else:
+                # marginally negative at worst through rounding
+                spread = np.clip(total_squares.astype(float) * window - total.astype(float) ** 2, 0, None)
+
+            out[window - 1:, column] = np.sqrt(spread / (window * (window - ddof)))
+
+        if not scaled:
+            out = out / self._scale
+
+        return out[:, 0] if single else out
+
+    @staticmethod
+    def _window_sum(cumulative, window):
+        # differenced in the cumulative sums' own dtype, integer sums stay exact (even if the running total wraps)
+        return cumulative[window:] - cumulative[:-window]
+
+    @staticmethod
+    def _cumulative(values):
+        return np.concatenate((np.zeros(1, dtype=values.dtype), np.cumsum(values)))
+
+    @staticmethod
+    def _detect_decimals(values, max_decimals=8):
+        if not len(values):
+            return None
+
+        for decimals in range(max_decimals + 1):
+            scaled = values * 10.0 ** decimals
+            ticks = np.round(scaled)
+
+            # keeps the squared ticks (and windows of them) well within an int64
+            if np.abs(ticks).max() > 2 ** 20:
+                return None
+
+            if np.all(np.abs(scaled - ticks) < 1e-6):
+                return decimals
+
+        return None
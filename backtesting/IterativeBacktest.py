@@ -1,5 +1,14 @@
+import numpy as np
+
 from backtesting.IterativeBase import IterativeBase
 
+try:
+    from numba import njit
+except ImportError:
+    # numba is optional, without it the kernels run as plain Python loops over the arrays
+    def njit(function):
+        return function
+
 
 class IterativeBacktest(IterativeBase):
 
@@ -30,87 +39,68 @@ class IterativeBacktest(IterativeBase):
         self._position = 0
         self._trades = 0
         self._current_balance = self._initial_balance
-        self.acquire_data()
+        self._journal.clear()
+        # the candles only need to be downloaded once, the indicators of the last test are simply dropped
+        self.restore_data()
 
     # TODO: Make this inheritable by the strategy, make this file more abstract
     def test_sma(self, smas, smal):
-        print(
-            f"Testing SMA strategy on {self._symbol} with smas={smas} and smal={smal}"
-        )
+        if self._verbose:
+            print(
+                f"Testing SMA strategy on {self._instrument} with smas={smas} and smal={smal}"
+            )
 
         self.reset()
 
         self._data["smas"] = self._data.bid_price.rolling(smas).mean()
         self._data["smal"] = self._data.bid_price.rolling(smal).mean()
         self._data.dropna(inplace=True)
+        self.cache_arrays()
 
-        # sma crossover strategy
-        for bar in range(len(self._data) - 1):
-            if self._data["smas"].iloc[bar] > self._data["smal"].iloc[bar]:
-                # go long
-                if self._position in [0, -1]:
-                    # go long with entire balance to switch position
-                    self.go_long(bar, amount="all")
-                    self._position = 1
-            elif self._data["smas"].iloc[bar] < self._data["smal"].iloc[bar]:
-                # go short
-                if self._position in [0, 1]:
-                    # go short with entire balance to switch position
-                    self.go_short(bar, amount="all")
-                    self._position = -1
-
-        self.close_position(bar + 1)
+        # sma crossover strategy, long while smas > smal and short while smas < smal
+        positions = self._hold(
+            np.sign(self._data["smas"].to_numpy() - self._data["smal"].to_numpy())
+        )
+
+        self.execute(positions)
 
     def test_contrarian(self, window=1):
-        print(f"Testing Contrarian strategy on {self._symbol} with window={window}")
+        if self._verbose:
+            print(f"Testing Contrarian strategy on {self._instrument} with window={window}")
 
         self.reset()
 
         # prepares the data
         self._data["rolling_returns"] = self._data["returns"].rolling(window).mean()
         self._data.dropna(inplace=True)
+        self.cache_arrays()
 
-        for bar in range(len(self._data) - 1):
-            if self._data["rolling_returns"].iloc[bar] <= 0:
-                # go long
-                if self._position in [0, -1]:
-                    self.go_long(bar, amount="all")
-                    self._position = 1
-            else:
-                # go short
-                if self._position in [0, 1]:
-                    self.go_short(bar, amount="all")
-                    self._position = -1
+        # long after falling returns, short after rising returns
+        positions = np.where(self._data["rolling_returns"].to_numpy() <= 0, 1, -1)
 
-        self.close_position(bar + 1)
+        self.execute(positions)
 
     def test_momentum(self, window=1):
-        print(f"Testing Momentum strategy on {self._symbol} with window={window}")
+        if self._verbose:
+            print(f"Testing Momentum strategy on {self._instrument} with window={window}")
 
         self.reset()
 
         # prepares the data
         self._data["rolling_returns"] = self._data["returns"].rolling(window).mean()
         self._data.dropna(inplace=True)
+        self.cache_arrays()
 
-        for bar in range(len(self._data) - 1):
-            if self._data["rolling_returns"].iloc[bar] <= 0:
-                # go short
-                if self._position in [0, 1]:
-                    self.go_short(bar, amount="all")
-                    self._position = -1
-            else:
-                # go long
-                if self._position in [0, -1]:
-                    self.go_long(bar, amount="all")
-                    self._position = 1
+        # short after falling returns, long after rising returns
+        positions = np.where(self._data["rolling_returns"].to_numpy() <= 0, -1, 1)
 
-        self.close_position(bar + 1)
+        self.execute(positions)
 
     def test_bollinger_bands(self, sma, std=2):
-        print(
-            f"Testing Bollinger Bands strategy on {self._symbol} with sma={sma}, std={std}"
-        )
+        if self._verbose:
+            print(
+                f"Testing Bollinger Bands strategy on {self._instrument} with sma={sma}, std={std}"
+            )
 
         self.reset()
 
@@ -124,48 +114,99 @@ class IterativeBacktest(IterativeBase):
         )
 
         self._data.dropna(inplace=True)
+        self.cache_arrays()
+
+        positions = self._bollinger_bands_positions(
+            self._data["bid_price"].to_numpy(),
+            self._data["sma"].to_numpy(),
+            self._data["lower"].to_numpy(),
+            self._data["upper"].to_numpy(),
+        )
+
+        self.execute(positions)
+
+    def execute(self, positions):
+        """
+        Trades the strategy's target positions bar by bar, then closes the position on the last bar.
+        The positions are computed up front on numpy arrays, so Python only runs on the bars where they change.
+
+        Args:
+            positions (numpy array): The position wanted after every bar, 1 (long), 0 (neutral) or -1 (short)
+        """
+        # the last bar only closes the position
+        changes = np.flatnonzero(np.diff(positions[:-1], prepend=0))
+
+        for bar in changes.tolist():
+            target = int(positions[bar])
 
-        for bar in range(len(self._data) - 1):
+            if target == 1:
+                # go long with entire balance to switch position
+                self.go_long(bar, amount="all")
+            elif target == -1:
+                # go short with entire balance to switch position
+                self.go_short(bar, amount="all")
+            elif self._position == 1:
+                # go neutral
+                self.sell(bar, units=self._units)
+            else:
+                self.buy(bar, units=-self._units)
+
+            self._position = target
+
+        self.close_position(len(positions) - 1)
+
+    @staticmethod
+    def _hold(signals):
+        """
+        Turns signals of 1, -1 or 0 (no signal) into positions, where a bar without a signal keeps the last one.
+
+        Args:
+            signals (numpy array): The signal of every bar
+
+        Returns:
+            Returns a numpy array with the position after every bar
+        """
+        rows = np.where(signals != 0, np.arange(len(signals)), 0)
+        np.maximum.accumulate(rows, out=rows)
 
-            if self._position == 0:
+        return signals[rows].astype(np.int8)
 
-                if self._data["bid_price"].iloc[bar] < self._data["lower"].iloc[bar]:
+    @staticmethod
+    @njit
+    def _bollinger_bands_positions(price, sma, lower, upper):
+        """
+        Runs the Bollinger Bands state machine over the bars, JIT-compiled when numba is installed.
+
+        Args:
+            price (numpy array): Bid prices
+            sma (numpy array): The moving average of the bid prices
+            lower (numpy array): The lower band
+            upper (numpy array): The upper band
+
+        Returns:
+            Returns a numpy array with the position after every bar
+        """
+        positions = np.zeros(len(price), dtype=np.int8)
+        position = 0
+
+        for bar in range(len(price)):
+            if position == 0:
+                if price[bar] < lower[bar]:
                     # if price is lower than lower band, indicates oversold, and to go long
-                    self.go_long(bar, amount="all")
-                    self._position = 1
-                elif self._data["bid_price"].iloc[bar] > self._data["upper"].iloc[bar]:
+                    position = 1
+                elif price[bar] > upper[bar]:
                     # if price is higher than upper band, indicates overbought, and to go short
-                    self.go_short(bar, amount="all")
-                    self._position = -1
+                    position = -1
 
-            elif self._position == 1:
-                if self._data["bid_price"].iloc[bar] > self._data["sma"].iloc[bar]:
-
-                    # if price crosses upper band, signal to go short
-                    if (
-                        self._data["bid_price"].iloc[bar]
-                        > self._data["upper"].iloc[bar]
-                    ):
-                        self.go_short(bar, amount="all")
-                        self._position = -1
-                    else:
-                        # if price is between sma and upper, just go neutral
-                        self.sell(bar, units=self._units)
-                        self._position = 0
-
-            elif self._position == -1:
-                if self._data["bid_price"].iloc[bar] < self._data["sma"].iloc[bar]:
-
-                    # if price crosses lower band, signal to go long
-                    if (
-                        self._data["bid_price"].iloc[bar]
-                        < self._data["lower"].iloc[bar]
-                    ):
-                        self.go_long(bar, amount="all")
-                        self._position = 1
-                    else:
-                        # if price is between lower and sma, just go neutral
-                        self.buy(bar, units=-self._units)
-                        self._position = 0
-
-        self.close_position(bar + 1)
+            elif position == 1:
+                if price[bar] > sma[bar]:
+                    # if price crosses upper band go short, if it is between sma and upper just go neutral
+                    position = -1 if price[bar] > upper[bar] else 0
+
+            elif price[bar] < sma[bar]:
+                # if price crosses lower band go long, if it is between lower and sma just go neutral
+                position = 1 if price[bar] < lower[bar] else 0
+
+            positions[bar] = position
+
+        return positions
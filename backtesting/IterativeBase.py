@@ -1,13 +1,15 @@
-import tpqoa
 import numpy as np
 import matplotlib.pyplot as plt
 
+from backtesting.TradeJournal import TradeJournal
+from helpers.CandleCache import CandleCache
+
 
 class IterativeBase:
 
     """Class allowing iterative backtesting functionalities"""
     def __init__(
-        self, cfg, instrument, start, end, amount, granularity="D", use_spread=True
+        self, cfg, instrument, start, end, amount, granularity="D", use_spread=True, verbose=1
     ):
         """
         Initializes the IterativeBase object.
@@ -21,6 +23,7 @@ class IterativeBase:
             amount (int): Amount of units to take positions with
             granularity (string) <DEFAULT = "D">: Length of each candlestick for the respective instrument
             use_spread (bool) <DEFAULT = True>: An option to consider trading costs or to neglect them
+            verbose (int) <DEFAULT = 1>: 0 prints nothing, 1 prints a summary of each test, 2 also prints every trade
         """
         self._cfg = cfg
         self._instrument = instrument
@@ -30,22 +33,24 @@ class IterativeBase:
         self._current_balance = amount
         self._granularity = granularity
         self._use_spread = use_spread
+        self._verbose = verbose
 
         self._units = 0
         self._trades = 0
         self._position = 0
 
+        # every trade is recorded here, see get_trades()
+        self._journal = TradeJournal()
+
         self.acquire_data()
 
     def acquire_data(self):
         """A general function to acquire data of an instrument from a source."""
-        oanda = tpqoa.tpqoa(self._cfg)
+        cache = CandleCache(self._cfg)
 
-        bid_df = oanda.get_history(
-            self._instrument, self._start, self._end, self._granularity, "B"
-        )
-        ask_df = oanda.get_history(
-            self._instrument, self._start, self._end, self._granularity, "A"
+        # bid and ask are downloaded concurrently
+        bid_df, ask_df = cache.get_histories(
+            self._instrument, self._start, self._end, self._granularity, ("B", "A")
         )
 
         bid_price = bid_df.c.to_frame()
@@ -64,27 +69,55 @@ class IterativeBase:
 
         df["returns"] = np.log(df.bid_price.div(df.bid_price.shift(1)))
 
-        self._data = df
+        # the downloaded candles are kept as they are, tests work on a copy of them, see restore_data()
+        self._raw_data = df
+        self.restore_data()
+
+    def restore_data(self):
+        """Restores the working data to the downloaded candles, undoing the columns and rows a test added or dropped."""
+        # a shallow copy, columns added to it are not added to the raw data and no values are copied
+        self._data = self._raw_data.copy(deep=False)
+        self.cache_arrays()
+
+    def cache_arrays(self):
+        """
+        Pulls the columns read on every bar out of the dataframe into contiguous numpy arrays.
+        Must be called again whenever rows of the data are dropped, IE after a strategy prepares its indicators.
+        """
+        # round prices to 5 as OANDA only gives 5 decimal places, once for the whole series
+        self._prices = np.round(self._data["bid_price"].to_numpy(dtype=float), 5)
+        self._spreads = np.round(self._data["spread"].to_numpy(dtype=float), 5)
+        self._index = self._data.index
+
+    def get_trades(self):
+        """
+        Getter function to retrieve the trades of the last test.
+
+        Returns:
+            Returns a Pandas dataframe indexed by time, with the bar, side, units, price, spread and
+            balance (after the trade) of every trade
+        """
+        return self._journal.to_frame(self._index)
 
     def bar_info(self, bar):
-        date = str(self._data.index[bar].date())
-        # round price to 5 as OANDA only gives 5 decimal places
-        price = round(self._data.bid_price.iloc[bar], 5)
-        spread = round(self._data.spread.iloc[bar], 5)
+        # the date is only formatted here, when a bar is actually traded or printed
+        date = str(self._index[bar].date())
+        price = self._prices[bar]
+        spread = self._spreads[bar]
 
         return date, price, spread
 
     def print_current_balance(self, bar):
-        date = self.bar_info(bar)
+        date = self.bar_info(bar)[0]
         print(f"{date} | Current Balance: ${round(self._current_balance,2)}")
 
     def print_current_nav(self, bar):
-        date, price = self.bar_info(bar)
+        date, price, _ = self.bar_info(bar)
         nav = self._current_balance + (self._units * price)
         print(f"{date} | Current NAV: ${round(nav,2)}")
 
     def print_current_position_value(self, bar):
-        date, price = self.bar_info(bar)
+        date, price, _ = self.bar_info(bar)
 
         curr_value = self._units * price
         print(f"{date} | Current Position Value: ${round(curr_value,2)}")
@@ -100,15 +133,19 @@ class IterativeBase:
             units = int(amount / price)
 
         if self._current_balance < units * price:
-            print("Not enough balance.")
+            if self._verbose:
+                print("Not enough balance.")
             return
 
         self._current_balance -= units * price
         self._units += units
         self._trades += 1
-        print(
-            f"{date} | Bought {units} units of {self._instrument} @ ${round(price,2)}/unit, total=${round(units*price,2)}"
-        )
+        self._journal.record(bar, 1, units, price, spread, self._current_balance)
+
+        if self._verbose > 1:
+            print(
+                f"{date} | Bought {units} units of {self._instrument} @ ${round(price,2)}/unit, total=${round(units*price,2)}"
+            )
 
     def sell(self, bar, units=None, amount=None):
         date, price, spread = self.bar_info(bar)
@@ -121,32 +158,41 @@ class IterativeBase:
         self._current_balance += units * price
         self._units -= units
         self._trades += 1
-        print(
-            f"{date} | Sold {units} units of {self._instrument} @ ${round(price,2)}/unit, total=${round(units*price,2)}"
-        )
+        self._journal.record(bar, -1, units, price, spread, self._current_balance)
+
+        if self._verbose > 1:
+            print(
+                f"{date} | Sold {units} units of {self._instrument} @ ${round(price,2)}/unit, total=${round(units*price,2)}"
+            )
 
     def close_position(self, bar):
         date, price, spread = self.bar_info(bar)
-        print("=" * 50)
-        print(f"Closing Position ({self._instrument}, {date})")
+        units = self._units
 
-        if self._units > 0:
+        if units > 0:
             # closing long position by selling (bid price)
-            self._current_balance += self._units * price
+            self._current_balance += units * price
+            self._journal.record(bar, -1, units, price, spread, self._current_balance)
         else:
             # closing short position by buying (ask price = bid_price + spread)
-            self._current_balance -= abs(self._units * (price + spread))
+            self._current_balance -= abs(units * (price + spread))
+            if units:
+                self._journal.record(bar, 1, -units, price + spread, spread, self._current_balance)
 
-        print(f"{date} | closed position of {self._units} units @ {price}")
         self._units = 0
         self._trades += 1
         performance = (
             (self._current_balance - self._initial_balance) / self._initial_balance
         ) * 100
-        self.print_current_balance(bar)
-        print(f"Performance %: {round(performance,2)}")
-        print(f"Trades Executed: {self._trades}")
-        print("=" * 50)
+
+        if self._verbose:
+            print("=" * 50)
+            print(f"Closing Position ({self._instrument}, {date})")
+            print(f"{date} | closed position of {units} units @ {price}")
+            self.print_current_balance(bar)
+            print(f"Performance %: {round(performance,2)}")
+            print(f"Trades Executed: {self._trades}")
+            print("=" * 50)
 
     def plot_data(self, columns="bid_price"):
         self._data[columns].plot(figsize=(12, 8), title=self._instrument)
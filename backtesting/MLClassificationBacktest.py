@@ -1,7 +1,109 @@
+import itertools
+import math
+import os
+import time
+import warnings
+from multiprocessing import Pool, RawArray, TimeoutError
+
 import numpy as np
+import pandas as pd
+from sklearn.exceptions import ConvergenceWarning
 from sklearn.linear_model import LogisticRegression
 
 from backtesting.Backtester import Backtester
+from helpers.LagFeatures import LagFeatures
+from helpers.ModelStore import ModelStore
+
+# returns shared with the parent process, attached once per worker by _attach()
+_shared = {}
+
+
+def _attach(returns, length):
+    _shared["features"] = LagFeatures(np.frombuffer(returns, dtype=np.float64, count=length))
+
+
+def _fit_folds(params, lags, folds, warm_start):
+    # fits the folds in order, each one predicting its test rows, optionally starting from the previous coefficients
+    features = _shared["features"]
+    matrix = features.matrix(lags)
+
+    predictions = []
+    model = None
+
+    for train_start, train_stop, test_start, test_stop in folds:
+        train_features, train_returns, _ = features.design(lags, train_start, train_stop)
+        direction = np.sign(train_returns)
+        classes = np.unique(direction)
+
+        if len(classes) < 2:
+            # nothing to learn, every return of the window went the same way
+            predictions.append(np.full(test_stop - test_start, classes[0] if len(classes) else 0.0))
+            continue
+
+        if warm_start and model is not None and np.array_equal(model.classes_, classes):
+            model.set_params(warm_start=True)
+        else:
+            model = LogisticRegression(**params)
+
+        model.fit(train_features, direction)
+
+        predictions.append(model.predict(matrix[test_start - lags:test_stop - lags]))
+
+    return predictions
+
+
+def _evaluate_config(params, lags, train, test, trading_cost):
+    # fits on the train rows and scores the predictions of the test rows, both (start, stop) positions
+    features = _shared["features"]
+
+    train_features, train_returns, _ = features.design(lags, *train)
+    test_features, test_returns, _ = features.design(lags, *test)
+
+    direction = np.sign(train_returns)
+    classes = np.unique(direction)
+
+    start = time.perf_counter()
+    iterations = 0
+
+    if len(classes) < 2:
+        # nothing to learn, every return of the window went the same way
+        prediction = np.full(len(test_returns), classes[0] if len(classes) else 0.0)
+    else:
+        model = LogisticRegression(**params)
+
+        # a fit stopping at max_iter is reported by the converged column instead
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", ConvergenceWarning)
+            model.fit(train_features, direction)
+
+        prediction = model.predict(test_features)
+        iterations = int(np.max(model.n_iter_))
+
+    trades = np.abs(np.diff(prediction)).sum()
+    performance = np.exp(prediction @ test_returns - trades * trading_cost)
+
+    return {
+        "performance": performance,
+        "out_performance": performance - np.exp(test_returns.sum()),
+        "hitratio": np.mean(np.sign(test_returns * prediction) == 1) if len(test_returns) else np.nan,
+        "trades": trades,
+        "iterations": iterations,
+        "converged": iterations < params["max_iter"],
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def _collect(pending, deadline):
+    # waits for the results until the deadline, the tasks not finished by then are None
+    results = []
+
+    for result in pending:
+        try:
+            results.append(result.get(None if deadline is None else max(deadline - time.time(), 0)))
+        except TimeoutError:
+            results.append(None)
+
+    return results
 
 
 class MLClassificationBacktest(Backtester):
@@ -23,6 +125,7 @@ class MLClassificationBacktest(Backtester):
         """
         # low regularization
         self._model = LogisticRegression(C=1e6, max_iter=100000, multi_class="ovr")
+        self._folds = None
 
         # passes params to the parent class
         super().__init__(
@@ -66,9 +169,15 @@ class MLClassificationBacktest(Backtester):
             end (string): The end date to fit model on
         """
         self.prepare_features(start, end)
-        self._model.fit(
-            self._data_subset[self._feature_columns],
+
+        # loaded instead of refitted when the same features were already fitted with the same parameters
+        self._model = ModelStore().fit(
+            LogisticRegression(**self._model.get_params()),
+            self._features,
             np.sign(self._data_subset["returns"]),
+            instrument=self._instrument,
+            granularity=self._granularity,
+            feature_columns=self._feature_columns,
         )
 
     def prepare_features(self, start, end):
@@ -79,16 +188,13 @@ class MLClassificationBacktest(Backtester):
             start (string): The start date to prepare model on
             end (string): The end date to prepare model on
         """
-        self._data_subset = self.split_data(start, end)
-        feature_columns = []
-
-        for lag in range(1, self._lags + 1):
-            self._data_subset[f"lag{lag}"] = self._data_subset["returns"].shift(lag)
-            feature_columns.append(f"lag{lag}")
+        first, last, _ = self._data.index.slice_indexer(start, end).indices(len(self._data))
 
-        self._data_subset.dropna(inplace=True)
+        # the lag1..lagN features of the rows, a view over the returns rather than N shifted columns
+        self._features, _, rows = self._lag_features().design(self._lags, first, last)
 
-        self._feature_columns = feature_columns
+        self._data_subset = self._data.iloc[rows].copy()
+        self._feature_columns = [f"lag{lag}" for lag in range(1, self._lags + 1)]
 
     def test(self, train_ratio=0.7, lags=5):
         """
@@ -117,10 +223,218 @@ class MLClassificationBacktest(Backtester):
         self.prepare_features(split_date, test_end)
 
         # makes predictions on the test set
-        self._data_subset["prediction"] = self._model.predict(
-            self._data_subset[self._feature_columns]
+        self._data_subset["prediction"] = self._model.predict(self._features)
+
+        return self._score_predictions()
+
+    def walk_forward(self, lags=5, train="90D", retrain="7D", window="expanding", processes=None, warm_start=False):
+        """
+        Backtests the model walking forward: it is retrained every retrain period on the data before it, and
+        predicts the period that follows, so every prediction is out of sample. The predictions of all the periods
+        (folds) are stitched into one equity curve. Folds are fitted in parallel across worker processes.
+
+        Args:
+            lags (int) <DEFAULT = 5>: The number of return lags serving as model features
+            train (string) <DEFAULT = "90D">: Length of the first training window, and of every window if rolling
+            retrain (string) <DEFAULT = "7D">: Length of each test period, IE how often the model is retrained
+            window (string) <DEFAULT = "expanding">: "expanding" trains on all the data before each fold,
+                "rolling" only on the train period before it
+            processes (int) <DEFAULT = None>: Number of worker processes, one per core if None
+            warm_start (bool) <DEFAULT = False>: Starts each fit from the previous fold's coefficients. The folds are
+                then split in one run of consecutive folds per process, only the first fold of a run starts cold
+
+        Returns:
+            Returns a tuple, (float: performance, float: out_performance)
+        """
+        if window not in ("expanding", "rolling"):
+            raise ValueError("Please pass a window of either \"expanding\" or \"rolling\".")
+
+        self._lags = lags
+
+        index = self._data.index
+        train = pd.Timedelta(train)
+        retrain = pd.Timedelta(retrain)
+
+        folds = []
+        fold_start = index[0] + train
+        while fold_start <= index[-1]:
+            test_start = index.searchsorted(fold_start)
+            test_stop = index.searchsorted(fold_start + retrain)
+            train_start = 0 if window == "expanding" else index.searchsorted(fold_start - train)
+
+            # the first rows have no lags to predict from
+            test_start = max(test_start, lags + 1)
+
+            if test_stop > test_start:
+                folds.append((train_start, test_start, test_start, test_stop))
+
+            fold_start += retrain
+
+        if not folds:
+            print("Not enough data for a single fold, please pass a shorter train period.")
+            return
+
+        processes = processes or os.cpu_count()
+
+        # consecutive folds per task, a single run per process when warm starting, so only its first fit starts cold
+        parts = min(len(folds), processes if warm_start else processes * 4)
+        tasks = [
+            (self._model.get_params(), lags, [folds[i] for i in part], warm_start)
+            for part in np.array_split(np.arange(len(folds)), parts)
+        ]
+
+        print(f"Walking forward over {len(folds)} folds ({window}) on {processes} processes...")
+
+        returns = RawArray("d", len(self._data))
+        np.frombuffer(returns, dtype=np.float64)[:] = self._data["returns"].values
+
+        with Pool(processes, initializer=_attach, initargs=(returns, len(self._data))) as pool:
+            results = pool.starmap(_fit_folds, tasks)
+
+        rows = np.concatenate([np.arange(test_start, test_stop) for _, _, test_start, test_stop in folds])
+
+        self._data_subset = self._data.iloc[rows].copy()
+        self._data_subset["prediction"] = np.concatenate([prediction for result in results for prediction in result])
+
+        self._folds = pd.DataFrame(
+            [(index[train_start], index[train_stop - 1], index[test_start], index[test_stop - 1])
+             for train_start, train_stop, test_start, test_stop in folds],
+            columns=["train_start", "train_end", "test_start", "test_end"],
+        )
+
+        return self._score_predictions()
+
+    def search(self, lags=(1, 2, 3, 5, 10), C=(0.01, 1, 100, 1e6), solver=("lbfgs", "liblinear"),
+               train_ratio=(0.6, 0.7, 0.8), max_iter=100000, processes=None, budget=None, keep=0.5,
+               screen_iter=100, validation=0.2):
+        """
+        Backtests every combination of the passed hyperparameters like test() does, on a pool of worker processes.
+        Unless keep is 1, the combinations are first screened with cheap fits: each one is fitted in at most
+        screen_iter iterations on the start of its training rows, and scored on the rest of them (never on its test
+        rows). Only the best keep fraction is then fitted in full and tested, the others are marked as pruned.
+
+        Args:
+            lags (list: int) <DEFAULT = (1,2,3,5,10)>: The numbers of return lags serving as model features
+            C (list: float) <DEFAULT = (0.01,1,100,1e6)>: The inverse regularization strengths, IE 1e6 for almost none
+            solver (list: string) <DEFAULT = ("lbfgs","liblinear")>: The LogisticRegression solvers
+            train_ratio (list: float) <DEFAULT = (0.6,0.7,0.8)>: The shares of the dataset used as backtesting set
+            max_iter (int) <DEFAULT = 100000>: Maximum number of iterations of a full fit
+            processes (int) <DEFAULT = None>: Number of worker processes, one per core if None
+            budget (float) <DEFAULT = None>: Time limit of the search in seconds, the combinations not done by then
+                are marked as timeout and their fits are stopped. No limit if None
+            keep (float [0, 1.0]) <DEFAULT = 0.5>: Share of the screened combinations fitted in full, 1 skips screening
+            screen_iter (int) <DEFAULT = 100>: Maximum number of iterations of a screening fit
+            validation (float [0, 1.0]) <DEFAULT = 0.2>: Share of the training rows the screening fits are scored on
+
+        Returns:
+            Returns a Pandas dataframe with one row per combination, holding its hyperparameters, the performance of
+            its screening fit, and the performance, out_performance, hitratio, trades, iterations and fit seconds of
+            its test, ranked from the highest performance down. Its status is "tested", "pruned" or "timeout"
+        """
+        configs = [
+            {"lags": lag, "C": c, "solver": name, "train_ratio": ratio}
+            for lag, c, name, ratio in itertools.product(lags, C, solver, train_ratio)
+        ]
+
+        if not configs:
+            print("Please pass at least one value for every hyperparameter.")
+            return
+
+        length = len(self._data)
+        processes = processes or os.cpu_count()
+        deadline = None if budget is None else time.time() + budget
+
+        def task(config, iterations, train, test):
+            params = dict(self._model.get_params(), C=config["C"], solver=config["solver"], max_iter=iterations)
+            return params, config["lags"], train, test, self._tc
+
+        # the positions test() trains and tests on, its test rows start at the last training row
+        splits = [int(length * config["train_ratio"]) for config in configs]
+
+        print(f"Searching {len(configs)} combinations on {processes} processes...")
+
+        returns = RawArray("d", length)
+        np.frombuffer(returns, dtype=np.float64)[:] = self._data["returns"].values
+
+        with Pool(processes, initializer=_attach, initargs=(returns, length)) as pool:
+            survivors = list(range(len(configs)))
+            screened = [None] * len(configs)
+
+            if keep < 1:
+                pending = []
+                for config, split in zip(configs, splits):
+                    boundary = int(split * (1 - validation))
+                    pending.append(
+                        pool.apply_async(_evaluate_config, task(config, screen_iter, (0, boundary), (boundary, split)))
+                    )
+
+                screened = _collect(pending, deadline)
+
+                # the best of the screened combinations, ties kept in the order they were passed
+                done = [i for i in range(len(configs)) if screened[i] is not None]
+                done.sort(key=lambda i: -screened[i]["performance"])
+                survivors = sorted(done[:max(1, math.ceil(len(done) * keep))])
+
+            pending = [
+                pool.apply_async(_evaluate_config, task(configs[i], max_iter, (0, splits[i]), (splits[i] - 1, length)))
+                for i in survivors
+            ]
+
+            tested = dict(zip(survivors, _collect(pending, deadline)))
+
+            # stops the fits still running once out of time
+            pool.terminate()
+
+        rows = []
+        for i, config in enumerate(configs):
+            result = tested.get(i)
+            status = "tested" if result is not None else "timeout" if screened[i] is None or i in tested else "pruned"
+
+            row = dict(config, screen_performance=screened[i]["performance"] if screened[i] is not None else np.nan)
+            row.update(result or {})
+            row["status"] = status
+            rows.append(row)
+
+        columns = [
+            "lags", "C", "solver", "train_ratio", "screen_performance", "performance", "out_performance",
+            "hitratio", "trades", "iterations", "converged", "seconds", "status",
+        ]
+
+        ranked = (
+            pd.DataFrame(rows, columns=columns)
+            .sort_values("performance", ascending=False, kind="mergesort", na_position="last")
+            .reset_index(drop=True)
         )
 
+        counts = ranked["status"].value_counts()
+        print(f"Tested: {counts.get('tested', 0)}, Pruned: {counts.get('pruned', 0)}, Timeout: {counts.get('timeout', 0)}")
+
+        if counts.get("tested", 0):
+            best = ranked.loc[0]
+            print(f"Max Return: {round(best['performance'] * 100 - 100, 2)}%, Best: lags = {best['lags']}, C = {best['C']}, solver = {best['solver']}, train_ratio = {best['train_ratio']}")
+
+        return ranked
+
+    def set_params(self, **params):
+        """
+        Sets the hyperparameters of the model fitted by test() and walk_forward(), IE those found by search().
+
+        Args:
+            params (object): LogisticRegression parameters, IE C=1, solver="liblinear"
+        """
+        self._model.set_params(**params)
+
+    def get_folds(self):
+        """
+        Getter function to retrieve the folds of the last walk-forward backtest.
+
+        Returns:
+            Returns a Pandas dataframe with the first and last date of every fold's training and test rows
+        """
+        return self._folds
+
+    def _score_predictions(self):
+        # the strategy's returns, trades and performance from the predictions of the test rows in _data_subset
         # strat returns
         self._data_subset["strategy"] = (
             self._data_subset["prediction"] * self._data_subset["returns"]
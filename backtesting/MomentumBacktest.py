@@ -1,6 +1,8 @@
 import numpy as np
+import pandas as pd
 
 from backtesting.Backtester import Backtester
+from backtesting.IndicatorEngine import IndicatorEngine
 
 
 class MomentumBacktest(Backtester):
@@ -58,7 +60,9 @@ class MomentumBacktest(Backtester):
 
         data = self._data.copy()
 
-        data["position"] = np.sign(data["returns"].rolling(window).mean())
+        # the sign of the rolling mean return, taken on the price change in ticks like score() and optimize() do
+        positions, first = self._window_positions(window, direction=1)
+        data["position"] = np.where(np.arange(len(data)) >= first - 1, positions, np.nan)
 
         data["strategy"] = data["position"].shift(1) * data["returns"]
 
@@ -83,9 +87,112 @@ class MomentumBacktest(Backtester):
 
         return performance, out_performance
 
+    def _positions(self, window=1):
+        """
+        Computes the position on every bar for score(), the sign of the price change over the window.
+
+        Args:
+            window (int) <DEFAULT = 1>: Length of lags that drives the position, the stored window if left as 1
+
+        Returns:
+            Returns a tuple, (numpy array: positions, int: first)
+        """
+        if self._window != 1 and window == 1:
+            window = self._window
+
+        return self._window_positions(window, direction=1)
+
+    def evaluate_windows(self, window_range=(1, 252)):
+        """
+        Evaluates every window in window_range in one vectorized pass.
+
+        Args:
+            window_range (tuple(int, int)) <DEFAULT>=(1,252): Range of values for the sliding window
+
+        Returns:
+            Returns a Pandas dataframe indexed by window, with the performance, out_performance and trades of each
+        """
+        return self._evaluate_grid(
+            self._data["price"].values,
+            self._data["returns"].values,
+            self._tc,
+            window=range(*window_range),
+        ).set_index("window")
+
+    @staticmethod
+    def _evaluate_grid(price, returns, trading_cost, window):
+        """
+        Evaluates the Momentum strategy for every window on raw numpy arrays.
+
+        Args:
+            price (numpy array): Prices of the instrument
+            returns (numpy array): Log returns of the instrument
+            trading_cost (float): A static trading cost considered when calculating returns
+            window (list(int)): Values of the sliding window
+
+        Returns:
+            Returns a Pandas dataframe with one row per window
+        """
+        return MomentumBacktest._evaluate_windows(price, returns, trading_cost, window, direction=1)
+
+    @staticmethod
+    def _evaluate_windows(price, returns, trading_cost, windows, direction, block=64):
+        """
+        Scores the sign of the rolling mean return (times direction) as a position, for many windows at once.
+        The rolling sum of log returns telescopes to log(price[t] / price[t - window]), IE a difference of the
+        cumulative returns, so the sign of every window's mean return is the sign of its price change.
+        That difference is taken for a whole block of windows in one (bars x windows) operation.
+
+        Args:
+            price (numpy array): Prices of the instrument
+            returns (numpy array): Log returns of the instrument
+            trading_cost (float): A static trading cost considered when calculating returns
+            windows (list(int)): Values of the sliding window
+            direction (int): 1 to follow the sign (Momentum), -1 to go against it (Contrarian)
+            block (int) <DEFAULT = 64>: Number of windows scored at once, bounds the memory used
+
+        Returns:
+            Returns a Pandas dataframe with one row per window
+        """
+        # integer ticks where possible, so a price that returns to where it was is exactly flat
+        prices = IndicatorEngine(price).scaled_values
+
+        windows = np.asarray(windows)
+        bars = np.arange(len(prices))[:, None]
+
+        results = []
+        for start in range(0, len(windows), block):
+            current = windows[start:start + block]
+
+            lagged = bars - current
+            with np.errstate(invalid="ignore"):
+                positions = np.where(
+                    lagged >= 0,
+                    direction * np.sign(prices[:, None] - prices[np.maximum(lagged, 0)]),
+                    np.nan,
+                )
+
+            performance, out_performance, trades = Backtester._score_positions(
+                positions, returns, current + 1, trading_cost
+            )
+
+            results.append(
+                pd.DataFrame(
+                    {
+                        "window": current,
+                        "performance": performance,
+                        "out_performance": out_performance,
+                        "trades": trades,
+                    }
+                )
+            )
+
+        return pd.concat(results, ignore_index=True)
+
     def optimize(self, window_range=(1, 252)):
         """
         Optimizes the lags on the interval [start,end] which allows for the greatest return.
+        Every window is evaluated in a single vectorized pass.
 
         Args:
             window_range (tuple(int, int)) <DEFAULT>=(1,252): Range of values for optimization of sliding lags
@@ -101,23 +208,11 @@ class MomentumBacktest(Backtester):
 
         print("Optimizing strategy...")
 
-        max_return = float("-inf")
-        best_window = 1
-
-        for window in range(window_range[0], window_range[1]):
-
-            if window == (window_range[1] / 4):
-                print("25%...")
-            if window == (window_range[1] / 2):
-                print("50%...")
-            if window == (window_range[1] / 1.5):
-                print("75%...")
-
-            current_return = self.test(window, mute=True)[0]
+        performance = self.evaluate_windows(window_range)["performance"]
 
-            if current_return > max_return:
-                max_return = current_return
-                best_window = window
+        # first maximum, the same window a loop would settle on
+        best_window = int(performance.idxmax())
+        max_return = performance[best_window]
 
         # save the optimized lags
         self._window = best_window
@@ -1,8 +1,11 @@
 import numpy as np
-import tpqoa
+import pandas as pd
 from sklearn.linear_model import LinearRegression
 
 from backtesting.Backtester import Backtester
+from helpers.CandleCache import CandleCache
+from helpers.LagFeatures import LagFeatures
+from helpers.ModelStore import ModelStore
 
 
 class MultipleRegressionModelPredictor(Backtester):
@@ -46,11 +49,11 @@ class MultipleRegressionModelPredictor(Backtester):
         """
         Sets up the backtest data as well as the forward test data
         """
-        oanda = tpqoa.tpqoa('oanda.cfg')
+        cache = CandleCache("oanda.cfg")
 
         # get data of both periods
-        backtestdf = oanda.get_history(self._instrument, self._startb, self._endb, self._granularity, "M")
-        forwardtestdf = oanda.get_history(self._instrument, self._startf, self._endf, self._granularity, "M")
+        backtestdf = cache.get_history(self._instrument, self._startb, self._endb, self._granularity, "M")
+        forwardtestdf = cache.get_history(self._instrument, self._startf, self._endf, self._granularity, "M")
 
         # only care for the closing price
         backtestdf = backtestdf.c.to_frame()
@@ -61,6 +64,8 @@ class MultipleRegressionModelPredictor(Backtester):
         backtestdf["returns"] = np.log(backtestdf.div(backtestdf.shift(1)))
 
         self._backtest_df = backtestdf
+        # the lag features of each period, shared by prepare_data() and sweep_lags()
+        self._backtest_features = LagFeatures(backtestdf.returns.values)
 
         # only care for the closing price
         forwardtestdf = forwardtestdf.c.to_frame()
@@ -71,37 +76,35 @@ class MultipleRegressionModelPredictor(Backtester):
         forwardtestdf["returns"] = np.log(forwardtestdf.div(forwardtestdf.shift(1)))
 
         self._forwardtest_df = forwardtestdf
+        self._forwardtest_features = LagFeatures(forwardtestdf.returns.values)
 
 
     def prepare_data(self):
         """
         Prepares data for strategy-specific information.
         """
-        backtestdf = self._backtest_df.copy()
-        forwardtestdf = self._forwardtest_df.copy()
-
-        # we have multiple lagging columns (depending on lags length > 1)
-        columns = []
-        for lag in range(1, self._lags + 1):
-            column = f"lag{lag}"
-            backtestdf[column] = backtestdf.returns.shift(lag)
-            forwardtestdf[column] = forwardtestdf.returns.shift(lag)
-            columns.append(column)
-
-        backtestdf.dropna(inplace=True)
-        forwardtestdf.dropna(inplace=True)
-
-        self._lm = LinearRegression(fit_intercept=True)
-
-        # has multiple independent variables
-        self._lm.fit(backtestdf[columns], backtestdf.returns)
-
-        forwardtestdf["prediction"] = self._lm.predict(forwardtestdf[columns].values)
+        # we have multiple lagging columns (depending on lags length > 1), as views over the returns
+        columns = [f"lag{lag}" for lag in range(1, self._lags + 1)]
+
+        backtest_features, backtest_returns, _ = self._backtest_features.design(self._lags)
+        forwardtest_features, _, rows = self._forwardtest_features.design(self._lags)
+
+        # has multiple independent variables, loaded instead of refitted when the backtest range did not change
+        self._lm = ModelStore().fit(
+            LinearRegression(fit_intercept=True),
+            backtest_features,
+            backtest_returns,
+            instrument=self._instrument,
+            granularity=self._granularity,
+            feature_columns=columns,
+        )
 
-        # only interested in the direction of returns, not the magnitude
-        forwardtestdf["prediction"] = np.sign(forwardtestdf["prediction"])
+        # only interested in the direction of returns, not the magnitude, and none for the rows without lags
+        prediction = np.full(len(self._forwardtest_df), np.nan)
+        prediction[rows] = np.sign(self._lm.predict(forwardtest_features))
 
-        self._forwardtest_df = forwardtestdf
+        self._forwardtest_df["prediction"] = prediction
+        forwardtestdf = self._forwardtest_df.iloc[rows]
 
         # stores the number of times we are correct or wrong with the prediction
         self._hits = np.sign(forwardtestdf.returns * forwardtestdf.prediction).value_counts()
@@ -118,6 +121,80 @@ class MultipleRegressionModelPredictor(Backtester):
         print(self._hitratio)
         return self._hitratio
 
+    def sweep_lags(self, lags_range=(1, 11)):
+        """
+        Fits and forward tests the model for every number of lags in lags_range, without refitting from scratch:
+        the products of the lag columns (the Gram matrix) are computed once at the largest lag count, and each
+        smaller model is solved from its leading block, so the whole sweep costs about as much as a single fit.
+        Each model is fitted on the same rows prepare_data() would use for its number of lags.
+
+        Args:
+            lags_range (tuple(int, int)) <DEFAULT = (1,11)>: Range of lag counts to consider, [X,Y)
+
+        Returns:
+            Returns a Pandas dataframe indexed by lags, with the hitratio, performance, out_performance and trades
+            of the forward test of each lag count
+        """
+        if lags_range[0] < 1 or lags_range[0] >= lags_range[1]:
+            print("The range must satisfy: (X,Y) -> 1 <= X < Y")
+            return
+
+        print("Sweeping lags...")
+
+        max_lags = lags_range[1] - 1
+
+        # the target first, so the products of the target and the first k lags are the leading (k+1, k+1) block
+        features, target, rows = self._backtest_features.design(max_lags)
+        design = np.column_stack((target, features))
+
+        gram = design.T @ design
+        sums = design.sum(axis=0)
+        count = len(design)
+
+        returns = self._backtest_df.returns.values
+        results = []
+
+        for lags in range(max_lags, lags_range[0] - 1, -1):
+            if lags < max_lags:
+                # one lag less makes one more row usable, the one right before the rows of the previous lag count
+                row = rows.start - (max_lags - lags)
+                values = returns[row - np.arange(lags + 1)]
+
+                gram[:lags + 1, :lags + 1] += np.outer(values, values)
+                sums[:lags + 1] += values
+                count += 1
+
+            # centered, like LinearRegression does when fitting the intercept
+            block = gram[:lags + 1, :lags + 1] - np.outer(sums[:lags + 1], sums[:lags + 1]) / count
+
+            coefficients = np.linalg.lstsq(block[1:, 1:], block[1:, 0], rcond=None)[0]
+            intercept = (sums[0] - sums[1:lags + 1] @ coefficients) / count
+
+            forward_features, forward_returns, _ = self._forwardtest_features.design(lags)
+
+            # only interested in the direction of returns, not the magnitude
+            prediction = np.sign(forward_features @ coefficients + intercept)
+
+            trades = np.abs(np.diff(prediction)).sum()
+            performance = np.exp(prediction @ forward_returns - trades * self._tc)
+
+            results.append(
+                {
+                    "lags": lags,
+                    "hitratio": np.mean(np.sign(forward_returns * prediction) == 1),
+                    "performance": performance,
+                    "out_performance": performance - np.exp(forward_returns.sum()),
+                    "trades": trades,
+                }
+            )
+
+        results = pd.DataFrame(results[::-1]).set_index("lags")
+
+        best = results["performance"].idxmax()
+        print(f"Best Return: {round(results.loc[best, 'performance'] * 100 - 100, 2)}%, Best Lags: {best}, Hit Ratio: {round(results.loc[best, 'hitratio'], 4)}")
+
+        return results
+
     def test(self):
         """
         Computes the strategies returns over the forwardtest interval.
@@ -130,7 +207,8 @@ class MultipleRegressionModelPredictor(Backtester):
         """
         print("Testing strategy...")
 
-        data = self._forwardtest_df.copy()
+        # the rows with a prediction
+        data = self._forwardtest_df.dropna().copy()
 
         data["strategy"] = data.prediction * data.returns
 
@@ -0,0 +1,100 @@
+import os
+from multiprocessing import Pool, RawArray
+
+import numpy as np
+import pandas as pd
+
+from backtesting.Backtester import Backtester
+
+# arrays shared with the parent process, attached once per worker by _attach()
+_shared = {}
+
+
+def _attach(price, returns, length):
+    _shared["price"] = np.frombuffer(price, dtype=np.float64, count=length)
+    _shared["returns"] = np.frombuffer(returns, dtype=np.float64, count=length)
+
+
+def _evaluate(strategy, trading_cost, grid):
+    return strategy._evaluate_grid(_shared["price"], _shared["returns"], trading_cost, **grid)
+
+
+class ParallelOptimizer:
+
+    """
+    Class running a vectorized strategy's parameter grid across a pool of worker processes.
+    The price and returns arrays are placed in shared memory once, and every worker attaches to them
+    directly instead of receiving a pickled copy of the dataframe with each task.
+    """
+    def __init__(self, backtester, processes=None, tasks_per_process=4):
+        """
+        Initializes the ParallelOptimizer object.
+
+        Args:
+            backtester (Backtester): A prepared back-tester, IE SMABacktest, BollingerBandsBacktest,
+                MomentumBacktest or ContrarianBacktest
+            processes (int) <DEFAULT = None>: Number of worker processes, one per core if None
+            tasks_per_process (int) <DEFAULT = 4>: The grid is split into processes * tasks_per_process tasks,
+                so a slow task does not leave the other cores idle
+        """
+        self._backtester = backtester
+        self._strategy = type(backtester)
+        self._processes = processes or os.cpu_count()
+        self._tasks_per_process = tasks_per_process
+
+    def __repr__(self):
+        """Custom Representation."""
+        return f"ParallelOptimizer( backtester={self._backtester}, processes={self._processes} )"
+
+    def optimize(self, **grid):
+        """
+        Evaluates every combination of the passed parameter values, partitioned across the worker processes.
+        The parameter names are those of the strategy's grid, IE smas and smal for SMABacktest,
+        sma and deviation for BollingerBandsBacktest, window for MomentumBacktest and ContrarianBacktest.
+
+        Args:
+            grid (list): The values to evaluate for each parameter, IE smas=range(10, 50), smal=range(100, 252)
+
+        Returns:
+            Returns a Pandas dataframe with one row per combination, ranked from the highest performance down
+        """
+        if self._strategy._evaluate_grid is Backtester._evaluate_grid:
+            print(f"{self._strategy.__name__} does not support grid evaluation.")
+            return
+
+        if not grid:
+            print("Please pass the values to optimize over, IE window=range(1, 252).")
+            return
+
+        data = self._backtester.get_data()
+        length = len(data)
+
+        price = RawArray("d", length)
+        returns = RawArray("d", length)
+        np.frombuffer(price, dtype=np.float64)[:] = data["price"].values
+        np.frombuffer(returns, dtype=np.float64)[:] = data["returns"].values
+
+        # split the longest parameter axis, every task still evaluates its share of the grid vectorized
+        grid = {name: np.asarray(values) for name, values in grid.items()}
+        axis = max(grid, key=lambda name: len(grid[name]))
+        parts = min(len(grid[axis]), self._processes * self._tasks_per_process)
+
+        tasks = []
+        for values in np.array_split(grid[axis], parts):
+            tasks.append((self._strategy, self._backtester._tc, dict(grid, **{axis: values})))
+
+        print(f"Optimizing strategy on {self._processes} processes...")
+
+        with Pool(self._processes, initializer=_attach, initargs=(price, returns, length)) as pool:
+            results = pool.starmap(_evaluate, tasks)
+
+        ranked = (
+            pd.concat(results, ignore_index=True)
+            .sort_values("performance", ascending=False, kind="mergesort")
+            .reset_index(drop=True)
+        )
+
+        params = ", ".join(f"{name} = {ranked.loc[0, name]}" for name in grid)
+        print(f"Max Return: {round(ranked.loc[0, 'performance'] * 100 - 100, 2)}%, Best: {params}")
+
+        return ranked
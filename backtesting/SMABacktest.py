@@ -1,6 +1,8 @@
 import numpy as np
+import pandas as pd
 
 from backtesting.Backtester import Backtester
+from backtesting.IndicatorEngine import IndicatorEngine
 
 
 class SMABacktest(Backtester):
@@ -20,6 +22,8 @@ class SMABacktest(Backtester):
         """
         self._smas = smas
         self._smal = smal
+        # the performance of every (smas, smal) pair of the last optimize()
+        self._surface = None
 
         # passes params to the parent class
         super().__init__(
@@ -61,12 +65,14 @@ class SMABacktest(Backtester):
                 print("The smas value must be smaller than the smal value.")
                 return
 
+        engine = self._indicators()
+
         if SMAS is not None:
             self._smas = SMAS
-            self._data["smas"] = self._data["price"].rolling(self._smas).mean()
+            self._data["smas"] = engine.rolling_mean(self._smas)
         if SMAL is not None:
             self._smal = SMAL
-            self._data["smal"] = self._data["price"].rolling(self._smal).mean()
+            self._data["smal"] = engine.rolling_mean(self._smal)
 
     def test(self, mute=False):
         """
@@ -106,48 +112,141 @@ class SMABacktest(Backtester):
 
         return performance, out_performance
 
-    def optimize(self):
+    def _positions(self):
+        """
+        Computes the position on every bar for score(): long while smas > smal, short otherwise.
+
+        Returns:
+            Returns a tuple, (numpy array: positions, int: first)
+        """
+        above = self._buffer("above", dtype=bool)
+        with np.errstate(invalid="ignore"):
+            np.greater(self._data["smas"].values, self._data["smal"].values, out=above)
+
+        positions = self._buffer("positions")
+        np.multiply(above, 2, out=positions)
+        positions -= 1
+
+        return positions, max(self._smas, self._smal, 2) - 1
+
+    def evaluate_grid(self, smas_range=(10, 50), smal_range=(100, 252)):
+        """
+        Evaluates every combination of smas and smal in one vectorized pass.
+
+        Args:
+            smas_range (tuple(int, int)) <DEFAULT = (10,50)>: Range of values for the shorter SMA
+            smal_range (tuple(int, int)) <DEFAULT = (100,252)>: Range of values for the longer SMA
+
+        Returns:
+            Returns a Pandas dataframe of performances, indexed by smas (rows) and smal (columns)
+        """
+        results = self._evaluate_grid(
+            self._data["price"].values,
+            self._data["returns"].values,
+            self._tc,
+            smas=range(*smas_range),
+            smal=range(*smal_range),
+        )
+
+        return results.pivot(index="smas", columns="smal", values="performance")
+
+    @staticmethod
+    def _evaluate_grid(price, returns, trading_cost, smas, smal):
+        """
+        Evaluates the SMA Cross strategy for every (smas, smal) pair on raw numpy arrays.
+        Each rolling mean is taken once from a single cumulative sum, then every smal is scored at once per smas.
+
+        Args:
+            price (numpy array): Prices of the instrument
+            returns (numpy array): Log returns of the instrument
+            trading_cost (float): A static trading cost considered when calculating returns
+            smas (list(int)): Values of the shorter SMA
+            smal (list(int)): Values of the longer SMA
+
+        Returns:
+            Returns a Pandas dataframe with one row per (smas, smal) pair
+        """
+        engine = IndicatorEngine(price)
+
+        smal = np.asarray(smal)
+        long_means = engine.rolling_mean(smal, scaled=True)
+
+        results = []
+        for SMAS in smas:
+            short_mean = engine.rolling_mean(SMAS, scaled=True)
+
+            # like test(), bars without both averages count as short (NaN comparisons are False)
+            with np.errstate(invalid="ignore"):
+                positions = np.where(short_mean[:, None] > long_means, 1, -1)
+
+            first = np.maximum(np.maximum(smal, SMAS) - 1, 1)
+
+            performance, out_performance, trades = Backtester._score_positions(
+                positions, returns, first, trading_cost
+            )
+
+            results.append(
+                pd.DataFrame(
+                    {
+                        "smas": SMAS,
+                        "smal": smal,
+                        "performance": performance,
+                        "out_performance": out_performance,
+                        "trades": trades,
+                    }
+                )
+            )
+
+        return pd.concat(results, ignore_index=True)
+
+    def optimize(self, smas_range=(10, 50), smal_range=(100, 252)):
         """
         Optimizes the smas and smal on the interval [start,end] which allows for the greatest return.
-        This function attempts all combinations of: smas Days [10,50] & smal Days [100,252], so depending on the
-        length of the interval, it can take some time to compute.
+        This function evaluates all combinations of: smas Days [10,50) & smal Days [100,252) by default,
+        in a single vectorized pass over the data.
+
+        Args:
+            smas_range (tuple(int, int)) <DEFAULT = (10,50)>: Range of values for the shorter SMA
+            smal_range (tuple(int, int)) <DEFAULT = (100,252)>: Range of values for the longer SMA
 
         Returns:
-            Returns a tuple, (float: max_return, int: GSMAS, int: GSMAL)
+            Returns a tuple, (float: max_return, int: GSMAS, int: GSMAL, Pandas dataframe: surface)
             -> "max_return" is the optimized (maximum) return rate of the instrument on the interval [start,end]
             -> "GSMAS" is the optimized global smas value that maximizes return
             -> "GSMAL" is the optimized global smal value that maximizes return
+            -> "surface" is the performance of every pair, smas rows and smal columns, also kept by get_surface()
         """
+        if smas_range[0] >= smas_range[1] or smal_range[0] >= smal_range[1]:
+            print("The ranges must satisfy: (X,Y) -> X < Y")
+            return
 
         print("Optimizing strategy...")
 
-        max_return = float("-inf")
-        GSMAS = -1
-        GSMAL = -1
-
-        for SMAS in range(10, 50):
-
-            if SMAS == 13:
-                print("25%...")
-            if SMAS == 25:
-                print("50%...")
-            if SMAS == 38:
-                print("75%...")
-
-            for SMAL in range(100, 252):
-
-                self.set_params(SMAS, SMAL)
-                current_return = self.test(mute=True)[0]
+        surface = self.evaluate_grid(smas_range, smal_range)
 
-                if current_return > max_return:
-                    max_return = current_return
-                    GSMAS = SMAS
-                    GSMAL = SMAL
+        # first maximum in (smas, smal) order, the same pair a nested loop would settle on
+        row, column = np.unravel_index(np.nanargmax(surface.values), surface.shape)
+        max_return = surface.values[row, column]
+        GSMAS = int(surface.index[row])
+        GSMAL = int(surface.columns[column])
 
+        self._surface = surface
         self.set_params(GSMAS, GSMAL)
         self.test(mute=True)
 
         print(f"Strategy optimized on interval {self._start} - {self._end}")
         print(f"Max Return: {round(max_return * 100  - 100, 2)}%, Best SMAS: {GSMAS} ({self._granularity}), Best SMAL: {GSMAL} ({self._granularity})")
 
-        return max_return, GSMAS, GSMAL
+        return max_return, GSMAS, GSMAL, surface
+
+    def get_surface(self):
+        """
+        Getter function to retrieve the performance surface of the last optimize().
+
+        Returns:
+            Returns a Pandas dataframe with the performance of every pair, smas rows and smal columns
+        """
+        if self._surface is not None:
+            return self._surface
+        else:
+            print("Please run .optimize() first.")
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+
+
+class TradeJournal:
+
+    """
+    Class implementing a columnar, in-memory record of the trades of an iterative backtest.
+    Trades are written into preallocated numpy arrays (doubled in size whenever they fill up),
+    so recording a trade costs a few array writes instead of formatting and printing a line.
+    """
+    def __init__(self, capacity=1024):
+        """
+        Initializes the TradeJournal object.
+
+        Args:
+            capacity (int) <DEFAULT = 1024>: Number of trades the arrays initially hold
+        """
+        self._size = 0
+        self._allocate(max(capacity, 1))
+
+    def __repr__(self):
+        """Custom Representation."""
+        return f"TradeJournal( trades={self._size} )"
+
+    def __len__(self):
+        return self._size
+
+    def record(self, bar, side, units, price, spread, balance):
+        """
+        Appends a trade to the journal.
+
+        Args:
+            bar (int): The bar the trade was executed on
+            side (int): 1 for a buy, -1 for a sell
+            units (int): Number of units traded
+            price (float): Price per unit the trade was executed at
+            spread (float): The spread on that bar
+            balance (float): The balance after the trade
+        """
+        if self._size == len(self._bars):
+            self._allocate(2 * len(self._bars))
+
+        i = self._size
+        self._bars[i] = bar
+        self._sides[i] = side
+        self._units[i] = units
+        self._prices[i] = price
+        self._spreads[i] = spread
+        self._balances[i] = balance
+
+        self._size += 1
+
+    def clear(self):
+        """Removes every trade, keeping the allocated arrays."""
+        self._size = 0
+
+    def to_frame(self, index=None):
+        """
+        Builds a dataframe of the recorded trades.
+
+        Args:
+            index (Pandas DatetimeIndex) <DEFAULT = None>: The times of the backtest's bars, used to index the trades
+                by time instead of by bar
+
+        Returns:
+            Returns a Pandas dataframe with the bar, side, units, price, spread and balance of every trade
+        """
+        bars = self._bars[:self._size].copy()
+
+        df = pd.DataFrame(
+            {
+                "bar": bars,
+                "side": np.where(self._sides[:self._size] > 0, "buy", "sell"),
+                "units": self._units[:self._size].copy(),
+                "price": self._prices[:self._size].copy(),
+                "spread": self._spreads[:self._size].copy(),
+                "balance": self._balances[:self._size].copy(),
+            }
+        )
+
+        if index is not None:
+            df.index = index[bars]
+            df.index.name = "time"
+
+        return df
+
+    def _allocate(self, capacity):
+        # copies the recorded trades into arrays of the new capacity
+        columns = {
+            "_bars": np.int64,
+            "_sides": np.int8,
+            "_units": np.int64,
+            "_prices": np.float64,
+            "_spreads": np.float64,
+            "_balances": np.float64,
+        }
+
+        for name, dtype in columns.items():
+            array = np.empty(capacity, dtype=dtype)
+            if self._size:
+                array[:self._size] = getattr(self, name)[:self._size]
+            setattr(self, name, array)
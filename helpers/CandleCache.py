@@ -0,0 +1,220 @@
+import json
+import os
+
+import pandas as pd
+
+from helpers.HistoryDownloader import HistoryDownloader
+
+
+class CandleCache:
+
+    """
+    Class implementing a persistent, on-disk cache of OANDA candle history.
+    Candles are stored in one Parquet file per (instrument, granularity, price) key, alongside a small
+    index of the date ranges already downloaded, so only the missing sub-ranges are ever requested again.
+    Every range is half-open, [start, end): downloads, coverage and the returned candles all stop before end, so
+    the same call returns the same candles whatever else is cached.
+    """
+    def __init__(self, cfg="oanda.cfg", directory=".candle_cache", max_workers=8, verbose=True):
+        """
+        Initializes the CandleCache object.
+
+        Args:
+            cfg (string) <DEFAULT = "oanda.cfg">: Path to the OANDA configuration file
+            directory (string) <DEFAULT = ".candle_cache">: Directory the cached candles are stored in
+            max_workers (int) <DEFAULT = 8>: Maximum number of concurrent requests when filling missing ranges
+            verbose (bool) <DEFAULT = True>: Prints download progress and throughput
+        """
+        self._cfg = cfg
+        self._directory = directory
+        self._downloader = HistoryDownloader(cfg, max_workers=max_workers, verbose=verbose)
+
+        os.makedirs(self._directory, exist_ok=True)
+
+    def __repr__(self):
+        """Custom Representation."""
+        return f"CandleCache( cfg={self._cfg}, directory={self._directory} )"
+
+    def get_history(self, instrument, start, end, granularity, price, localize=True):
+        """
+        Retrieves candles for the instrument, downloading only the parts of [start, end) not already cached.
+        Mirrors the signature and output of tpqoa.get_history.
+
+        Args:
+            instrument (string): A string holding the ticker of instrument to be retrieved
+            start (string or datetime): The start of the period (UTC)
+            end (string or datetime): The end of the period (UTC)
+            granularity (string): Length of each candlestick for the respective instrument
+            price (string): The price component, "B" (bid), "A" (ask) or "M" (mid)
+            localize (bool) <DEFAULT = True>: If False, the returned index is timezone aware (UTC)
+
+        Returns:
+            Returns a Pandas dataframe with the o, h, l, c, volume and complete columns
+        """
+        return self.get_histories(instrument, start, end, granularity, [price], localize)[0]
+
+    def get_histories(self, instrument, start, end, granularity, prices=("B", "A"), localize=True):
+        """
+        Retrieves candles of several price components at once.
+        The missing ranges of every component are downloaded together, so IE bid and ask are fetched concurrently.
+
+        Args:
+            instrument (string): A string holding the ticker of instrument to be retrieved
+            start (string or datetime): The start of the period (UTC)
+            end (string or datetime): The end of the period (UTC)
+            granularity (string): Length of each candlestick for the respective instrument
+            prices (list(string)) <DEFAULT = ("B", "A")>: The price components to retrieve
+            localize (bool) <DEFAULT = True>: If False, the returned indexes are timezone aware (UTC)
+
+        Returns:
+            Returns a list of Pandas dataframes, one per price component, in the same order
+        """
+        start = self._to_timestamp(start)
+        end = self._to_timestamp(end)
+
+        stored = [self._load(self._key(instrument, granularity, price)) for price in prices]
+
+        requests = []
+        for price, (candles, covered) in zip(prices, stored):
+            for missing_start, missing_end in self._missing_ranges(covered, start, end):
+                requests.append((instrument, missing_start, missing_end, granularity, price))
+
+        batches = self._downloader.download(requests) if requests else []
+
+        frames = []
+        for price, (candles, covered) in zip(prices, stored):
+            new = [
+                (request, batch)
+                for request, batch in zip(requests, batches)
+                if request[4] == price
+            ]
+
+            if new:
+                parts = [candles]
+                for (_, missing_start, missing_end, _, _), batch in new:
+                    # never mark the still-forming candle as covered, so it is downloaded again next time
+                    incomplete = batch.index[~batch["complete"].astype(bool)]
+                    if len(incomplete):
+                        missing_end = min(missing_end, incomplete[0])
+
+                    parts.append(batch.drop(incomplete))
+                    covered = self._add_coverage(covered, missing_start, missing_end)
+
+                parts = [part for part in parts if len(part)]
+
+                if parts:
+                    candles = pd.concat(parts)
+                    candles = candles[~candles.index.duplicated(keep="last")].sort_index()
+
+                self._store(self._key(instrument, granularity, price), candles, covered)
+
+            # [start, end), the same range the download and the coverage use
+            df = candles.iloc[candles.index.searchsorted(start):candles.index.searchsorted(end)].copy()
+
+            if not localize:
+                df.index = df.index.tz_localize("UTC")
+
+            frames.append(df)
+
+        return frames
+
+    def clear(self, instrument=None, granularity=None, price=None):
+        """
+        Removes cached candles. Any argument left as None matches every key.
+
+        Args:
+            instrument (string) <DEFAULT = None>: Only remove entries of this instrument
+            granularity (string) <DEFAULT = None>: Only remove entries of this granularity
+            price (string) <DEFAULT = None>: Only remove entries of this price component
+        """
+        for file in os.listdir(self._directory):
+            name, extension = os.path.splitext(file)
+            if extension not in (".parquet", ".json"):
+                continue
+
+            parts = name.rsplit("_", 2)
+            if len(parts) != 3:
+                continue
+
+            if (
+                (instrument is None or parts[0] == instrument)
+                and (granularity is None or parts[1] == granularity)
+                and (price is None or parts[2] == price)
+            ):
+                os.remove(os.path.join(self._directory, file))
+
+    def _key(self, instrument, granularity, price):
+        return f"{instrument}_{granularity}_{price}"
+
+    def _paths(self, key):
+        base = os.path.join(self._directory, key)
+        return f"{base}.parquet", f"{base}.json"
+
+    def _load(self, key):
+        candles_path, index_path = self._paths(key)
+
+        if not os.path.exists(candles_path) or not os.path.exists(index_path):
+            return HistoryDownloader.empty_frame(), []
+
+        candles = pd.read_parquet(candles_path)
+
+        with open(index_path) as f:
+            covered = [(pd.Timestamp(s), pd.Timestamp(e)) for s, e in json.load(f)]
+
+        return candles, covered
+
+    def _store(self, key, candles, covered):
+        candles_path, index_path = self._paths(key)
+
+        candles.to_parquet(candles_path)
+
+        with open(index_path, "w") as f:
+            json.dump([(s.isoformat(), e.isoformat()) for s, e in covered], f)
+
+    @staticmethod
+    def _to_timestamp(value):
+        # everything is stored as timezone naive UTC, the same as tpqoa's localized output
+        timestamp = pd.Timestamp(value)
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.tz_convert("UTC").tz_localize(None)
+        return timestamp.replace(microsecond=0, nanosecond=0)
+
+    @staticmethod
+    def _missing_ranges(covered, start, end):
+        missing = []
+        cursor = start
+
+        for covered_start, covered_end in covered:
+            if covered_end < cursor:
+                continue
+            if covered_start >= end:
+                break
+            if covered_start > cursor:
+                missing.append((cursor, covered_start))
+            cursor = max(cursor, covered_end)
+            if cursor >= end:
+                break
+
+        if cursor < end:
+            missing.append((cursor, end))
+
+        return missing
+
+    @staticmethod
+    def _add_coverage(covered, start, end):
+        # the future can not be covered yet
+        end = min(end, pd.Timestamp.now(tz="UTC").tz_localize(None))
+
+        if end <= start:
+            return covered
+
+        ranges = sorted(covered + [(start, end)])
+        merged = [ranges[0]]
+
+        for range_start, range_end in ranges[1:]:
+            if range_start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], range_end))
+            else:
+                merged.append((range_start, range_end))
+
+        return merged
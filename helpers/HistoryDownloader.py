@@ -0,0 +1,295 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+import tpqoa
+
+
+class HistoryDownloader:
+
+    """
+    Class implementing a chunked, concurrent download of OANDA candle history.
+    A range is split into chunks of at most one OANDA page each, which are fetched from a bounded thread pool
+    (throttled to a maximum request rate) and stitched back together in order. The pool, and the OANDA connection
+    each of its threads opens, is kept for the life of the downloader, see close().
+    """
+    def __init__(
+        self,
+        cfg="oanda.cfg",
+        max_workers=8,
+        candles_per_chunk=500,
+        requests_per_second=50,
+        max_retries=3,
+        verbose=True,
+    ):
+        """
+        Initializes the HistoryDownloader object.
+
+        Args:
+            cfg (string) <DEFAULT = "oanda.cfg">: Path to the OANDA configuration file
+            max_workers (int) <DEFAULT = 8>: Maximum number of concurrent requests
+            candles_per_chunk (int) <DEFAULT = 500>: Candles per request, 500 matches the page size used by tpqoa
+            requests_per_second (float) <DEFAULT = 50>: Maximum rate requests are started at, across all workers
+            max_retries (int) <DEFAULT = 3>: Number of times a failed chunk is retried (with backoff) before giving up
+            verbose (bool) <DEFAULT = True>: Prints progress and throughput while downloading
+        """
+        self._cfg = cfg
+        self._max_workers = max_workers
+        self._candles_per_chunk = candles_per_chunk
+        self._request_interval = 1 / requests_per_second
+        self._max_retries = max_retries
+        self._verbose = verbose
+
+        self._local = threading.local()
+        self._executor = None
+        self._throttle_lock = threading.Lock()
+        self._next_request = 0
+
+        self._report = None
+
+    def __repr__(self):
+        """Custom Representation."""
+        return f"HistoryDownloader( cfg={self._cfg}, max_workers={self._max_workers}, candles_per_chunk={self._candles_per_chunk} )"
+
+    def get_history(self, instrument, start, end, granularity, price, localize=True):
+        """
+        Downloads candles for the instrument on the interval [start, end).
+        Mirrors the signature and output of tpqoa.get_history.
+
+        Args:
+            instrument (string): A string holding the ticker of instrument to be retrieved
+            start (string or datetime): The start of the period (UTC)
+            end (string or datetime): The end of the period (UTC)
+            granularity (string): Length of each candlestick for the respective instrument
+            price (string): The price component, "B" (bid), "A" (ask) or "M" (mid)
+            localize (bool) <DEFAULT = True>: If False, the returned index is timezone aware (UTC)
+
+        Returns:
+            Returns a Pandas dataframe with the o, h, l, c, volume and complete columns
+        """
+        df = self.download([(instrument, start, end, granularity, price)])[0]
+
+        if not localize:
+            df.index = df.index.tz_localize("UTC")
+
+        return df
+
+    def download(self, requests):
+        """
+        Downloads several ranges at once, sharing one thread pool between all of their chunks.
+        IE, the bid and ask history of an instrument are fetched concurrently rather than one after the other.
+
+        Args:
+            requests (list(tuple)): (instrument, start, end, granularity, price) tuples to download
+
+        Returns:
+            Returns a list of Pandas dataframes (timezone naive UTC index), one per request, in the same order
+        """
+        chunks = []
+        for index, (instrument, start, end, granularity, price) in enumerate(requests):
+            for chunk_start, chunk_end in self.split(start, end, granularity):
+                chunks.append((index, chunk_start, chunk_end, instrument, granularity, price))
+
+        results = [[] for _ in requests]
+
+        if not chunks:
+            return [self.empty_frame() for _ in requests]
+
+        started = time.perf_counter()
+        candles = 0
+        done = 0
+        milestone = 0.25
+
+        # reused between calls, so its threads keep their connections
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._max_workers)
+
+        futures = {self._executor.submit(self._fetch, *chunk[1:]): chunk for chunk in chunks}
+
+        for future in as_completed(futures):
+            index, chunk_start = futures[future][:2]
+            df = future.result()
+            results[index].append((chunk_start, df))
+
+            done += 1
+            candles += len(df)
+
+            if self._verbose and done / len(chunks) >= milestone and done < len(chunks):
+                print(f"{int(milestone * 100)}%... ({self._throughput(candles, started)} candles/s)")
+                while done / len(chunks) >= milestone:
+                    milestone += 0.25
+
+        elapsed = time.perf_counter() - started
+        self._report = {
+            "chunks": len(chunks),
+            "candles": candles,
+            "seconds": elapsed,
+            "candles_per_second": self._throughput(candles, started),
+        }
+
+        if self._verbose:
+            print(f"Downloaded {candles} candles in {len(chunks)} requests, {round(elapsed, 2)}s ({self._report['candles_per_second']} candles/s)")
+
+        # stitch the chunks back in chronological order
+        frames = []
+        for (_, _, end, _, _), parts in zip(requests, results):
+            if not parts:
+                frames.append(self.empty_frame())
+                continue
+
+            parts.sort(key=lambda part: part[0])
+            parts = [part[1] for part in parts if len(part[1])]
+
+            if not parts:
+                frames.append(self.empty_frame())
+                continue
+
+            df = pd.concat(parts)
+            df = df[~df.index.duplicated(keep="first")]
+
+            # [start, end), whether or not OANDA included a candle at the end of the last chunk
+            frames.append(df[df.index < self._to_timestamp(end)])
+
+        return frames
+
+    def close(self):
+        """Shuts the thread pool down, along with the connections of its threads. The next download opens new ones."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def get_report(self):
+        """
+        Getter function to retrieve the statistics of the last download.
+
+        Returns:
+            Returns a dict with the number of chunks, candles, seconds taken and candles per second
+        """
+        if self._report is not None:
+            return self._report
+        else:
+            print("Please run .download() first.")
+
+    def split(self, start, end, granularity):
+        """
+        Splits [start, end) into consecutive [chunk_start, chunk_end) chunks of at most candles_per_chunk candles.
+
+        Args:
+            start (string or datetime): The start of the period (UTC)
+            end (string or datetime): The end of the period (UTC)
+            granularity (string): Length of each candlestick for the respective instrument
+
+        Returns:
+            Returns a list of (chunk_start, chunk_end) timestamps
+        """
+        start = self._to_timestamp(start)
+        end = self._to_timestamp(end)
+
+        # one candle short of a full page, so tpqoa never splits a chunk into a second request
+        step = self.granularity_delta(granularity) * (self._candles_per_chunk - 1)
+
+        chunks = []
+        while start < end:
+            chunk_end = min(start + step, end)
+            chunks.append((start, chunk_end))
+            start = chunk_end
+
+        return chunks
+
+    @staticmethod
+    def granularity_delta(granularity):
+        """
+        Converts an OANDA granularity (IE "S5", "M1", "H4", "D") into the length of one candle.
+
+        Args:
+            granularity (string): Length of each candlestick
+
+        Returns:
+            Returns a Pandas Timedelta
+        """
+        if granularity == "M":
+            # monthly candles, a month is never longer than this
+            return pd.Timedelta(days=31)
+        if granularity == "W":
+            return pd.Timedelta(weeks=1)
+        if granularity == "D":
+            return pd.Timedelta(days=1)
+
+        units = {"S": "seconds", "M": "minutes", "H": "hours"}
+        return pd.Timedelta(**{units[granularity[0]]: int(granularity[1:])})
+
+    @staticmethod
+    def empty_frame():
+        """
+        Creates an empty candle dataframe, used for ranges without any candles (IE weekends).
+
+        Returns:
+            Returns an empty Pandas dataframe with the o, h, l, c, volume and complete columns
+        """
+        columns = {"o": float, "h": float, "l": float, "c": float, "volume": int, "complete": bool}
+        return pd.DataFrame(
+            {column: pd.Series(dtype=dtype) for column, dtype in columns.items()},
+            index=pd.DatetimeIndex([]),
+        )
+
+    def _connection(self):
+        # the v20 sessions are not shared between threads, so each worker opens its own
+        if not hasattr(self._local, "oanda"):
+            self._local.oanda = tpqoa.tpqoa(self._cfg)
+        return self._local.oanda
+
+    def _throttle(self):
+        # reserve the next free request slot, then sleep outside the lock until it comes up
+        with self._throttle_lock:
+            now = time.monotonic()
+            slot = max(now, self._next_request)
+            self._next_request = slot + self._request_interval
+
+        if slot > now:
+            time.sleep(slot - now)
+
+    def _fetch(self, start, end, instrument, granularity, price):
+        for attempt in range(self._max_retries + 1):
+            self._throttle()
+            try:
+                connection = self._connection()
+
+                try:
+                    return connection.get_history(
+                        instrument, start.to_pydatetime(), end.to_pydatetime(), granularity, price
+                    )
+                except KeyError:
+                    # tpqoa fails to index an empty response, IE a range that falls on a weekend, but a malformed
+                    # response fails the same way, so the range is only empty if OANDA really sent no candles
+                    if self._is_empty(connection, start, end, instrument, granularity, price):
+                        return self.empty_frame()
+                    raise
+            except Exception:
+                if attempt == self._max_retries:
+                    raise
+                # back off, most failures here are rate limiting or dropped connections
+                time.sleep(0.5 * 2 ** attempt)
+
+    def _is_empty(self, connection, start, end, instrument, granularity, price):
+        # the raw response, which tpqoa would have turned into a dataframe
+        self._throttle()
+        response = connection.ctx.instrument.candles(
+            instrument=instrument,
+            fromTime=f"{start.isoformat()}Z",
+            toTime=f"{end.isoformat()}Z",
+            granularity=granularity,
+            price=price,
+        )
+        return len(response.get("candles")) == 0
+
+    @staticmethod
+    def _throughput(candles, started):
+        return int(candles / max(time.perf_counter() - started, 1e-9))
+
+    @staticmethod
+    def _to_timestamp(value):
+        timestamp = pd.Timestamp(value)
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.tz_convert("UTC").tz_localize(None)
+        return timestamp.replace(microsecond=0, nanosecond=0)
@@ -0,0 +1,78 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class LagFeatures:
+
+    """
+    Class building the lagged returns design matrix of the ML strategies, as a strided view over the returns.
+    Row t of the matrix holds [r(t-1), r(t-2), ..., r(t-lags)], the features predicting r(t): every row is a window
+    of the same returns array read backwards, so no lag column is ever copied, and the memory used stays that of the
+    returns no matter how many lags are considered. The view of each lag count is built once and reused.
+    """
+    def __init__(self, returns):
+        """
+        Initializes the LagFeatures object.
+
+        Args:
+            returns (array-like): The returns, IE the log returns of a price series. Only leading values may be NaN,
+                like the first log return
+        """
+        self._returns = np.ascontiguousarray(returns, dtype=float)
+
+        # the leading NaN values are never used as features or targets
+        valid = np.flatnonzero(~np.isnan(self._returns))
+        self._first = valid[0] if len(valid) else len(self._returns)
+
+        self._matrices = {}
+
+    def __repr__(self):
+        """Custom Representation."""
+        return f"LagFeatures( returns={len(self._returns)}, lags={sorted(self._matrices)} )"
+
+    def __len__(self):
+        return len(self._returns)
+
+    def matrix(self, lags):
+        """
+        Retrieves the design matrix of every target in the returns, which is not a copy.
+
+        Args:
+            lags (int): The number of lagged returns serving as features
+
+        Returns:
+            Returns a read-only numpy array of shape (len(returns) - lags, lags), whose row i predicts returns[i + lags]
+        """
+        matrix = self._matrices.get(lags)
+
+        if matrix is None:
+            # the windows of lags consecutive returns, reversed so the most recent return (lag1) comes first
+            matrix = sliding_window_view(self._returns[:-1], lags)[:, ::-1]
+            self._matrices[lags] = matrix
+
+        return matrix
+
+    def design(self, lags, start=0, stop=None):
+        """
+        Retrieves the features and targets of the rows in [start, stop), only using the returns in that range, IE
+        like shifting the returns of that range lags times and dropping the rows with missing values.
+
+        Args:
+            lags (int): The number of lagged returns serving as features
+            start (int) <DEFAULT = 0>: Position of the first return of the range
+            stop (int) <DEFAULT = None>: Position after the last return of the range, the end of the returns if None
+
+        Returns:
+            Returns a tuple, (numpy array: features, numpy array: target, slice: rows)
+            -> "features" is a view of shape (rows, lags)
+            -> "target" is a view of the returns being predicted
+            -> "rows" is the positions of the targets in the returns
+        """
+        first = max(start, self._first) + lags
+
+        # empty when the range holds no more than lags returns
+        stop = max(len(self._returns) if stop is None else stop, first)
+
+        rows = slice(first, stop)
+
+        return self.matrix(lags)[first - lags:stop - lags], self._returns[rows], rows
@@ -0,0 +1,292 @@
+import contextlib
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+
+import numpy as np
+import sklearn
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+
+class ModelStore:
+
+    """
+    Class implementing a persistent, on-disk store of fitted models.
+    Each model is pickled along with its feature spec under a key hashing its training data and parameters, so a
+    configuration that did not change is loaded instead of refitted. An index of the entries (spec, size)
+    is kept alongside, and the least recently used entries are evicted once the store grows past its limits.
+    Several processes can share a store, IE the retraining processes of live strategies or parallel backtests:
+    every update of the index holds a lock on the directory, and every file is written aside then renamed.
+    """
+    def __init__(self, directory=".model_cache", max_entries=100, max_bytes=512 * 2 ** 20):
+        """
+        Initializes the ModelStore object.
+
+        Args:
+            directory (string) <DEFAULT = ".model_cache">: Directory the models are stored in
+            max_entries (int) <DEFAULT = 100>: Maximum number of models kept
+            max_bytes (int) <DEFAULT = 512 MB>: Maximum total size of the models kept, in bytes
+        """
+        self._directory = directory
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+
+        os.makedirs(self._directory, exist_ok=True)
+
+    def __repr__(self):
+        """Custom Representation."""
+        return f"ModelStore( directory={self._directory}, max_entries={self._max_entries}, max_bytes={self._max_bytes} )"
+
+    @staticmethod
+    def fingerprint(*arrays, **params):
+        """
+        Hashes training data and parameters into a key.
+
+        Args:
+            arrays (numpy array or Pandas object): The training data, IE the features and the target
+            params (object): Anything else the model depends on, IE lags=5, model="LogisticRegression(C=1e6)"
+
+        Returns:
+            Returns the key, a hexadecimal string
+        """
+        digest = hashlib.sha256()
+
+        # a model pickled by another version of sklearn may not load, or not behave the same
+        digest.update(sklearn.__version__.encode())
+
+        for array in arrays:
+            array = np.ascontiguousarray(array.to_numpy() if hasattr(array, "to_numpy") else array)
+            digest.update(f"{array.dtype.str}{array.shape}".encode())
+            digest.update(array.tobytes())
+
+        digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+
+        return digest.hexdigest()
+
+    def get(self, key):
+        """
+        Loads a stored model.
+
+        Args:
+            key (string): The key it was stored under, see fingerprint()
+
+        Returns:
+            Returns the fitted model, or None if there is no model stored under the key
+        """
+        index = self._load_index()
+
+        if key not in index:
+            return None
+
+        try:
+            with open(self._path(key), "rb") as f:
+                model = pickle.load(f)["model"]
+
+            # the file's modification time is its last use, so a hit does not rewrite the index
+            os.utime(self._path(key))
+        except Exception:
+            # missing or unreadable, IE written by an incompatible version
+            self.remove(key)
+            return None
+
+        return model
+
+    def put(self, key, model, spec=None):
+        """
+        Stores a fitted model, evicting the least recently used ones if the store is over its limits.
+
+        Args:
+            key (string): The key to store it under, see fingerprint()
+            model (object): The fitted model
+            spec (dict) <DEFAULT = None>: Describes the model's features, IE {"instrument": "EUR_USD", "lags": 5},
+                see latest()
+        """
+        spec = spec or {}
+        payload = pickle.dumps({"model": model, "spec": spec}, protocol=pickle.HIGHEST_PROTOCOL)
+
+        self._write(self._path(key), payload)
+
+        with self._lock():
+            index = self._load_index()
+            index[key] = {"spec": json.loads(json.dumps(spec, default=str)), "size": len(payload)}
+
+            self._evict(index)
+            self._store_index(index)
+
+    def latest(self, **spec):
+        """
+        Loads the most recently used model with the passed spec, IE to warm start a refit on newer data.
+
+        Args:
+            spec (object): The spec to match, IE instrument="EUR_USD", lags=5
+
+        Returns:
+            Returns the fitted model, or None if no stored model has that spec
+        """
+        spec = json.loads(json.dumps(spec, default=str))
+
+        matches = [(self._used(key), key) for key, entry in self._load_index().items() if entry["spec"] == spec]
+
+        if not matches:
+            return None
+
+        return self.get(max(matches)[1])
+
+    def fit(self, estimator, features, target, warm_start=False, key=None, **spec):
+        """
+        Fits the estimator, or loads it if it was already fitted on the same data with the same parameters.
+
+        Args:
+            estimator (object): An unfitted sklearn estimator, IE LogisticRegression(C=1e6)
+            features (numpy array or Pandas dataframe): The training features
+            target (numpy array or Pandas series): The training target
+            warm_start (bool) <DEFAULT = False>: On a miss, starts from the coefficients of the latest model with the
+                same spec, if the estimator supports it and the classes match
+            key (string) <DEFAULT = None>: Stores the model under this key instead of a fingerprint of the training
+                data, IE a key naming a sliding training window, so fits of windows it considers the same are shared
+            spec (object): Describes the model's features, IE instrument="EUR_USD", lags=5
+
+        Returns:
+            Returns the fitted estimator
+        """
+        if key is None:
+            key = self.fingerprint(
+                features, target, estimator=type(estimator).__name__, params=estimator.get_params(), spec=spec
+            )
+
+        model = self.get(key)
+        if model is not None:
+            return model
+
+        params = estimator.get_params()
+
+        if warm_start and "warm_start" in params:
+            previous = self.latest(**spec)
+
+            if (
+                previous is not None
+                and type(previous) is type(estimator)
+                and dict(previous.get_params(), warm_start=None) == dict(params, warm_start=None)
+                and np.array_equal(getattr(previous, "classes_", None), np.unique(target))
+            ):
+                # only the coefficients are carried over, the fit keeps the estimator's own parameters
+                for name in ("coef_", "intercept_"):
+                    if hasattr(previous, name):
+                        setattr(estimator, name, np.copy(getattr(previous, name)))
+
+                estimator.set_params(warm_start=True)
+
+        estimator.fit(features, target)
+
+        # stored with the parameters its key was hashed from
+        estimator.set_params(**params)
+
+        self.put(key, estimator, spec)
+
+        return estimator
+
+    def remove(self, key):
+        """
+        Removes a stored model.
+
+        Args:
+            key (string): The key it was stored under
+        """
+        with self._lock():
+            index = self._load_index()
+            index.pop(key, None)
+            self._store_index(index)
+
+            self._delete(key)
+
+    def clear(self):
+        """Removes every stored model."""
+        with self._lock():
+            for key in self._load_index():
+                self._delete(key)
+
+            self._store_index({})
+
+    def _path(self, key):
+        return os.path.join(self._directory, f"{key}.pkl")
+
+    def _index_path(self):
+        return os.path.join(self._directory, "index.json")
+
+    def _load_index(self):
+        try:
+            with open(self._index_path()) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _store_index(self, index):
+        self._write(self._index_path(), json.dumps(index).encode())
+
+    def _write(self, path, payload):
+        # written aside under a unique name then renamed, so a reader never sees half a file, even with other writers
+        descriptor, temporary = tempfile.mkstemp(dir=self._directory, suffix=".tmp")
+
+        try:
+            with os.fdopen(descriptor, "wb") as f:
+                f.write(payload)
+            os.replace(temporary, path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+
+    @contextlib.contextmanager
+    def _lock(self):
+        # exclusive across processes, held around every read-modify-write of the index
+        with open(os.path.join(self._directory, "index.lock"), "a+b") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        # LK_LOCK gives up after 10 seconds
+                        continue
+
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _used(self, key):
+        # the last time the model was stored or loaded, missing models count as the oldest
+        try:
+            return os.path.getmtime(self._path(key))
+        except OSError:
+            return 0.0
+
+    def _delete(self, key):
+        if os.path.exists(self._path(key)):
+            os.remove(self._path(key))
+
+    def _evict(self, index):
+        # least recently used first
+        keys = sorted(index, key=self._used)
+        total = sum(entry["size"] for entry in index.values())
+
+        while keys and (len(index) > self._max_entries or total > self._max_bytes):
+            key = keys.pop(0)
+            total -= index.pop(key)["size"]
+
+            self._delete(key)
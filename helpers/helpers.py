@@ -1,7 +1,7 @@
 
-import tpqoa
-
 import matplotlib.pyplot as plt
+
+from helpers.CandleCache import CandleCache
 plt.style.use("seaborn")
 
 
@@ -12,10 +12,13 @@ class helpers():
         # WARNING: the smaller the granularity, the less frequently the price change will
         # be able to cover the trading costs
 
-        oanda = tpqoa.tpqoa(cfg)
+        cache = CandleCache(cfg)
+
+        # bid and ask are downloaded concurrently
+        bid_df, ask_df = cache.get_histories(instrument=instrument, start=start, end=end, granularity="M5", prices=("B", "A"), localize=False)
 
-        bid_price = oanda.get_history(instrument=instrument, start=start, end=end, granularity="M5", price="B", localize=False).c.dropna().to_frame()
-        ask_price = oanda.get_history(instrument=instrument, start=start, end=end, granularity="M5", price="A", localize=False).c.dropna().to_frame()
+        bid_price = bid_df.c.dropna().to_frame()
+        ask_price = ask_df.c.dropna().to_frame()
 
         if granularity != "M5":
             bid_price = bid_price.resample(granularity).last().dropna()
@@ -0,0 +1,78 @@
+import pandas as pd
+
+# a day in nanoseconds, every day starts a new grid of bars
+_DAY = pd.Timedelta(days=1).value
+
+
+class BarBuilder:
+
+    """
+    Class aggregating streamed ticks into bars incrementally.
+    Only the bar currently forming is kept: a tick inside it just replaces its closing prices, and a tick past
+    its end closes it. Bars are labeled and filled like resample(bar_length, label="right").last().ffill(),
+    IE a bar holds the last tick before its label, and a bar without ticks repeats the previous one.
+    Bars are aligned to the midnight (UTC) of each tick's day, like resample() with its default origin="start_day",
+    which matters for bar lengths that do not divide a day, IE "7min".
+    """
+    def __init__(self, bar_length, last_bar=None):
+        """
+        Initializes the BarBuilder object.
+
+        Args:
+            bar_length (Pandas Timedelta): Length of each bar, bars are aligned to the midnight (UTC) of their day
+            last_bar (Pandas Timestamp) <DEFAULT = None>: Label of the last bar already known (IE from history),
+                bars up to and including it are never emitted
+        """
+        self._length = pd.to_timedelta(bar_length).value
+        self._last_bar = last_bar.value if last_bar is not None else None
+
+        # label (in nanoseconds) and closing prices of the bar currently forming
+        self._label = None
+        self._bid = None
+        self._ask = None
+
+    def __repr__(self):
+        """Custom Representation."""
+        return f"BarBuilder( bar_length={pd.Timedelta(self._length)} )"
+
+    def update(self, time, bid, ask):
+        """
+        Adds a tick to the bar currently forming.
+
+        Args:
+            time (Pandas Timestamp): The time of the tick
+            bid (float): The bid price
+            ask (float): The ask price
+
+        Returns:
+            Returns a list of the bars the tick closed, as (Pandas Timestamp: label, float: bid, float: ask) tuples,
+            which is empty unless the tick crossed a bar boundary
+        """
+        label = self._label_of(time.value)
+
+        closed = []
+
+        if self._label is not None and label > self._label:
+            # the forming bar, and any bars without ticks after it, repeating its prices
+            bar = self._label
+            while bar < label:
+                if self._last_bar is None or bar > self._last_bar:
+                    closed.append((pd.Timestamp(bar, tz="UTC"), self._bid, self._ask))
+
+                # the bar starting where this one ends, on the grid of its own day
+                bar = self._label_of(bar)
+
+            if closed:
+                self._last_bar = closed[-1][0].value
+
+        if self._label is None or label >= self._label:
+            self._label = label
+            self._bid = bid
+            self._ask = ask
+
+        return closed
+
+    def _label_of(self, time):
+        # right edge of the bar holding the time (in nanoseconds), on the grid starting at midnight of its day
+        midnight = time - time % _DAY
+        return midnight + ((time - midnight) // self._length + 1) * self._length
@@ -0,0 +1,220 @@
+import numpy as np
+import pandas as pd
+
+
+class BarHistory:
+
+    """
+    Class implementing the array-backed bar history of a live trader.
+    Bars are appended into preallocated numpy arrays, instead of appending rows to a dataframe, which copies the
+    whole history every time. Unbounded, the arrays double in size whenever they fill up. With a maxlen, only the
+    most recent maxlen bars are kept in a fixed-size circular buffer, and the evicted bars can be spilled to disk.
+    """
+    columns = ("bid_price", "ask_price", "mid_price", "spread")
+
+    def __init__(self, capacity=1024, maxlen=None, spill_path=None):
+        """
+        Initializes the BarHistory object.
+
+        Args:
+            capacity (int) <DEFAULT = 1024>: Number of bars the arrays initially hold, when unbounded
+            maxlen (int) <DEFAULT = None>: Number of most recent bars kept in memory, every bar if None
+            spill_path (string) <DEFAULT = None>: File the bars evicted from memory are appended to, see load_spilled()
+        """
+        self._maxlen = maxlen
+        self._spill_path = spill_path
+        self._spill = None
+
+        # total number of bars ever appended
+        self._count = 0
+
+        if maxlen is not None:
+            # every bar is written twice, at slot and slot + maxlen, so the last maxlen bars are always contiguous
+            capacity = 2 * maxlen
+
+        self._times = np.zeros(max(capacity, 1), dtype=np.int64)
+        self._values = np.full((max(capacity, 1), len(self.columns)), np.nan)
+
+    def __repr__(self):
+        """Custom Representation."""
+        return f"BarHistory( bars={len(self)}, maxlen={self._maxlen} )"
+
+    def __len__(self):
+        if self._maxlen is None:
+            return self._count
+        return min(self._count, self._maxlen)
+
+    def append(self, time, bid=np.nan, ask=np.nan, mid=None):
+        """
+        Appends a bar, evicting the oldest one if the history is full.
+
+        Args:
+            time (Pandas Timestamp): The label of the bar
+            bid (float) <DEFAULT = NaN>: The closing bid price
+            ask (float) <DEFAULT = NaN>: The closing ask price
+            mid (float) <DEFAULT = None>: The closing mid price, the average of bid and ask if None
+        """
+        if mid is None:
+            mid = (ask + bid) / 2
+
+        self._put(time.value, (bid, ask, mid, ask - bid))
+
+    def extend(self, df):
+        """
+        Appends many bars at once, IE the history downloaded at startup.
+
+        Args:
+            df (Pandas dataframe): Bars indexed by time (UTC), holding any of the bid_price, ask_price, mid_price
+                and spread columns, missing columns are left as NaN
+        """
+        times = df.index.values.astype("datetime64[ns]").astype(np.int64)
+
+        values = np.full((len(df), len(self.columns)), np.nan)
+        for column, name in enumerate(self.columns):
+            if name in df:
+                values[:, column] = df[name].to_numpy(dtype=float)
+
+        if self._maxlen is None:
+            if self._count + len(df) > len(self._times):
+                self._grow(max(2 * len(self._times), self._count + len(df)))
+
+            self._times[self._count:self._count + len(df)] = times
+            self._values[self._count:self._count + len(df)] = values
+            self._count += len(df)
+        else:
+            for time, row in zip(times, values):
+                self._put(time, row)
+
+    def last_time(self):
+        """
+        Retrieves the label of the most recent bar.
+
+        Returns:
+            Returns a Pandas Timestamp, or None if there are no bars
+        """
+        if not self._count:
+            return None
+
+        return pd.Timestamp(self._times[self._window().stop - 1], tz="UTC")
+
+    def column(self, name):
+        """
+        Retrieves a column of the bars in memory, oldest first, without copying it.
+
+        Args:
+            name (string): One of bid_price, ask_price, mid_price or spread
+
+        Returns:
+            Returns a numpy array
+        """
+        return self._values[self._window(), self.columns.index(name)]
+
+    def to_frame(self):
+        """
+        Builds a dataframe of the bars in memory, in the same layout the strategies used to get as _raw_data.
+
+        Returns:
+            Returns a Pandas dataframe indexed by time, with the bid_price, ask_price, mid_price and spread columns
+        """
+        window = self._window()
+
+        return pd.DataFrame(
+            self._values[window].copy(),
+            index=pd.to_datetime(self._times[window], utc=True),
+            columns=list(self.columns),
+        )
+
+    def load_spilled(self):
+        """
+        Reads back the bars spilled to disk, IE the ones evicted from memory.
+
+        Returns:
+            Returns a Pandas dataframe in the same layout as to_frame(), or None if nothing was spilled
+        """
+        if self._spill is not None:
+            self._spill.flush()
+
+        if self._spill_path is None:
+            return None
+
+        return self.read_spill(self._spill_path)
+
+    def close(self):
+        """Closes the spill file, if one is open."""
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+    @classmethod
+    def read_spill(cls, path):
+        """
+        Reads a spill file written by a BarHistory.
+
+        Args:
+            path (string): Path to the spill file
+
+        Returns:
+            Returns a Pandas dataframe in the same layout as to_frame(), or None if the file does not exist
+        """
+        try:
+            records = np.fromfile(path, dtype=cls._record_dtype())
+        except FileNotFoundError:
+            return None
+
+        return pd.DataFrame(
+            {name: records[name] for name in cls.columns},
+            index=pd.to_datetime(records["time"], utc=True),
+        )
+
+    @classmethod
+    def _record_dtype(cls):
+        # one fixed-size record per bar, the time in nanoseconds followed by the prices
+        return np.dtype([("time", "<i8")] + [(name, "<f8") for name in cls.columns])
+
+    def _window(self):
+        # the rows holding the bars in memory, oldest first
+        if self._maxlen is None:
+            return slice(0, self._count)
+
+        end = (self._count - 1) % self._maxlen + self._maxlen + 1
+        return slice(end - len(self), end)
+
+    def _put(self, time, row):
+        if self._maxlen is None:
+            if self._count == len(self._times):
+                self._grow(2 * len(self._times))
+
+            self._times[self._count] = time
+            self._values[self._count] = row
+            self._count += 1
+            return
+
+        slot = self._count % self._maxlen
+
+        if self._count >= self._maxlen and self._spill_path is not None:
+            self._spill_bar(slot)
+
+        self._times[slot] = self._times[slot + self._maxlen] = time
+        self._values[slot] = self._values[slot + self._maxlen] = row
+        self._count += 1
+
+    def _spill_bar(self, slot):
+        if self._spill is None:
+            self._spill = open(self._spill_path, "ab")
+
+        record = np.zeros(1, dtype=self._record_dtype())
+        record["time"] = self._times[slot]
+        for column, name in enumerate(self.columns):
+            record[name] = self._values[slot, column]
+
+        self._spill.write(record.tobytes())
+
+    def _grow(self, capacity):
+        times = np.zeros(capacity, dtype=np.int64)
+        values = np.full((capacity, len(self.columns)), np.nan)
+
+        times[:self._count] = self._times[:self._count]
+        values[:self._count] = self._values[:self._count]
+
+        self._times = times
+        self._values = values
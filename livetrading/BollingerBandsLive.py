@@ -1,6 +1,5 @@
-import numpy as np
-
 from livetrading.LiveTrader import LiveTrader
+from livetrading.RollingWindow import RollingWindow
 
 
 class BollingerBandsLive(LiveTrader):
@@ -15,6 +14,10 @@ class BollingerBandsLive(LiveTrader):
         stop_datetime=None,
         stop_loss=None,
         stop_profit=None,
+        spill_path=None,
+        broker=None,
+        latency=None,
+        tick_log=None,
     ):
         """
         Initializes the BollingerBandsLive object.
@@ -29,10 +32,19 @@ class BollingerBandsLive(LiveTrader):
             stop_datetime (object) <DEFAULT = None>: A datetime object that when passed stops trading
             stop_loss (float) <DEFAULT = None>: A stop loss that when profit goes below stops trading
             stop_profit (float) <DEFAULT = None>: A stop profit that when profit goes above stops trading
+            spill_path (string) <DEFAULT = None>: File the bars older than max_lookback() are appended to
+            broker (MultiInstrumentTrader) <DEFAULT = None>: An engine to trade on instead of streaming on its own
+            latency (LatencyMonitor) <DEFAULT = None>: Where the timings of the live path are recorded
+            tick_log (string) <DEFAULT = None>: File every streamed tick is appended to, see TickRecorder
         """
         self._sma = sma
         self._deviation = deviation
 
+        self._window = RollingWindow(sma)
+        # distance of the last bar to the sma, and the position the bands point to
+        self._distance = None
+        self._band_position = 0
+
         # passes params to the parent class
         super().__init__(
             cfg,
@@ -42,31 +54,42 @@ class BollingerBandsLive(LiveTrader):
             stop_datetime=stop_datetime,
             stop_loss=stop_loss,
             stop_profit=stop_profit,
+            spill_path=spill_path,
+            broker=broker,
+            latency=latency,
+            tick_log=tick_log,
         )
 
-    def define_strategy(self):
-        data = self._raw_data.copy()
+    def max_lookback(self):
+        return self._sma
 
-        data["sma"] = data["mid_price"].rolling(self._sma).mean()
-        data["lower"] = data["sma"] - (
-            data["mid_price"].rolling(self._sma).std() * self._deviation
-        )
-        data["upper"] = data["sma"] + (
-            data["mid_price"].rolling(self._sma).std() * self._deviation
-        )
-        data["distance"] = data["mid_price"] - data["sma"]
+    def on_bar(self, mid_price):
+        self._window.update(mid_price)
+
+        if not self._window.full:
+            return
+
+        sma = self._window.mean()
+        # a window of one bar has no deviation, and so no bands (like Pandas' NaN)
+        std = self._window.std()
+        if std is None:
+            std = float("nan")
+
+        lower = sma - std * self._deviation
+        upper = sma + std * self._deviation
+        distance = mid_price - sma
 
         # if price is lower than lower band, indicates oversold, and to go long
-        data["position"] = np.where(data["mid_price"] < data["lower"], 1, np.nan)
+        if mid_price < lower:
+            self._band_position = 1
         # if price is higher than upper band, indicates overbought, and to go short
-        data["position"] = np.where(
-            data["mid_price"] > data["upper"], -1, data["position"]
-        )
+        if mid_price > upper:
+            self._band_position = -1
         # if we have crossed the sma line, we want to close our current position (be neutral, position=0)
-        data["position"] = np.where(
-            data["distance"] * data["distance"].shift(1) < 0, 0, data["position"]
-        )
-        # clean up any NAN values/holiday vacancies
-        data["position"] = data.position.ffill().fillna(0)
+        if self._distance is not None and distance * self._distance < 0:
+            self._band_position = 0
+
+        self._distance = distance
 
-        self._data = data.dropna().copy()
+    def define_strategy(self):
+        self._signal = self._band_position if self._window.full else None
@@ -1,6 +1,5 @@
-import numpy as np
-
 from livetrading.LiveTrader import LiveTrader
+from livetrading.RollingWindow import RollingWindow
 
 
 class ContrarianLive(LiveTrader):
@@ -14,6 +13,10 @@ class ContrarianLive(LiveTrader):
         stop_datetime=None,
         stop_loss=None,
         stop_profit=None,
+        spill_path=None,
+        broker=None,
+        latency=None,
+        tick_log=None,
     ):
         """
         Initializes the ContrarianLive object.
@@ -27,9 +30,17 @@ class ContrarianLive(LiveTrader):
             stop_datetime (object) <DEFAULT = None>: A datetime object that when passed stops trading
             stop_loss (float) <DEFAULT = None>: A stop loss that when profit goes below stops trading
             stop_profit (float) <DEFAULT = None>: A stop profit that when profit goes above stops trading
+            spill_path (string) <DEFAULT = None>: File the bars older than max_lookback() are appended to
+            broker (MultiInstrumentTrader) <DEFAULT = None>: An engine to trade on instead of streaming on its own
+            latency (LatencyMonitor) <DEFAULT = None>: Where the timings of the live path are recorded
+            tick_log (string) <DEFAULT = None>: File every streamed tick is appended to, see TickRecorder
         """
         self._window = window
 
+        # the last window + 1 prices, as the mean of the last window returns is log(price / oldest price) / window
+        self._prices = RollingWindow(window + 1)
+        self._price = None
+
         # passes params to the parent class
         super().__init__(
             cfg,
@@ -39,10 +50,24 @@ class ContrarianLive(LiveTrader):
             stop_datetime=stop_datetime,
             stop_loss=stop_loss,
             stop_profit=stop_profit,
+            spill_path=spill_path,
+            broker=broker,
+            latency=latency,
+            tick_log=tick_log,
         )
 
+    def max_lookback(self):
+        return self._window + 1
+
+    def on_bar(self, mid_price):
+        self._prices.update(mid_price)
+        self._price = mid_price
+
     def define_strategy(self):
-        data = self._raw_data.copy()
-        data["returns"] = np.log(data["mid_price"].div(data["mid_price"].shift(1)))
-        data["position"] = -np.sign(data["returns"].rolling(self._window).mean())
-        self._data = data.dropna().copy()
+        if not self._prices.full:
+            self._signal = None
+            return
+
+        # the sign of the mean return over the window, which the position goes against
+        change = self._price - self._prices.oldest()
+        self._signal = -1 if change > 0 else 1 if change < 0 else 0
@@ -0,0 +1,180 @@
+import json
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pandas as pd
+
+
+class LatencyMonitor:
+
+    """
+    Class implementing low-overhead latency histograms for the stages of the live path.
+    Durations are counted in logarithmic buckets (8 per doubling, so about 9% wide), which makes recording one a
+    few integer operations no matter how many have been recorded, while still giving p50, p99 and max per stage.
+    """
+    buckets_per_octave = 8
+
+    # buckets of up to 2^64 ns, far beyond anything the live path takes
+    bucket_count = 64 * 8
+
+    def __init__(self, report_every=None, port=None):
+        """
+        Initializes the LatencyMonitor object.
+
+        Args:
+            report_every (float) <DEFAULT = None>: Prints a summary every report_every seconds, never if None
+            port (int) <DEFAULT = None>: Serves the summary as JSON on http://127.0.0.1:port, not served if None
+        """
+        # stage -> [count, total ns, max ns, bucket counts], recorded to from the stream and the order threads
+        self._stages = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+        if report_every is not None:
+            self.start_reporting(report_every)
+
+        if port is not None:
+            self.serve(port)
+
+    def __repr__(self):
+        """Custom Representation."""
+        return f"LatencyMonitor( stages={list(self._stages)} )"
+
+    @staticmethod
+    def clock():
+        """
+        Returns:
+            Returns the current time in nanoseconds, the start to pass to record()
+        """
+        return time.perf_counter_ns()
+
+    def record(self, stage, start):
+        """
+        Records the time elapsed since start for a stage.
+
+        Args:
+            stage (string): Name of the stage, IE "define_strategy"
+            start (int): Start of the stage, from clock() (or the return of the previous record())
+
+        Returns:
+            Returns the current time in nanoseconds, so consecutive stages can be chained
+        """
+        end = time.perf_counter_ns()
+        elapsed = end - start
+
+        bucket = int(math.log2(elapsed) * self.buckets_per_octave) if elapsed > 1 else 0
+
+        with self._lock:
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = self._stages[stage] = [0, 0, 0, [0] * self.bucket_count]
+
+            stats[0] += 1
+            stats[1] += elapsed
+            if elapsed > stats[2]:
+                stats[2] = elapsed
+
+            stats[3][min(bucket, self.bucket_count - 1)] += 1
+
+        return end
+
+    def reset(self):
+        """Clears every recorded duration."""
+        with self._lock:
+            self._stages = {}
+
+    def summary(self):
+        """
+        Summarizes the recorded durations of every stage.
+
+        Returns:
+            Returns a Pandas dataframe indexed by stage, with the count and the mean, p50, p99 and max in microseconds
+        """
+        # a consistent copy, the stages keep being recorded to while it is summarized
+        with self._lock:
+            stages = [
+                (stage, count, total, maximum, list(buckets))
+                for stage, (count, total, maximum, buckets) in self._stages.items()
+            ]
+
+        rows = {}
+        for stage, count, total, maximum, buckets in stages:
+            rows[stage] = {
+                "count": count,
+                "mean_us": total / count / 1e3,
+                "p50_us": min(self._percentile(buckets, count, 0.5), maximum) / 1e3,
+                "p99_us": min(self._percentile(buckets, count, 0.99), maximum) / 1e3,
+                "max_us": maximum / 1e3,
+            }
+
+        return pd.DataFrame.from_dict(
+            rows, orient="index", columns=["count", "mean_us", "p50_us", "p99_us", "max_us"]
+        )
+
+    def print_summary(self):
+        """Prints the summary of every stage."""
+        print(self.summary().round(1).to_string())
+
+    def start_reporting(self, every):
+        """
+        Prints the summary periodically, from a background thread.
+
+        Args:
+            every (float): Seconds between two summaries
+        """
+        def report():
+            while True:
+                time.sleep(every)
+                self.print_summary()
+
+        threading.Thread(target=report, name="LatencyReport", daemon=True).start()
+
+    def serve(self, port, host="127.0.0.1"):
+        """
+        Serves the summary as JSON over HTTP, from a background thread.
+
+        Args:
+            port (int): Port to listen on, any free one if 0
+            host (string) <DEFAULT = "127.0.0.1">: Address to listen on, local only by default
+        """
+        monitor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = json.dumps(monitor.summary().to_dict(orient="index")).encode()
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                # requests are not worth a line on the console
+                pass
+
+        self._server = HTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="LatencyServer", daemon=True).start()
+
+        # the port actually listened on, IE a free one if port was 0
+        print(f"Serving latency metrics on http://{host}:{self._server.server_address[1]}")
+
+    def close(self):
+        """Stops serving the summary, if it is served."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    @classmethod
+    def _percentile(cls, buckets, count, q):
+        # the geometric middle of the bucket holding the q-th duration
+        rank = q * count
+        seen = 0
+        for bucket, bucket_count in enumerate(buckets):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                return 2 ** ((bucket + 0.5) / cls.buckets_per_octave)
+        return 0
@@ -1,3 +1,6 @@
+import threading
+import time
+
 import pandas as pd
 from datetime import datetime, timedelta
 
@@ -6,6 +9,13 @@ import pytz
 import tpqoa
 import matplotlib.pyplot as plt
 
+from helpers.CandleCache import CandleCache
+from livetrading.BarBuilder import BarBuilder
+from livetrading.BarHistory import BarHistory
+from livetrading.LatencyMonitor import LatencyMonitor
+from livetrading.OrderWorker import OrderWorker
+from livetrading.TickRecorder import TickRecorder
+
 plt.style.use("seaborn")
 
 
@@ -20,6 +30,10 @@ class LiveTrader(tpqoa.tpqoa):
         stop_datetime=None,
         stop_loss=None,
         stop_profit=None,
+        spill_path=None,
+        broker=None,
+        latency=None,
+        tick_log=None,
     ):
         """
         Initializes the LiveTrader object.
@@ -33,27 +47,43 @@ class LiveTrader(tpqoa.tpqoa):
             stop_datetime (object) <DEFAULT = None>: A datetime object that when passed stops trading
             stop_loss (float) <DEFAULT = None>: A stop loss that when profit goes below stops trading
             stop_profit (float) <DEFAULT = None>: A stop profit that when profit goes above stops trading
+            spill_path (string) <DEFAULT = None>: File the bars older than max_lookback() are appended to, instead of
+                being discarded
+            broker (MultiInstrumentTrader) <DEFAULT = None>: An engine to trade on, sharing its OANDA session, stream
+                and order worker with its other strategies, instead of opening its own
+            latency (LatencyMonitor) <DEFAULT = None>: Where the timings of each stage of the live path are recorded,
+                IE LatencyMonitor(report_every=60) to print them every minute, the engine's if trading on a broker
+            tick_log (string) <DEFAULT = None>: File every streamed tick is appended to, see TickRecorder
         """
-        # TODO: More rigorous handling of markets being closed (this is EST dependent, must ensure that is what the datetime is giving)
-        if datetime.today().weekday() >= 6 and datetime.today().hour >= 17:
-            print("Markets are open.")
-        elif datetime.today().weekday() == 6 and datetime.today().hour < 17:
-            raise Exception("Sorry, markets are closed")
-        elif datetime.today().weekday() == 5:
-            raise Exception("Sorry, markets are closed")
-        elif datetime.today().weekday() >= 4 and datetime.today().hour >= 5:
-            raise Exception("Sorry, markets are closed")
+        self._broker = broker
+
+        # timings of each stage between a tick arriving and its order being reported, see get_latency()
+        if latency is None:
+            latency = broker.latency_monitor() if broker is not None else LatencyMonitor()
+        self._latency = latency
+
+        if broker is None:
+            self.check_market_hours()
+
+            # passes the config file to tpqoa
+            super().__init__(cfg)
         else:
-            print("Markets are open, beginning trading session.")
+            # shares the engine's OANDA session, the markets were already checked by the engine
+            vars(self).update(broker.session())
+            self.stop_stream = False
 
-        # passes the config file to tpqoa
-        super().__init__(cfg)
+        self._cfg = cfg
         self._instrument = instrument
         self._bar_length = pd.to_timedelta(bar_length)
-        self._tick_data = pd.DataFrame()
-        self._raw_data = None
+        self._spill_path = spill_path
+        # the bars built from the streamed ticks (after the history bars), see on_success()
+        self._recorder = TickRecorder(tick_log) if tick_log is not None else None
+        self._bars = self.new_bar_history()
+        self._bar_builder = None
         self._data = None
         self._last_tick = None
+        # when the latest tick arrived (perf_counter_ns), stamped on the orders it leads to
+        self._tick_clock = None
         self._units = units
 
         if stop_datetime:
@@ -67,83 +97,189 @@ class LiveTrader(tpqoa.tpqoa):
         self._stop_profit = stop_profit
 
         self._position = 0
+        # the position the strategy wants after the latest bar, set by define_strategy()
+        self._signal = None
+        # the position last sent to the order worker, _position only changes once its order is filled
+        self._target = 0
 
         self._profits = []
         self._profit = 0
 
+        # orders are placed on a separate thread, so the stream is never blocked by an order request
+        self._lock = threading.Lock()
+        self._orders = broker.order_worker() if broker is not None else OrderWorker()
+
         # set up history used by some trades
         self.setup_history(history_days)
 
-        self.stream_data(self._instrument)
+        if broker is None:
+            self.stream_data(self._instrument)
+        else:
+            # the engine streams the ticks of all its instruments, see MultiInstrumentTrader.run()
+            broker.register(self)
 
     def __del__(self):
         """Destructor used to ensure closing of position when object expires."""
         # close out position
         self.close_position()
+        self._bars.close()
+
+        if self._recorder is not None:
+            self._recorder.close()
+
+    @staticmethod
+    def check_market_hours():
+        """Raises an Exception if the markets are closed."""
+        # TODO: More rigorous handling of markets being closed (this is EST dependent, must ensure that is what the datetime is giving)
+        if datetime.today().weekday() >= 6 and datetime.today().hour >= 17:
+            print("Markets are open.")
+        elif datetime.today().weekday() == 6 and datetime.today().hour < 17:
+            raise Exception("Sorry, markets are closed")
+        elif datetime.today().weekday() == 5:
+            raise Exception("Sorry, markets are closed")
+        elif datetime.today().weekday() >= 4 and datetime.today().hour >= 5:
+            raise Exception("Sorry, markets are closed")
+        else:
+            print("Markets are open, beginning trading session.")
+
+    def max_lookback(self):
+        """
+        Number of most recent bars the strategy needs, IE its longest window.
+        Only that many bars are kept in memory, the rest are dropped (or spilled to disk).
+
+        Returns:
+            Returns an int, or None to keep every bar
+        """
+        return None
+
+    def new_bar_history(self, capacity=1024):
+        """
+        Creates an empty bar history, bounded by the strategy's max_lookback().
+
+        Args:
+            capacity (int) <DEFAULT = 1024>: Number of bars initially allocated, if unbounded
+
+        Returns:
+            Returns a BarHistory object
+        """
+        return BarHistory(capacity, maxlen=self.max_lookback(), spill_path=self._spill_path)
 
     # used to gather historical data used by some strategies
     def setup_history(self, days=1):
         print("Setting up history...")
+        df = None
         if days != 0:
-            # while loop to combat missing bar on boundary of historical and streamed data
-            while True:
-
-                now = datetime.utcnow()
-                now = now.replace(microsecond=0)
-                past = now - timedelta(days=days)
-
-                mid_price = (
-                    self.get_history(
-                        instrument=self._instrument,
-                        start=past,
-                        end=now,
-                        granularity="S5",
-                        price="M",
-                        localize=False,
-                    )
-                    .c.dropna()
-                    .to_frame()
-                )
+            df = self.history_bars(days)
+
+            if df is not None and len(df):
+                self._last_tick = df.index[-1]
+                print("History set up. Opening trading stream.")
+            else:
+                df = None
+
+        if df is not None:
+            self._bars = self.new_bar_history(len(df))
+            self._bars.extend(df)
 
-                df = mid_price
-                df.rename(columns={"c": "mid_price"}, inplace=True)
+            # bootstraps the strategy's streaming indicators on the whole history, even the bars not kept
+            for mid_price in df["mid_price"].tolist():
+                self.on_bar(mid_price)
 
-                df = (
-                    df.resample(self._bar_length, label="right")
-                    .last()
-                    .dropna()
-                    .iloc[:-1]
+        # streamed bars continue right after the last history bar
+        self._bar_builder = BarBuilder(self._bar_length, self._last_tick)
+
+    def history_bars(self, days):
+        """
+        Retrieves the complete bars of the past days, from the broker if trading on one.
+
+        Args:
+            days (int): Amount of prior days history to retrieve
+
+        Returns:
+            Returns a Pandas dataframe indexed by time (UTC) with the mid_price column, or None if there is no history
+        """
+        if self._broker is not None:
+            return self._broker.history_bars(self._instrument, self._bar_length, days)
+
+        return self.download_bars(CandleCache(self._cfg, verbose=False), self._instrument, self._bar_length, days)
+
+    @staticmethod
+    def download_bars(cache, instrument, bar_length, days):
+        """
+        Downloads the complete bars of the past days, up to the bar forming now.
+
+        Args:
+            cache (CandleCache): The cache the S5 candles are read from, only the ones missing are downloaded
+            instrument (string): A string holding the ticker instrument of instrument to be retrieved
+            bar_length (Pandas Timedelta): Length of each bar
+            days (int): Amount of prior days history to download
+
+        Returns:
+            Returns a Pandas dataframe indexed by time (UTC) with the mid_price column
+        """
+        # while loop to combat missing bar on boundary of historical and streamed data
+        # every retry only downloads the few candles completed since the previous pass
+        while True:
+
+            now = datetime.utcnow()
+            now = now.replace(microsecond=0)
+            past = now - timedelta(days=days)
+
+            mid_price = (
+                cache.get_history(
+                    instrument=instrument,
+                    start=past,
+                    end=now,
+                    granularity="S5",
+                    price="M",
+                    localize=False,
                 )
+                .c.dropna()
+                .to_frame()
+            )
+
+            df = mid_price
+            df.rename(columns={"c": "mid_price"}, inplace=True)
+
+            df = (
+                df.resample(bar_length, label="right")
+                .last()
+                .dropna()
+                .iloc[:-1]
+            )
 
-                # uncomment if we need ask,bid,spread pricings
-                # bid_price = self.get_history(instrument=self._instrument, start=past, end=now, granularity="S5", price="B", localize=False).c.dropna().to_frame()
-                # ask_price = self.get_history(instrument=self._instrument, start=past, end=now, granularity="S5", price="A", localize=False).c.dropna().to_frame()
-                # spread = ask_price - bid_price
-                # create the new dataframe with relevent info
-                # df = bid_price
-                # df.rename(columns={"c": "bid_price"}, inplace=True)
-                # df["ask_price"] = ask_price
-                # df["mid_price"] = ask_price - spread
-                # df["spread"] = spread
-                # df = df.resample(self._bar_length, label="right").last().dropna().iloc[:-1]
-
-                self._raw_data = df.copy()
-                self._last_tick = self._raw_data.index[-1]
-
-                # set the data if less than _bar_length time as elapsed since the last full historical bar
-                # this way we never have a missing boundary bar between historical and stream
-                if (
-                    pd.to_datetime(datetime.utcnow()).tz_localize("UTC")
-                    - self._last_tick
-                ) < self._bar_length:
-                    print("History set up. Opening trading stream.")
-                    break
+            # uncomment if we need ask,bid,spread pricings
+            # bid_price = cache.get_history(instrument=instrument, start=past, end=now, granularity="S5", price="B", localize=False).c.dropna().to_frame()
+            # ask_price = cache.get_history(instrument=instrument, start=past, end=now, granularity="S5", price="A", localize=False).c.dropna().to_frame()
+            # spread = ask_price - bid_price
+            # create the new dataframe with relevent info
+            # df = bid_price
+            # df.rename(columns={"c": "bid_price"}, inplace=True)
+            # df["ask_price"] = ask_price
+            # df["mid_price"] = ask_price - spread
+            # df["spread"] = spread
+            # df = df.resample(bar_length, label="right").last().dropna().iloc[:-1]
+
+            # return the data if less than bar_length time as elapsed since the last full historical bar
+            # this way we never have a missing boundary bar between historical and stream
+            if (
+                pd.to_datetime(datetime.utcnow()).tz_localize("UTC")
+                - df.index[-1]
+            ) < bar_length:
+                return df
+
+            time.sleep(1)
 
     # called when new streamed data is successful
     def on_success(self, time, bid, ask):
-        print(time, bid, ask)
+        latency = self._latency
+        start = latency.clock()
+        self._tick_clock = start
+
+        # parses the RFC3339 time directly, to_datetime() first guesses its format on every tick
+        recent_tick = pd.Timestamp(time)
 
-        recent_tick = pd.to_datetime(time)
+        latency.record("tick_parse", start)
 
         stopped = False
 
@@ -169,100 +305,118 @@ class LiveTrader(tpqoa.tpqoa):
             print("Stop triggered, ending stream.")
 
         if not stopped:
-            df = pd.DataFrame(
-                {
-                    "bid_price": bid,
-                    "ask_price": ask,
-                    "mid_price": (ask + bid) / 2,
-                    "spread": ask - bid,
-                },
-                index=[recent_tick],
-            )
-            self._tick_data = self._tick_data.append(df)
-            # resamples the tick data (if applicable), while also dropping
-            # the last row (as it can be far off the resampled granularity)
-            if (recent_tick - self._last_tick) >= self._bar_length:
-
-                # append the most recent resampled ticks to self._data
-                self._raw_data = self._raw_data.append(
-                    self._tick_data.resample(self._bar_length, label="right")
-                    .last()
-                    .ffill()
-                    .iloc[:-1]
-                )
+            start = latency.clock()
+
+            if self._recorder is not None:
+                self._recorder.record(recent_tick, bid, ask)
+
+            # the tick only closes bars when it crosses a bar boundary, otherwise it just updates the forming bar
+            bars = self._bar_builder.update(recent_tick, bid, ask)
+
+            if bars:
+                for bar, bar_bid, bar_ask in bars:
+                    self._bars.append(bar, bar_bid, bar_ask)
+                    self.on_bar((bar_ask + bar_bid) / 2)
+
+                self._last_tick = self._bars.last_time()
 
-                # only keep the last tick bar (which is a pandas DataFrame)
-                self._tick_data = self._tick_data.iloc[-1:]
-                self._last_tick = self._raw_data.index[-1]
+                start = latency.record("bar_aggregation", start)
 
                 self.define_strategy()
+                start = latency.record("define_strategy", start)
+
                 self.trade()
+                latency.record("trade", start)
+            else:
+                latency.record("bar_aggregation", start)
+
+    def on_bar(self, mid_price):
+        """
+        Called with the mid price of every bar, history and streamed, oldest first.
+        Strategies update their streaming indicators here, in O(1) per bar.
+
+        Args:
+            mid_price (float): The closing mid price of the bar
+        """
+        pass
 
     def define_strategy(self):
         pass
 
     def trade(self):
-        # if most recent bar in position of strat says to go long, do it
-        if self._data["position"].iloc[-1] == 1:
-            # if we were neutral, only need to go long "units"
-            if self._position == 0:
-                order = self.create_order(
-                    self._instrument, self._units, suppress=True, ret=True
-                )
-                self.trade_report(order, 1)
-            # if we were short, need to go long 2 * "units"
-            elif self._position == -1:
-                order = self.create_order(
-                    self._instrument, self._units * 2, suppress=True, ret=True
-                )
-                self.trade_report(order, 1)
+        # the strategy has no position yet, IE its indicators are still warming up
+        if self._signal is None:
+            return
 
-            self._position = 1
-
-        # short position
-        elif self._data["position"].iloc[-1] == -1:
-            # if we were neutral, only need to go short "units"
-            if self._position == 0:
-                order = self.create_order(
-                    self._instrument, -self._units, suppress=True, ret=True
-                )
-                self.trade_report(order, -1)
-            # if we were short, need to go short 2 * "units"
-            elif self._position == 1:
-                order = self.create_order(
-                    self._instrument, -(self._units * 2), suppress=True, ret=True
-                )
-                self.trade_report(order, -1)
+        # only hands the position to the order worker, the order itself is placed on its thread
+        with self._lock:
+            if self._signal == self._target:
+                return
 
-            self._position = -1
+            self._target = self._signal
 
-        # if we want to go neutral, close out current open position
-        elif self._data["position"].iloc[-1] == 0:
+        self._orders.submit(self._signal, self.execute_order, self._tick_clock)
 
-            if self._position == 1:
-                order = self.create_order(
-                    self._instrument, -self._units, suppress=True, ret=True
-                )
-                self.trade_report(order, 0)
+    def execute_order(self, position, tick=None, queued=None):
+        """
+        Places the order moving from the current position to the passed one, and records its fill.
+        Runs on the order worker's thread.
 
-            elif self._position == -1:
-                order = self.create_order(
-                    self._instrument, self._units, suppress=True, ret=True
-                )
-                self.trade_report(order, 0)
+        Args:
+            position (int): The wanted position, 1 (long), 0 (neutral) or -1 (short)
+            tick (int) <DEFAULT = None>: When the tick behind the order arrived (perf_counter_ns), if any
+            queued (int) <DEFAULT = None>: When the order was handed to the order worker (perf_counter_ns)
+        """
+        if queued is not None:
+            self._latency.record("queue_wait", queued)
+
+        # IE going from short to long needs 2 * "units", from neutral to long only "units"
+        units = (position - self._position) * self._units
+
+        if units == 0:
+            return
+
+        try:
+            start = self._latency.clock()
+            # the engine places the order when trading on one, IE a ReplayBroker simulates its fill
+            broker = self._broker if self._broker is not None else self
+            order = broker.create_order(self._instrument, units, suppress=True, ret=True)
+            start = self._latency.record("order_round_trip", start)
+
+            # from the tick arriving to the order being acknowledged, across the queue and the order thread
+            if tick is not None:
+                self._latency.record("tick_to_ack", tick)
+
+            with self._lock:
+                self._position = position
+                self.trade_report(order, position)
+
+            self._latency.record("report", start)
+        except Exception:
+            with self._lock:
+                # the next signal retries from the position actually held, unless a newer one was already submitted
+                if self._target == position:
+                    self._target = self._position
+            raise
+
+    def get_latency(self):
+        """
+        Summarizes the time spent in each stage of the live path: tick_parse, bar_aggregation, define_strategy, trade
+        (only on ticks closing a bar), queue_wait, order_round_trip and report (only on orders), and tick_to_ack
+        (only on orders following a tick, from its arrival to the order's acknowledgement).
 
-            self._position = 0
+        Returns:
+            Returns a Pandas dataframe indexed by stage, with the count and the mean, p50, p99 and max in microseconds
+        """
+        return self._latency.summary()
 
     def close_position(self):
-        if self._position != 0:
-            order = self.create_order(
-                self._instrument,
-                units=-(self._position * self._units),
-                suppress=True,
-                ret=True,
-            )
-            self.trade_report(order, 0)
-        self._position = 0
+        # queued behind any pending order, and waits for all of them to be filled
+        with self._lock:
+            self._target = 0
+
+        self._orders.submit(0, self.execute_order)
+        self._orders.flush()
 
     def trade_report(self, order, position):
 
@@ -1,10 +1,32 @@
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import pandas as pd
 from sklearn.linear_model import LogisticRegression
-from datetime import datetime, timedelta
 
+from helpers.LagFeatures import LagFeatures
+from helpers.ModelStore import ModelStore
 from livetrading.LiveTrader import LiveTrader
-import tpqoa
+
+
+def _fit(prices, lags, spec, window):
+    # module level, so it can run in the retraining process
+    returns = np.log(prices[1:] / prices[:-1])
+
+    # the returns of the lags previous bars, to predict the direction of the next one
+    features, target, _ = LagFeatures(returns).design(lags)
+    direction = np.sign(target)
+
+    estimator = LogisticRegression(C=1e6, max_iter=100000, multi_class="ovr")
+
+    # the 7 days slide with every bar, so the fit is stored under the retrain period the window ends in rather than
+    # under its bars: a restart within that period loads it. Otherwise the fit starts from the coefficients of the
+    # latest one (IE the previous retraining, or the previous session), which are close, so few iterations are needed
+    key = ModelStore.fingerprint(
+        estimator=type(estimator).__name__, params=estimator.get_params(), spec=spec, window=window
+    )
+
+    return ModelStore().fit(estimator, features, direction, warm_start=True, key=key, **spec)
 
 
 class MLClassificationLive(LiveTrader):
@@ -19,6 +41,11 @@ class MLClassificationLive(LiveTrader):
         stop_datetime=None,
         stop_loss=None,
         stop_profit=None,
+        spill_path=None,
+        broker=None,
+        latency=None,
+        tick_log=None,
+        retrain_every=None,
     ):
         """
         Initializes the MLClassificationLive object.
@@ -33,14 +60,32 @@ class MLClassificationLive(LiveTrader):
             stop_datetime (object) <DEFAULT = None>: A datetime object that when passed stops trading
             stop_loss (float) <DEFAULT = None>: A stop loss that when profit goes below stops trading
             stop_profit (float) <DEFAULT = None>: A stop profit that when profit goes above stops trading
+            spill_path (string) <DEFAULT = None>: File the bars older than max_lookback() are appended to
+            broker (MultiInstrumentTrader) <DEFAULT = None>: An engine to trade on instead of streaming on its own
+            latency (LatencyMonitor) <DEFAULT = None>: Where the timings of the live path are recorded
+            tick_log (string) <DEFAULT = None>: File every streamed tick is appended to, see TickRecorder
+            retrain_every (int) <DEFAULT = None>: Refits the model on the last 7 days of bars every retrain_every
+                streamed bars, in a background process, never if None
         """
         # some of this info is needed by fit_model(), so we must set it in the child class
+        self._cfg = cfg
+        self._broker = broker
         self._instrument = instrument
         self._bar_length = pd.to_timedelta(bar_length)
         self._lags = lags
+        self._retrain_every = retrain_every
         self._model = None
         self.fit_model()
 
+        # the last lags bar returns, updated by on_bar()
+        self._features = np.zeros(lags)
+        self._bar_count = 0
+        self._mid_price = None
+
+        self._fitted_at = 0
+        self._retraining = None
+        self._executor = None
+
         # passes params to the parent class
         super().__init__(
             cfg,
@@ -51,62 +96,150 @@ class MLClassificationLive(LiveTrader):
             stop_datetime=stop_datetime,
             stop_loss=stop_loss,
             stop_profit=stop_profit,
+            spill_path=spill_path,
+            broker=broker,
+            latency=latency,
+            tick_log=tick_log,
         )
 
-    def fit_model(self):
-        print("Fitting model on past 7 days...")
-        now = datetime.utcnow()
-        now = now.replace(microsecond=0)
-        past = now - timedelta(days=7)
+    def __del__(self):
+        super().__del__()
 
-        oanda = tpqoa.tpqoa("oanda.cfg")
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
 
-        mid_price = oanda.get_history(instrument=self._instrument, start=past, end=now, granularity="S5", price="M", localize=False).c.dropna().to_frame()
+    def max_lookback(self):
+        if self._retrain_every:
+            # the bars the model is refitted on
+            return max(self._lags + 1, int(pd.Timedelta(days=7) / self._bar_length))
 
-        data = mid_price
-        data.rename(columns={"c": "mid_price"}, inplace=True)
+        return self._lags + 1
 
-        data = data.resample(self._bar_length, label="right").last().dropna().iloc[:-1]
+    def setup_history(self, days=1):
+        super().setup_history(days)
 
-        data["returns"] = np.log(data.div(data.shift(1)))
-        data.dropna(inplace=True)
+        # the model was fitted on the history bars, so the next fit is due retrain_every bars after them
+        self._fitted_at = self._bar_count
 
-        data["direction"] = np.sign(data["returns"])
+    def fit_model(self):
+        print("Fitting model on past 7 days...")
 
-        pd.set_option("max_columns", None)
+        # the same bars setup_history() bootstraps from, the second read only downloads the newest candles
+        data = self.history_bars(7)
 
-        feature_columns = []
+        if data is None:
+            raise Exception("No history to fit the model on")
 
-        for lag in range(1, self._lags + 1):
-            data[f"lag{lag}"] = data["returns"].shift(lag)
-            feature_columns.append(f"lag{lag}")
+        self.set_model(
+            _fit(data["mid_price"].to_numpy(dtype=float), self._lags, self.model_spec(), self.window(data.index[-1]))
+        )
 
-        data.dropna(inplace=True)
+        print("Model fitted.")
 
-        model = LogisticRegression(C=1e6, max_iter=100000, multi_class="ovr")
-        model.fit(data[feature_columns], data["direction"])
+    def model_spec(self):
+        """
+        Returns:
+            Returns a dict describing the model's features, which its fits are stored under, see ModelStore
+        """
+        return {
+            "strategy": "MLClassificationLive",
+            "instrument": self._instrument,
+            "bar_length": str(self._bar_length),
+            "lags": self._lags,
+        }
+
+    def window(self, end):
+        """
+        Names the training window ending with the bar at end, by the retrain period it falls in (a day if the model
+        is never retrained), so the windows of a period share their fit in the ModelStore.
 
+        Args:
+            end (Pandas Timestamp): Time of the last bar of the window
+
+        Returns:
+            Returns the start of the period, as a string
+        """
+        period = self._bar_length * self._retrain_every if self._retrain_every else pd.Timedelta(days=1)
+
+        return str(end.floor(period))
+
+    def set_model(self, model):
+        """
+        Swaps in a fitted model, its parameters are replaced in a single assignment so a prediction never mixes
+        the coefficients of two models.
+
+        Args:
+            model (LogisticRegression): The fitted model
+        """
         self._model = model
 
-        data["pred"] = self._model.predict(data[feature_columns])
+        # the model's parameters, so a bar's prediction is a single dot product, see predict()
+        self._params = (model.coef_, model.intercept_, model.classes_)
 
-        print("Model fitted.")
+    def retrain(self):
+        """
+        Swaps in the model retrained in the background once it is ready, and starts the next retraining once
+        retrain_every bars were streamed since the last one. Called between bars, so the stream never waits on a fit.
+        """
+        if self._retraining is not None and self._retraining.done():
+            try:
+                self.set_model(self._retraining.result())
+                print("Model retrained.")
+            except Exception as e:
+                print(f"Retraining failed: {e}")
+
+            self._retraining = None
+
+        if (
+            self._retrain_every
+            and self._retraining is None
+            and self._bar_count - self._fitted_at >= self._retrain_every
+        ):
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=1)
+
+            # a copy, the bars keep changing while the prices are sent to the process
+            prices = self._bars.column("mid_price").copy()
+            self._retraining = self._executor.submit(
+                _fit, prices, self._lags, self.model_spec(), self.window(self._bars.last_time())
+            )
+            self._fitted_at = self._bar_count
+
+    def on_bar(self, mid_price):
+        if self._mid_price is not None:
+            # the newest bar return goes first, IE the features are [lag1, lag2, ..., lags]
+            self._features[1:] = self._features[:-1]
+            self._features[0] = np.log(mid_price / self._mid_price)
+
+        self._mid_price = mid_price
+        self._bar_count += 1
 
     def define_strategy(self):
-        data = self._raw_data.copy()
+        self.retrain()
+
+        # the features of the latest tick are the returns of the last lags bars
+        if self._bar_count <= self._lags:
+            self._signal = None
+            return
 
-        data = data.append(self._tick_data.iloc[-1])
-        data["returns"] = np.log(data["mid_price"] / data["mid_price"].shift())
+        self._signal = self.predict(self._features)
 
-        feature_columns = []
+    def predict(self, features):
+        """
+        Predicts the direction from one row of lag features, like the fitted model's predict() but without its
+        input validation, which costs far more than the dot product itself.
+
+        Args:
+            features (numpy array): The lagged returns, most recent first
 
-        for lag in range(1, self._lags + 1):
-            data[f"lag{lag}"] = data["returns"].shift(lag)
-            feature_columns.append(f"lag{lag}")
+        Returns:
+            Returns the predicted direction, 1, 0 or -1
+        """
+        coef, intercept, classes = self._params
 
-        data.dropna(inplace=True)
+        scores = coef @ features + intercept
 
-        # use the passed model to predict our positions
-        data["position"] = self._model.predict(data[feature_columns])
+        if len(scores) == 1:
+            return classes[int(scores[0] > 0)]
 
-        self._data = data.dropna().copy()
+        return classes[scores.argmax()]
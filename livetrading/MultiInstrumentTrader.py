@@ -0,0 +1,139 @@
+import tpqoa
+
+from helpers.CandleCache import CandleCache
+from livetrading.LatencyMonitor import LatencyMonitor
+from livetrading.LiveTrader import LiveTrader
+from livetrading.OrderWorker import OrderWorker
+
+
+class MultiInstrumentTrader(tpqoa.tpqoa):
+
+    """
+    Class implementing a live trading engine running many strategies over a single price stream.
+    Strategies (IE SMALive, BollingerBandsLive) created with broker=engine share the engine's OANDA session and
+    order worker instead of opening their own, and the engine streams the prices of all their instruments at once,
+    handing every tick to the strategies trading that instrument.
+
+    Example:
+        engine = MultiInstrumentTrader("oanda.cfg")
+        SMALive("oanda.cfg", "EUR_USD", "1min", 10, 50, 1000, broker=engine)
+        MomentumLive("oanda.cfg", "GBP_USD", "30s", 3, 1000, broker=engine)
+        engine.run()
+    """
+    def __init__(self, cfg, latency=None):
+        """
+        Initializes the MultiInstrumentTrader object.
+
+        Args:
+            cfg (string): Path to the OANDA configuration file
+            latency (LatencyMonitor) <DEFAULT = None>: Where the timings of every strategy's live path are recorded
+        """
+        LiveTrader.check_market_hours()
+
+        # passes the config file to tpqoa
+        super().__init__(cfg)
+
+        self._cfg = cfg
+        self._traders = {}
+        self._orders = OrderWorker()
+        self._latency = latency if latency is not None else LatencyMonitor()
+        self._cache = CandleCache(cfg, verbose=False)
+
+        self.stop_stream = False
+
+    def __repr__(self):
+        """Custom Representation."""
+        return f"MultiInstrumentTrader( instruments={list(self._traders)} )"
+
+    def session(self):
+        """
+        Retrieves the OANDA session strategies created with broker=self share.
+
+        Returns:
+            Returns a dict of the tpqoa connection attributes (contexts, account id, configuration)
+        """
+        return {name: value for name, value in vars(self).items() if not name.startswith("_")}
+
+    def order_worker(self):
+        """
+        Retrieves the order worker all of the engine's strategies place their orders through.
+
+        Returns:
+            Returns an OrderWorker object
+        """
+        return self._orders
+
+    def latency_monitor(self):
+        """
+        Retrieves the latency monitor all of the engine's strategies record their timings to.
+
+        Returns:
+            Returns a LatencyMonitor object
+        """
+        return self._latency
+
+    def history_bars(self, instrument, bar_length, days):
+        """
+        Retrieves the complete bars of the past days for a strategy, through the engine's candle cache.
+
+        Args:
+            instrument (string): A string holding the ticker instrument of instrument to be retrieved
+            bar_length (Pandas Timedelta): Length of each bar
+            days (int): Amount of prior days history to retrieve
+
+        Returns:
+            Returns a Pandas dataframe indexed by time (UTC) with the mid_price column
+        """
+        return LiveTrader.download_bars(self._cache, instrument, bar_length, days)
+
+    def register(self, trader):
+        """
+        Adds a strategy to the engine, called by LiveTrader when created with broker=self.
+
+        Args:
+            trader (LiveTrader): The strategy, trading its own instrument
+        """
+        self._traders.setdefault(trader._instrument, []).append(trader)
+
+    def run(self):
+        """
+        Streams the prices of every registered instrument over one connection, and hands each tick to the
+        strategies trading its instrument. Returns once every strategy has stopped, or stop_stream is set.
+        """
+        if not self._traders:
+            print("No strategies registered, create them with broker=self first.")
+            return
+
+        print(f"Streaming {', '.join(self._traders)}...")
+
+        response = self.ctx_stream.pricing.stream(
+            self.account_id, snapshot=True, instruments=",".join(self._traders)
+        )
+
+        for msg_type, msg in response.parts():
+            if msg_type == "pricing.ClientPrice":
+                traders = self._traders.get(msg.instrument)
+
+                if traders:
+                    bid = float(msg.bids[0].dict()["price"])
+                    ask = float(msg.asks[0].dict()["price"])
+
+                    for trader in traders:
+                        trader.on_success(msg.time, bid, ask)
+
+                    # strategies that hit their stop are done, but the others keep trading
+                    self._traders[msg.instrument] = [trader for trader in traders if not trader.stop_stream]
+
+                    if not self._traders[msg.instrument]:
+                        del self._traders[msg.instrument]
+
+            if self.stop_stream or not self._traders:
+                break
+
+        print("Stream ended.")
+
+    def close_positions(self):
+        """Closes the positions of every strategy, once their pending orders went through."""
+        for traders in self._traders.values():
+            for trader in traders:
+                trader.close_position()
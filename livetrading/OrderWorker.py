@@ -0,0 +1,111 @@
+import queue
+import threading
+import time
+
+
+class OrderWorker:
+
+    """
+    Class implementing a background thread that submits the orders of one or many live traders.
+    The stream callback only puts the wanted position on a queue and returns, while this thread makes the HTTP
+    order requests. Positions queued while an order is in flight are coalesced, only the latest one of each
+    trader is traded.
+    """
+    def __init__(self, inline=False):
+        """
+        Initializes the OrderWorker object, and starts its thread.
+
+        Args:
+            inline (bool) <DEFAULT = False>: Places every order on the submitting thread instead, as soon as it is
+                submitted, IE to replay a stream deterministically
+        """
+        self._queue = queue.Queue()
+        self._thread = None
+
+        if not inline:
+            self._thread = threading.Thread(target=self._run, name="OrderWorker", daemon=True)
+            self._thread.start()
+
+    def __repr__(self):
+        """Custom Representation."""
+        return f"OrderWorker( pending={self._queue.qsize()} )"
+
+    def submit(self, position, execute, tick=None):
+        """
+        Queues a position to be traded to, without waiting for the order.
+
+        Args:
+            position (int): The wanted position, 1 (long), 0 (neutral) or -1 (short)
+            execute (function): Called on the worker thread as execute(position, tick, queued), IE
+                LiveTrader.execute_order, where queued is when the position was submitted (perf_counter_ns)
+            tick (int) <DEFAULT = None>: When the tick behind the position arrived (perf_counter_ns), passed along
+        """
+        item = (execute, position, tick, time.perf_counter_ns())
+
+        if self._thread is None:
+            self._process([item])
+            return
+
+        self._queue.put(item)
+
+    def flush(self):
+        """Blocks until every queued position has been traded."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+            return
+
+        # the thread is gone (IE the interpreter is shutting down), so trade what is left on this one
+        items = []
+        while True:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+        if items:
+            self._process(items)
+
+            for _ in items:
+                self._queue.task_done()
+
+    def stop(self):
+        """Trades the queued positions, then stops the thread."""
+        if self._thread is None:
+            return
+
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+
+            # a burst of signals only needs its latest position
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                self._process(items)
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+
+            if None in items:
+                return
+
+    def _process(self, items):
+        # the latest position of each trader (with its timestamps), in the order the traders first asked
+        positions = {}
+        for item in items:
+            if item is not None:
+                execute, *order = item
+                positions[execute] = order
+
+        for execute, (position, tick, queued) in positions.items():
+            try:
+                execute(position, tick, queued)
+            except Exception as e:
+                print(f"Order failed: {e}")
@@ -0,0 +1,263 @@
+import contextlib
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from livetrading.LatencyMonitor import LatencyMonitor
+from livetrading.OrderWorker import OrderWorker
+
+
+class ReplayBroker:
+
+    """
+    Class implementing an offline stand-in for OANDA, replaying recorded or synthetic ticks into live strategies.
+    Strategies created with broker=replay run their production code unchanged: every tick goes through on_success()
+    as fast as it can be processed, and their orders are filled by a simulated broker at the tick's bid or ask,
+    placed inline so a replay is deterministic. Useful to benchmark the live path, and to test strategies offline.
+
+    Example:
+        replay = ReplayBroker(history=TickRecorder.read("history.ticks"))
+        SMALive("oanda.cfg", "EUR_USD", "1min", 10, 50, 1000, broker=replay)
+        replay.run(TickRecorder.read("session.ticks"))
+        replay.get_fills()
+    """
+    def __init__(self, history=None, latency=None):
+        """
+        Initializes the ReplayBroker object.
+
+        Args:
+            history (Pandas dataframe or dict) <DEFAULT = None>: Prices preceding the replay that strategies bootstrap
+                from, indexed by time (UTC) with a mid_price column or bid_price and ask_price columns (IE
+                TickRecorder.read()), or a dict of them by instrument. Without history, strategies warm up on the
+                replayed ticks
+            latency (LatencyMonitor) <DEFAULT = None>: Where the timings of every strategy's live path are recorded
+        """
+        self._history = history
+        self._latency = latency if latency is not None else LatencyMonitor()
+        self._orders = OrderWorker(inline=True)
+        self._traders = {}
+
+        # latest (bid, ask) of every instrument, orders are filled at it
+        self._prices = {}
+        self._time = None
+
+        # units held and their average price, by instrument
+        self._positions = {}
+        self._fills = []
+
+    def __repr__(self):
+        """Custom Representation."""
+        return f"ReplayBroker( instruments={list(self._traders)}, fills={len(self._fills)} )"
+
+    def session(self):
+        """
+        Returns:
+            Returns an empty dict, there is no OANDA session to share
+        """
+        return {}
+
+    def order_worker(self):
+        """
+        Returns:
+            Returns an OrderWorker placing every order inline
+        """
+        return self._orders
+
+    def latency_monitor(self):
+        """
+        Returns:
+            Returns the LatencyMonitor all of the replayed strategies record their timings to
+        """
+        return self._latency
+
+    def history_bars(self, instrument, bar_length, days):
+        """
+        Builds the complete bars of the last days of history, like LiveTrader.download_bars() does from candles.
+
+        Args:
+            instrument (string): A string holding the ticker instrument of instrument to be retrieved
+            bar_length (Pandas Timedelta): Length of each bar
+            days (int): Amount of days history to retrieve, before the end of the history
+
+        Returns:
+            Returns a Pandas dataframe indexed by time (UTC) with the mid_price column, or None if there is no history
+        """
+        history = self._history
+        if isinstance(history, dict):
+            history = history.get(instrument)
+
+        if history is None or not len(history):
+            return None
+
+        if "mid_price" in history:
+            mid_price = history["mid_price"]
+        else:
+            mid_price = (history["ask_price"] + history["bid_price"]) / 2
+
+        mid_price = mid_price.loc[mid_price.index[-1] - pd.Timedelta(days=days):]
+
+        return (
+            mid_price.to_frame("mid_price")
+            .resample(bar_length, label="right")
+            .last()
+            .dropna()
+            .iloc[:-1]
+        )
+
+    def register(self, trader):
+        """
+        Adds a strategy to the replay, called by LiveTrader when created with broker=self.
+
+        Args:
+            trader (LiveTrader): The strategy, trading its own instrument
+        """
+        self._traders.setdefault(trader._instrument, []).append(trader)
+
+    def create_order(self, instrument, units, suppress=True, ret=True):
+        """
+        Fills an order at the latest price of the instrument, buying at the ask and selling at the bid.
+        Mirrors the signature and output of tpqoa.create_order.
+
+        Args:
+            instrument (string): A string holding the ticker instrument of instrument to be traded
+            units (int): Units to buy, or to sell if negative
+            suppress (bool) <DEFAULT = True>: Unused, nothing is printed
+            ret (bool) <DEFAULT = True>: Unused, the fill is always returned
+
+        Returns:
+            Returns a dict of the fill, with the time, instrument, units, price and pl (realized profit) keys
+        """
+        bid, ask = self._prices[instrument]
+        price = ask if units > 0 else bid
+
+        held, average = self._positions.get(instrument, (0, 0.0))
+
+        # the part of the order reducing the position realizes its profit, the rest opens a new one
+        closed = 0
+        if held and np.sign(units) != np.sign(held):
+            closed = -np.sign(held) * min(abs(units), abs(held))
+
+        pl = -closed * (price - average)
+
+        remaining = held + units
+        if remaining == 0:
+            average = 0.0
+        elif np.sign(remaining) != np.sign(held):
+            average = price
+        elif abs(remaining) > abs(held):
+            average = (held * average + units * price) / remaining
+
+        self._positions[instrument] = (remaining, average)
+
+        fill = {
+            "time": self._time,
+            "instrument": instrument,
+            "units": units,
+            "price": price,
+            "pl": pl,
+        }
+        self._fills.append(fill)
+
+        return fill
+
+    def run(self, ticks, quiet=True):
+        """
+        Feeds the ticks through the registered strategies as fast as they are processed, then closes their positions.
+
+        Args:
+            ticks (Pandas dataframe): Ticks indexed by time (UTC) with the bid_price and ask_price columns, IE
+                TickRecorder.read() or random_ticks(). With an instrument column each tick only goes to the strategies
+                trading it, otherwise to every strategy
+            quiet (bool) <DEFAULT = True>: Silences what the strategies print while replaying
+
+        Returns:
+            Returns the throughput, in ticks per second
+        """
+        if not self._traders:
+            print("No strategies registered, create them with broker=self first.")
+            return 0
+
+        # the same RFC3339 strings the OANDA stream sends, so parsing them is part of the measured path
+        times = np.datetime_as_string(ticks.index.values.astype("datetime64[ns]"), unit="ns")
+        bids = ticks["bid_price"].to_numpy(dtype=float)
+        asks = ticks["ask_price"].to_numpy(dtype=float)
+
+        if "instrument" in ticks:
+            instruments = ticks["instrument"].to_numpy()
+        else:
+            instruments = [None] * len(ticks)
+
+        output = open(os.devnull, "w") if quiet else None
+        start = time.perf_counter()
+
+        with contextlib.redirect_stdout(output) if quiet else contextlib.nullcontext():
+            for tick_time, bid, ask, instrument in zip(times, bids, asks, instruments):
+                tick_time = tick_time + "Z"
+                self._time = tick_time
+
+                for name in [instrument] if instrument is not None else list(self._traders):
+                    traders = self._traders.get(name)
+
+                    if not traders:
+                        continue
+
+                    self._prices[name] = (bid, ask)
+
+                    for trader in traders:
+                        trader.on_success(tick_time, bid, ask)
+
+                    # strategies that hit their stop are done, but the others keep trading
+                    self._traders[name] = [trader for trader in traders if not trader.stop_stream]
+
+            elapsed = time.perf_counter() - start
+
+            for traders in self._traders.values():
+                for trader in traders:
+                    trader.close_position()
+
+        if output is not None:
+            output.close()
+
+        throughput = len(ticks) / elapsed if elapsed > 0 else float("inf")
+        print(f"Replayed {len(ticks)} ticks in {elapsed:.2f}s ({throughput:,.0f} ticks/sec), {len(self._fills)} fills.")
+
+        return throughput
+
+    def get_fills(self):
+        """
+        Retrieves the simulated fills.
+
+        Returns:
+            Returns a Pandas dataframe with the time, instrument, units, price and pl columns, one row per order
+        """
+        return pd.DataFrame(self._fills, columns=["time", "instrument", "units", "price", "pl"])
+
+    @staticmethod
+    def random_ticks(count, start="2022-01-03", frequency="1s", price=1.1, spread=0.00012, volatility=2e-5, seed=0):
+        """
+        Generates synthetic ticks following a random walk, IE to benchmark a strategy without a recording.
+
+        Args:
+            count (int): Number of ticks
+            start (string or datetime) <DEFAULT = "2022-01-03">: Time of the first tick (UTC)
+            frequency (string) <DEFAULT = "1s">: Time between two ticks
+            price (float) <DEFAULT = 1.1>: Mid price of the first tick
+            spread (float) <DEFAULT = 0.00012>: Spread between the ask and the bid
+            volatility (float) <DEFAULT = 2e-5>: Standard deviation of the log return between two ticks
+            seed (int) <DEFAULT = 0>: Seed of the random walk, the same seed gives the same ticks
+
+        Returns:
+            Returns a Pandas dataframe indexed by time (UTC), with the bid_price and ask_price columns
+        """
+        rng = np.random.default_rng(seed)
+        mid = price * np.exp(np.cumsum(rng.normal(0, volatility, count)))
+
+        return pd.DataFrame(
+            {
+                "bid_price": np.round(mid - spread / 2, 5),
+                "ask_price": np.round(mid + spread / 2, 5),
+            },
+            index=pd.date_range(start, periods=count, freq=frequency, tz="UTC"),
+        )
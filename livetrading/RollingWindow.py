@@ -0,0 +1,93 @@
+import math
+
+
+class RollingWindow:
+
+    """
+    Class implementing a streaming indicator over the last size values of a series.
+    Each update costs O(1): the mean and the sum of squared deviations are maintained with a sliding version of
+    Welford's algorithm, and every time the window has been fully replaced they are recomputed exactly from the
+    stored values, so rounding errors can never build up over a long session.
+    """
+    def __init__(self, size):
+        """
+        Initializes the RollingWindow object.
+
+        Args:
+            size (int): Number of most recent values the window covers
+        """
+        self._size = size
+        self._values = [0.0] * size
+        self._count = 0
+
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def __repr__(self):
+        """Custom Representation."""
+        return f"RollingWindow( size={self._size}, count={self._count} )"
+
+    def __len__(self):
+        return min(self._count, self._size)
+
+    @property
+    def full(self):
+        """Whether size values have been seen, IE whether the indicators are defined (like a Pandas rolling window)."""
+        return self._count >= self._size
+
+    def update(self, value):
+        """
+        Adds the newest value, dropping the oldest one once the window is full.
+
+        Args:
+            value (float): The newest value of the series
+        """
+        slot = self._count % self._size
+
+        if self._count < self._size:
+            n = self._count + 1
+            delta = value - self._mean
+            self._mean += delta / n
+            self._m2 += delta * (value - self._mean)
+        else:
+            oldest = self._values[slot]
+            mean = self._mean + (value - oldest) / self._size
+            self._m2 += (value - oldest) * (value - mean + oldest - self._mean)
+            self._mean = mean
+
+        self._values[slot] = value
+        self._count += 1
+
+        if self._count % self._size == 0:
+            self._recompute()
+
+    def mean(self):
+        """
+        Returns:
+            Returns the mean of the window, or None until the window is full
+        """
+        return self._mean if self.full else None
+
+    def std(self, ddof=1):
+        """
+        Args:
+            ddof (int) <DEFAULT = 1>: Delta degrees of freedom, 1 matches Pandas' rolling().std()
+
+        Returns:
+            Returns the standard deviation of the window, or None until the window is full
+        """
+        if not self.full or self._size <= ddof:
+            return None
+
+        return math.sqrt(max(self._m2, 0.0) / (self._size - ddof))
+
+    def oldest(self):
+        """
+        Returns:
+            Returns the oldest value in the window (the one the next update drops), or None until the window is full
+        """
+        return self._values[self._count % self._size] if self.full else None
+
+    def _recompute(self):
+        self._mean = sum(self._values) / self._size
+        self._m2 = sum((value - self._mean) ** 2 for value in self._values)
@@ -1,6 +1,5 @@
-import numpy as np
-
 from livetrading.LiveTrader import LiveTrader
+from livetrading.RollingWindow import RollingWindow
 
 
 class SMALive(LiveTrader):
@@ -15,6 +14,10 @@ class SMALive(LiveTrader):
         stop_datetime=None,
         stop_loss=None,
         stop_profit=None,
+        spill_path=None,
+        broker=None,
+        latency=None,
+        tick_log=None,
     ):
         """
         Initializes the SMALive object.
@@ -28,11 +31,18 @@ class SMALive(LiveTrader):
             stop_datetime (object) <DEFAULT = None>: A datetime object that when passed stops trading
             stop_loss (float) <DEFAULT = None>: A stop loss that when profit goes below stops trading
             stop_profit (float) <DEFAULT = None>: A stop profit that when profit goes above stops trading
+            spill_path (string) <DEFAULT = None>: File the bars older than max_lookback() are appended to
+            broker (MultiInstrumentTrader) <DEFAULT = None>: An engine to trade on instead of streaming on its own
+            latency (LatencyMonitor) <DEFAULT = None>: Where the timings of the live path are recorded
+            tick_log (string) <DEFAULT = None>: File every streamed tick is appended to, see TickRecorder
         """
         # these should be in terms of minutes
         self._smas = smas
         self._smal = smal
 
+        self._smas_window = RollingWindow(smas)
+        self._smal_window = RollingWindow(smal)
+
         # passes params to the parent class
         super().__init__(
             cfg,
@@ -42,12 +52,22 @@ class SMALive(LiveTrader):
             stop_datetime=stop_datetime,
             stop_loss=stop_loss,
             stop_profit=stop_profit,
+            spill_path=spill_path,
+            broker=broker,
+            latency=latency,
+            tick_log=tick_log,
         )
 
+    def max_lookback(self):
+        return max(self._smas, self._smal)
+
+    def on_bar(self, mid_price):
+        self._smas_window.update(mid_price)
+        self._smal_window.update(mid_price)
+
     def define_strategy(self):
-        data = self._raw_data.copy()
-        data["smas"] = data["mid_price"].rolling(self._smas).mean()
-        data["smal"] = data["mid_price"].rolling(self._smal).mean()
-        data["position"] = np.where(data["smas"] > data["smal"], 1, -1)
+        if not self._smas_window.full or not self._smal_window.full:
+            self._signal = None
+            return
 
-        self._data = data.dropna().copy()
+        self._signal = 1 if self._smas_window.mean() > self._smal_window.mean() else -1
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+
+class TickRecorder:
+
+    """
+    Class implementing an append-only binary log of streamed ticks.
+    Each tick is a fixed-size 24 byte record (time in nanoseconds, bid, ask), buffered in memory and appended to the
+    file in blocks, so recording costs next to nothing on the stream. A log can be read back with read(), IE to
+    replay it through a ReplayBroker.
+    """
+    dtype = np.dtype([("time", "<i8"), ("bid", "<f8"), ("ask", "<f8")])
+
+    def __init__(self, path, buffer_size=4096):
+        """
+        Initializes the TickRecorder object.
+
+        Args:
+            path (string): File the ticks are appended to, created if it does not exist
+            buffer_size (int) <DEFAULT = 4096>: Number of ticks buffered before they are written
+        """
+        self._path = path
+        self._buffer = np.zeros(buffer_size, dtype=self.dtype)
+        self._count = 0
+        self._file = open(path, "ab")
+
+    def __repr__(self):
+        """Custom Representation."""
+        return f"TickRecorder( path={self._path} )"
+
+    def record(self, time, bid, ask):
+        """
+        Appends a tick to the log.
+
+        Args:
+            time (Pandas Timestamp): The time of the tick
+            bid (float): The bid price
+            ask (float): The ask price
+        """
+        self._buffer[self._count] = (time.value, bid, ask)
+        self._count += 1
+
+        if self._count == len(self._buffer):
+            self.flush()
+
+    def flush(self):
+        """Writes the buffered ticks to the file."""
+        if self._file is None:
+            return
+
+        if self._count:
+            self._file.write(self._buffer[:self._count].tobytes())
+            self._count = 0
+
+        self._file.flush()
+
+    def close(self):
+        """Writes the buffered ticks, and closes the file."""
+        if self._file is None:
+            return
+
+        self.flush()
+        self._file.close()
+        self._file = None
+
+    @classmethod
+    def read(cls, path):
+        """
+        Reads a tick log.
+
+        Args:
+            path (string): Path to the log
+
+        Returns:
+            Returns a Pandas dataframe indexed by time (UTC), with the bid_price and ask_price columns
+        """
+        records = np.fromfile(path, dtype=cls.dtype)
+
+        return pd.DataFrame(
+            {"bid_price": records["bid"], "ask_price": records["ask"]},
+            index=pd.to_datetime(records["time"], utc=True),
+        )
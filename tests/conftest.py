@@ -0,0 +1,91 @@
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+class FakeOanda:
+
+    """
+    Stands in for tpqoa, serving deterministic candles on weekdays (every day with weekends=True), like OANDA:
+    the candles of [start, end), or [start, end] with inclusive=True. Like tpqoa, get_history() raises a KeyError
+    for a range without candles, ctx.instrument.candles() returns the raw response, and
+    ctx_stream.pricing.stream() streams the ticks put in self.ticks.
+    """
+    frequencies = {"S5": "5s", "M1": "1min", "H1": "60min", "D": "1D"}
+
+    def __init__(self, inclusive=False, weekends=False):
+        self.inclusive = inclusive
+        self.weekends = weekends
+        self.requests = 0
+        self.ctx = self
+        self.ctx_stream = self
+        self.instrument = self
+        self.pricing = self
+        self.account_id = "fake"
+
+        # (instrument, time, bid, ask) of every tick to stream
+        self.ticks = []
+
+    def times(self, start, end, granularity="H1"):
+        frequency = self.frequencies.get(granularity, "60min")
+
+        start = pd.Timestamp(start).tz_localize(None).ceil(frequency)
+        times = pd.date_range(start, pd.Timestamp(end).tz_localize(None), freq=frequency)
+        times = times[times < pd.Timestamp(end).tz_localize(None)] if not self.inclusive else times
+
+        return times if self.weekends else times[times.dayofweek < 5]
+
+    def get_history(self, instrument, start, end, granularity, price, localize=True):
+        self.requests += 1
+        times = self.times(start, end, granularity)
+
+        if not len(times):
+            raise KeyError("time")
+
+        # a price of each hour, the same whatever range it is served in
+        hours = (times - pd.Timestamp("2020-01-01")) // pd.Timedelta(hours=1)
+        close = np.round(1.1 + 0.01 * np.sin(hours.values / 7.0), 5)
+
+        return pd.DataFrame(
+            {"o": close, "h": close, "l": close, "c": close, "volume": 1, "complete": True},
+            index=times,
+        )
+
+    def candles(self, instrument, fromTime, toTime, granularity, price):
+        self.requests += 1
+        return {"candles": [{"time": time.isoformat()} for time in self.times(fromTime, toTime, granularity)]}
+
+    def stream(self, account_id, snapshot=True, instruments=""):
+        instruments = instruments.split(",")
+        return FakeStream([tick for tick in self.ticks if tick[0] in instruments])
+
+
+class FakeStream:
+
+    """The response of a pricing stream, whose parts() are the ticks as tpqoa's pricing.ClientPrice messages."""
+    def __init__(self, ticks):
+        self.ticks = ticks
+
+    def parts(self):
+        for instrument, time, bid, ask in self.ticks:
+            message = types.SimpleNamespace(
+                instrument=instrument,
+                time=time,
+                bids=[types.SimpleNamespace(dict=lambda price=bid: {"price": str(price)})],
+                asks=[types.SimpleNamespace(dict=lambda price=ask: {"price": str(price)})],
+            )
+            yield "pricing.ClientPrice", message
+
+
+@pytest.fixture
+def oanda(monkeypatch):
+    """Serves the candles of every HistoryDownloader (and CandleCache) from a FakeOanda."""
+    pytest.importorskip("tpqoa")
+    from helpers.HistoryDownloader import HistoryDownloader
+
+    fake = FakeOanda()
+    monkeypatch.setattr(HistoryDownloader, "_connection", lambda self: fake)
+
+    return fake
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from livetrading.BarBuilder import BarBuilder
+
+
+def _ticks(start, end, seed=0):
+    rng = np.random.default_rng(seed)
+    times = pd.date_range(start, end, freq="13s", tz="UTC")
+    times = times[rng.random(len(times)) < 0.3]
+    bid = np.round(1.1 + np.cumsum(rng.normal(0, 1e-5, len(times))), 5)
+
+    return pd.DataFrame({"bid": bid, "ask": bid + 0.0001}, index=times)
+
+
+def _build(ticks, bar_length):
+    builder = BarBuilder(pd.Timedelta(bar_length))
+
+    bars = []
+    for time, bid, ask in zip(ticks.index, ticks["bid"], ticks["ask"]):
+        bars += builder.update(time, bid, ask)
+
+    return pd.DataFrame(bars, columns=["time", "bid", "ask"]).set_index("time")
+
+
+@pytest.mark.parametrize("bar_length", ["1min", "5min", "7min", "25min", "1h"])
+def test_bars_match_resample(bar_length):
+    ticks = _ticks("2021-03-01 00:00:05", "2021-03-01 23:59:59")
+
+    expected = ticks.resample(bar_length, label="right").last().ffill().iloc[:-1]
+
+    pd.testing.assert_frame_equal(_build(ticks, bar_length), expected, check_freq=False, check_names=False, check_index_type=False)
+
+
+def test_every_day_starts_a_new_grid():
+    ticks = _ticks("2021-03-01 22:00:00", "2021-03-02 02:00:00")
+
+    labels = _build(ticks, "7min").index
+
+    # the last bar of the day ends past midnight, the next day's bars are aligned to its midnight
+    assert pd.Timestamp("2021-03-02 00:02", tz="UTC") in labels
+    assert pd.Timestamp("2021-03-02 00:07", tz="UTC") in labels
+    later = labels[labels > pd.Timestamp("2021-03-02 00:02", tz="UTC")]
+    assert ((later.hour * 60 + later.minute) % 7 == 0).all()
@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("tpqoa")
+
+from helpers.CandleCache import CandleCache
+
+
+def _cache(tmp_path, name):
+    return CandleCache("oanda.cfg", directory=str(tmp_path / name), verbose=False)
+
+
+@pytest.mark.parametrize("inclusive", [False, True])
+def test_the_same_range_whatever_is_cached(oanda, tmp_path, inclusive):
+    oanda.inclusive = inclusive
+
+    fresh = _cache(tmp_path, "fresh").get_history("EUR_USD", "2020-01-06", "2020-02-03", "H1", "M")
+
+    # the range that follows is cached first, it starts where the requested range ends
+    after = _cache(tmp_path, "after")
+    after.get_history("EUR_USD", "2020-02-03", "2020-03-02", "H1", "M")
+    cached_after = after.get_history("EUR_USD", "2020-01-06", "2020-02-03", "H1", "M")
+
+    # a range covering the requested one is cached first
+    covering = _cache(tmp_path, "covering")
+    covering.get_history("EUR_USD", "2020-01-01", "2020-03-02", "H1", "M")
+    requests = oanda.requests
+    cached_covering = covering.get_history("EUR_USD", "2020-01-06", "2020-02-03", "H1", "M")
+
+    assert oanda.requests == requests
+    assert fresh.index[0] == pd.Timestamp("2020-01-06")
+    assert fresh.index[-1] < pd.Timestamp("2020-02-03")
+    pd.testing.assert_frame_equal(cached_after, fresh)
+    pd.testing.assert_frame_equal(cached_covering, fresh)
+
+
+def test_weekend_ranges_are_empty(oanda, tmp_path):
+    cache = _cache(tmp_path, "weekend")
+
+    weekend = cache.get_history("EUR_USD", "2020-01-04", "2020-01-06", "H1", "M")
+    requests = oanda.requests
+    again = cache.get_history("EUR_USD", "2020-01-04", "2020-01-06", "H1", "M")
+
+    assert weekend.empty and again.empty
+    assert oanda.requests == requests
@@ -0,0 +1,48 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("tpqoa")
+
+from helpers.HistoryDownloader import HistoryDownloader
+
+
+def test_a_malformed_response_is_retried(oanda):
+    get_history = oanda.get_history
+    failures = []
+
+    def malformed_once(*args, **kwargs):
+        # fails like tpqoa indexing a response without candles, for a range that does have some
+        if not failures:
+            failures.append(args)
+            raise KeyError("time")
+        return get_history(*args, **kwargs)
+
+    oanda.get_history = malformed_once
+
+    downloader = HistoryDownloader(max_workers=1, verbose=False)
+    df = downloader.get_history("EUR_USD", "2020-01-06", "2020-01-08", "H1", "M")
+
+    assert len(failures) == 1
+    pd.testing.assert_frame_equal(df, get_history("EUR_USD", "2020-01-06", "2020-01-08", "H1", "M"))
+
+
+def test_a_range_without_candles_is_empty(oanda):
+    downloader = HistoryDownloader(verbose=False)
+
+    df = downloader.get_history("EUR_USD", "2020-01-04", "2020-01-06", "H1", "M")
+
+    assert df.empty
+    assert list(df.columns) == ["o", "h", "l", "c", "volume", "complete"]
+
+
+def test_the_thread_pool_is_kept_between_downloads(oanda):
+    downloader = HistoryDownloader(verbose=False)
+
+    downloader.get_history("EUR_USD", "2020-01-06", "2020-01-08", "H1", "M")
+    executor = downloader._executor
+    downloader.get_history("EUR_USD", "2020-01-08", "2020-01-10", "H1", "M")
+
+    assert executor is not None and downloader._executor is executor
+
+    downloader.close()
+    assert downloader._executor is None
@@ -0,0 +1,180 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("tpqoa")
+
+from backtesting.IterativeBacktest import IterativeBacktest
+from backtesting.TradeJournal import TradeJournal
+from helpers.CandleCache import CandleCache
+
+BARS = 2000
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    def get_histories(self, instrument, start, end, granularity, prices=("B", "A"), localize=True):
+        # a random walk quoted in 5 decimals, with a spread of 1 to 2 pips
+        rng = np.random.default_rng(0)
+        bid = (110000 + np.cumsum(rng.integers(-20, 21, size=BARS))) / 1e5
+        ask = bid + rng.integers(10, 21, size=BARS) / 1e5
+
+        index = pd.date_range(start, periods=BARS, freq="60min")
+        return [pd.DataFrame({"c": price}, index=index) for price in (bid, ask)]
+
+    monkeypatch.setattr(CandleCache, "get_histories", get_histories)
+
+
+def _backtest():
+    return IterativeBacktest("oanda.cfg", "EUR_USD", "2021-01-04", "2021-04-01", 100000, granularity="H1", verbose=0)
+
+
+def _rewind(backtest):
+    # back to the initial balance, keeping the indicators the last test prepared
+    backtest._position = 0
+    backtest._trades = 0
+    backtest._units = 0
+    backtest._current_balance = backtest._initial_balance
+    backtest._journal.clear()
+
+
+def _per_bar(backtest, strategy):
+    """The original bar by bar loops of the strategies, run over the data the last test prepared."""
+    data = backtest._data
+
+    for bar in range(len(data) - 1):
+        if strategy == "sma":
+            if data["smas"].iloc[bar] > data["smal"].iloc[bar]:
+                target = 1
+            elif data["smas"].iloc[bar] < data["smal"].iloc[bar]:
+                target = -1
+            else:
+                target = backtest._position
+        elif strategy == "contrarian":
+            target = 1 if data["rolling_returns"].iloc[bar] <= 0 else -1
+        elif strategy == "momentum":
+            target = -1 if data["rolling_returns"].iloc[bar] <= 0 else 1
+        else:
+            price = data["bid_price"].iloc[bar]
+            target = backtest._position
+
+            if backtest._position == 0:
+                if price < data["lower"].iloc[bar]:
+                    target = 1
+                elif price > data["upper"].iloc[bar]:
+                    target = -1
+            elif backtest._position == 1:
+                if price > data["sma"].iloc[bar]:
+                    target = -1 if price > data["upper"].iloc[bar] else 0
+            elif price < data["sma"].iloc[bar]:
+                target = 1 if price < data["lower"].iloc[bar] else 0
+
+        if target == backtest._position:
+            continue
+
+        if target == 1:
+            backtest.go_long(bar, amount="all")
+        elif target == -1:
+            backtest.go_short(bar, amount="all")
+        elif backtest._position == 1:
+            backtest.sell(bar, units=backtest._units)
+        else:
+            backtest.buy(bar, units=-backtest._units)
+
+        backtest._position = target
+
+    backtest.close_position(bar + 1)
+
+
+TESTS = [
+    ("sma", "test_sma", (20, 100)),
+    ("sma", "test_sma", (5, 30)),
+    ("contrarian", "test_contrarian", (3,)),
+    ("momentum", "test_momentum", (1,)),
+    ("momentum", "test_momentum", (12,)),
+    ("bollinger", "test_bollinger_bands", (30, 2)),
+    ("bollinger", "test_bollinger_bands", (10, 1)),
+]
+
+
+@pytest.mark.parametrize("strategy, method, params", TESTS)
+def test_execute_matches_the_per_bar_loop(strategy, method, params):
+    backtest = _backtest()
+
+    getattr(backtest, method)(*params)
+    balance, trades, journal = backtest._current_balance, backtest._trades, backtest.get_trades()
+
+    _rewind(backtest)
+    _per_bar(backtest, strategy)
+
+    assert trades > 10
+    assert trades == backtest._trades
+    assert balance == backtest._current_balance
+    pd.testing.assert_frame_equal(journal, backtest.get_trades())
+
+
+@pytest.mark.parametrize("strategy, method, params", TESTS)
+def test_the_journal_adds_up_to_the_balance(strategy, method, params):
+    backtest = _backtest()
+    getattr(backtest, method)(*params)
+
+    trades = backtest.get_trades()
+    signed = np.where(trades["side"] == "buy", 1, -1) * trades["units"]
+
+    # every trade moves the balance by its value, and the position is closed at the end
+    balances = backtest._initial_balance - np.cumsum(signed * trades["price"])
+    np.testing.assert_allclose(trades["balance"], balances, rtol=0, atol=1e-6)
+    assert trades["balance"].iloc[-1] == backtest._current_balance
+    assert signed.sum() == 0
+
+    assert (trades.index == backtest._data.index[trades["bar"]]).all()
+    assert trades["bar"].is_monotonic_increasing
+    # buys pay the spread on top of the bid
+    bid = trades["price"] - np.where(trades["side"] == "buy", trades["spread"], 0)
+    np.testing.assert_allclose(bid, backtest._prices[trades["bar"]], rtol=0, atol=1e-12)
+
+
+def test_the_journal_grows_past_its_capacity():
+    journal = TradeJournal(capacity=1)
+
+    for bar in range(100):
+        journal.record(bar, 1 if bar % 2 else -1, bar + 1, 1.1 + bar / 1e5, 1e-4, 1000.0 + bar)
+
+    trades = journal.to_frame()
+
+    assert len(journal) == 100
+    assert list(trades["bar"]) == list(range(100))
+    assert list(trades["side"][:2]) == ["sell", "buy"]
+    assert trades["balance"].iloc[-1] == 1099.0
+
+    journal.clear()
+    assert len(journal.to_frame()) == 0
+
+
+def test_tests_restore_the_downloaded_data(monkeypatch):
+    downloads = []
+    get_histories = CandleCache.get_histories
+
+    def counted(self, *args, **kwargs):
+        downloads.append(args)
+        return get_histories(self, *args, **kwargs)
+
+    monkeypatch.setattr(CandleCache, "get_histories", counted)
+
+    backtest = _backtest()
+    raw = backtest._raw_data.copy()
+
+    # every test after the first one starts from the data the previous tests prepared and dropped rows of
+    for strategy, method, params in TESTS:
+        getattr(backtest, method)(*params)
+
+        fresh = _backtest()
+        getattr(fresh, method)(*params)
+
+        assert backtest._current_balance == fresh._current_balance
+        assert backtest._trades == fresh._trades
+        pd.testing.assert_frame_equal(backtest.get_trades(), fresh.get_trades())
+
+    # the candles were downloaded once per backtest, and never modified
+    assert len(downloads) == 1 + len(TESTS)
+    pd.testing.assert_frame_equal(backtest._raw_data, raw)
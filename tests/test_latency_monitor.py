@@ -0,0 +1,83 @@
+import json
+import math
+import threading
+import types
+import urllib.request
+
+import pytest
+
+import livetrading.LatencyMonitor as latency_monitor
+from livetrading.LatencyMonitor import LatencyMonitor
+
+NOW = 10 ** 12
+
+
+def _bounds(duration):
+    # the limits (in microseconds) of the logarithmic bucket holding a duration in nanoseconds
+    bucket = int(math.log2(duration) * LatencyMonitor.buckets_per_octave)
+    return (
+        2 ** (bucket / LatencyMonitor.buckets_per_octave) / 1e3,
+        2 ** ((bucket + 1) / LatencyMonitor.buckets_per_octave) / 1e3,
+    )
+
+
+@pytest.fixture
+def monitor(monkeypatch):
+    # a clock standing still, so every recorded duration is exactly NOW - start
+    monkeypatch.setattr(latency_monitor, "time", types.SimpleNamespace(perf_counter_ns=lambda: NOW))
+
+    monitor = LatencyMonitor()
+    for _ in range(97):
+        monitor.record("trade", NOW - 1000)
+    for _ in range(3):
+        monitor.record("trade", NOW - 1000000)
+
+    return monitor
+
+
+def test_percentiles_fall_in_their_buckets(monitor):
+    stats = monitor.summary().loc["trade"]
+
+    assert stats["count"] == 100
+    assert stats["mean_us"] == pytest.approx((97 * 1000 + 3 * 1000000) / 100 / 1e3)
+    assert stats["max_us"] == 1000
+
+    low, high = _bounds(1000)
+    assert low <= stats["p50_us"] <= high
+
+    # the 99th of 100 durations is one of the slow ones, capped by the max
+    low, high = _bounds(1000000)
+    assert low <= stats["p99_us"] <= min(high, stats["max_us"])
+
+    monitor.reset()
+    assert monitor.summary().empty
+
+
+def test_serves_the_summary(monitor):
+    monitor.serve(0)
+
+    try:
+        port = monitor._server.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}") as response:
+            served = json.load(response)
+    finally:
+        monitor.close()
+
+    assert served == monitor.summary().to_dict(orient="index")
+
+
+def test_threads_record_every_duration():
+    monitor = LatencyMonitor()
+
+    def record():
+        for _ in range(20000):
+            monitor.record("order", monitor.clock())
+
+    threads = [threading.Thread(target=record) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    count, _, _, buckets = monitor._stages["order"]
+    assert count == sum(buckets) == 80000
@@ -0,0 +1,84 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("tpqoa")
+
+from helpers.CandleCache import CandleCache
+from livetrading import LiveTrader as live_trader
+from livetrading.ReplayBroker import ReplayBroker
+from livetrading.SMALive import SMALive
+
+
+@pytest.fixture
+def replay():
+    return ReplayBroker(history=ReplayBroker.random_ticks(20000, start="2022-01-03", seed=1))
+
+
+def _failing(instrument, units, suppress=True, ret=True):
+    raise ConnectionError("order rejected")
+
+
+def test_a_failed_order_keeps_a_newer_target(replay):
+    trader = SMALive("oanda.cfg", "EUR_USD", "1min", 5, 20, 1000, broker=replay)
+    replay.create_order = _failing
+
+    # a newer position was already submitted while the order was in flight
+    trader._target = -1
+    with pytest.raises(ConnectionError):
+        trader.execute_order(1)
+
+    assert trader._target == -1
+
+    # otherwise the next signal retries from the position actually held
+    trader._target = 1
+    with pytest.raises(ConnectionError):
+        trader.execute_order(1)
+
+    assert trader._target == trader._position == 0
+
+
+def test_ticks_are_not_printed(replay, capsys):
+    trader = SMALive("oanda.cfg", "EUR_USD", "1min", 5, 20, 1000, broker=replay)
+    capsys.readouterr()
+
+    # the tick right after the history, like the stream sends it
+    tick = ReplayBroker.random_ticks(1, start=pd.Timestamp("2022-01-03") + pd.Timedelta("20000s"), seed=2)
+    time = tick.index[0].strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+    trader.on_success(time, tick["bid_price"].iloc[0], tick["ask_price"].iloc[0])
+
+    assert capsys.readouterr().out == ""
+
+
+def test_a_restart_only_downloads_the_bars_after_the_cache(oanda, monkeypatch, tmp_path):
+    # the candles are cached in the working directory
+    monkeypatch.chdir(tmp_path)
+
+    now = [datetime(2022, 1, 5, 12, 0, 20)]
+    monkeypatch.setattr(live_trader, "datetime", type("Clock", (), {"utcnow": staticmethod(lambda: now[0])}))
+
+    requests = []
+    get_history = oanda.get_history
+
+    def recording(instrument, start, end, granularity, price, localize=True):
+        requests.append((pd.Timestamp(start), pd.Timestamp(end)))
+        return get_history(instrument, start, end, granularity, price, localize)
+
+    oanda.get_history = recording
+
+    first = live_trader.LiveTrader.download_bars(CandleCache(verbose=False), "EUR_USD", pd.Timedelta("1min"), 1)
+    assert requests and min(start for start, _ in requests) == pd.Timestamp("2022-01-04 12:00:20")
+
+    # restarted 5 minutes later, with a new cache reading the same directory
+    now[0] = datetime(2022, 1, 5, 12, 5, 20)
+    del requests[:]
+
+    bars = live_trader.LiveTrader.download_bars(CandleCache(verbose=False), "EUR_USD", pd.Timedelta("1min"), 1)
+
+    # only the candles completed since the first download are requested
+    assert requests == [(pd.Timestamp("2022-01-05 12:00:20"), pd.Timestamp("2022-01-05 12:05:20"))]
+
+    assert bars.index[-1] == pd.Timestamp("2022-01-05 12:05", tz="UTC")
+    # and the bars both downloads have are the same
+    pd.testing.assert_frame_equal(bars.loc[:first.index[-1]], first.loc[bars.index[0]:])
@@ -0,0 +1,131 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("tpqoa")
+
+import backtesting.MLClassificationBacktest as ml_classification
+from backtesting.Backtester import Backtester
+from backtesting.MLClassificationBacktest import MLClassificationBacktest, _evaluate_config
+
+START = "2021-01-04"
+
+# a random walk of 120 days of hourly prices, quoted in 5 decimals
+PRICES = (110000 + np.cumsum(np.random.default_rng(0).integers(-20, 21, size=120 * 24))) / 1e5
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch, tmp_path):
+    def acquire_data(self):
+        index = pd.date_range(START, periods=len(PRICES), freq="60min")
+        df = pd.DataFrame({"price": PRICES}, index=index).loc[:self._end]
+        df["returns"] = np.log(df.price / df.price.shift(1))
+        return df
+
+    monkeypatch.setattr(Backtester, "acquire_data", acquire_data)
+    # the fitted models are stored in the working directory
+    monkeypatch.chdir(tmp_path)
+
+
+def _backtest(end="2021-05-04"):
+    return MLClassificationBacktest("EUR_USD", START, end, granularity="H1", trading_cost=1e-4)
+
+
+@pytest.mark.parametrize("window", ["expanding", "rolling"])
+def test_walk_forward_folds_never_look_ahead(window):
+    backtest = _backtest()
+    backtest.walk_forward(lags=3, train="30D", retrain="7D", window=window, processes=2)
+    folds = backtest.get_folds()
+
+    assert len(folds) > 5
+    assert (folds["train_end"] < folds["test_start"]).all()
+    assert (folds["test_start"] <= folds["test_end"]).all()
+    # the test periods follow each other without overlapping
+    assert (folds["test_start"].iloc[1:].values > folds["test_end"].iloc[:-1].values).all()
+
+    if window == "rolling":
+        assert (folds["train_start"] >= folds["test_start"] - pd.Timedelta("30D")).all()
+    else:
+        assert (folds["train_start"] == pd.Timestamp(START)).all()
+
+    # the data after a fold never changes its predictions
+    predictions = backtest.get_results()["prediction"]
+
+    shorter = _backtest(end="2021-03-15")
+    shorter.walk_forward(lags=3, train="30D", retrain="7D", window=window, processes=2)
+    common = shorter.get_results()["prediction"]
+
+    assert len(common) > 0
+    pd.testing.assert_series_equal(predictions.loc[common.index], common)
+
+
+def test_one_expanding_fold_is_test():
+    backtest = _backtest()
+    index = backtest.get_data().index
+    split = int(len(index) * 0.7)
+
+    # a single fold, trained on the rows test() trains on
+    backtest.walk_forward(lags=3, train=index[split] - index[0], retrain="365D", processes=2)
+    folds = backtest.get_folds()
+    walked = backtest.get_results()["prediction"]
+
+    assert len(folds) == 1
+    assert folds.loc[0, "train_end"] == index[split - 1]
+
+    backtest.fit_model(index[0], index[split - 1])
+    fitted = backtest._model.predict(backtest._lag_features().matrix(3)[split - 3:])
+    np.testing.assert_array_equal(walked.values, fitted)
+
+    backtest.test(train_ratio=0.7, lags=3)
+    tested = backtest.get_results()["prediction"]
+
+    assert tested.index.isin(walked.index).all()
+    pd.testing.assert_series_equal(walked.loc[tested.index], tested)
+
+
+def _slow_evaluate(params, lags, train, test, trading_cost):
+    # the fits of C=1e6 never finish within the search's budget
+    if params["C"] == 1e6:
+        time.sleep(60)
+
+    return _evaluate_config(params, lags, train, test, trading_cost)
+
+
+def test_search_ranks_what_test_returns():
+    backtest = _backtest()
+    ranked = backtest.search(
+        lags=(1, 3), C=(0.01, 1e6), solver=("lbfgs", "newton-cg"), train_ratio=(0.6, 0.7), processes=2, keep=0.5
+    )
+
+    assert ranked["status"].value_counts().to_dict() == {"tested": 8, "pruned": 8}
+    assert ranked["performance"].iloc[:8].is_monotonic_decreasing
+
+    best = ranked.loc[0]
+    backtest.set_params(C=best["C"], solver=best["solver"])
+    performance, out_performance = backtest.test(train_ratio=best["train_ratio"], lags=best["lags"])
+
+    assert best["status"] == "tested"
+    assert performance == pytest.approx(best["performance"], rel=1e-9)
+    assert out_performance == pytest.approx(best["out_performance"], rel=1e-9, abs=1e-12)
+    assert backtest._hitratio == pytest.approx(best["hitratio"], rel=1e-12)
+
+
+def test_search_stops_at_its_budget(monkeypatch):
+    monkeypatch.setattr(ml_classification, "_evaluate_config", _slow_evaluate)
+
+    backtest = _backtest()
+    start = time.perf_counter()
+    ranked = backtest.search(lags=(1, 2), C=(1, 1e6), solver=("lbfgs",), train_ratio=(0.7,), processes=4, budget=5, keep=1)
+
+    assert time.perf_counter() - start < 30
+
+    tested = ranked[ranked["status"] == "tested"]
+    assert sorted(tested["C"]) == [1, 1]
+    assert (ranked.loc[ranked["C"] == 1e6, "status"] == "timeout").all()
+    assert ranked.loc[ranked["status"] == "timeout", "performance"].isna().all()
+
+    for _, row in tested.iterrows():
+        backtest.set_params(C=row["C"], solver=row["solver"])
+        assert backtest.test(train_ratio=row["train_ratio"], lags=row["lags"])[0] == pytest.approx(row["performance"], rel=1e-9)
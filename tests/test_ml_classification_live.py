@@ -0,0 +1,119 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+
+pytest.importorskip("tpqoa")
+
+from helpers.ModelStore import ModelStore
+from livetrading.MLClassificationLive import MLClassificationLive, _fit
+from livetrading.ReplayBroker import ReplayBroker
+
+HISTORY = ReplayBroker.random_ticks(20000, start="2022-01-03", seed=1)
+TICKS = ReplayBroker.random_ticks(3000, start=HISTORY.index[-1] + pd.Timedelta("1s"), seed=2)
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch, tmp_path):
+    # the fitted models are stored in the working directory
+    monkeypatch.chdir(tmp_path)
+
+
+def _trader(lags=3, history=HISTORY, **kwargs):
+    replay = ReplayBroker(history=history)
+    return replay, MLClassificationLive("oanda.cfg", "EUR_USD", "1min", lags, 1000, broker=replay, **kwargs)
+
+
+@pytest.mark.parametrize("classes", [2, 3])
+def test_predict_is_the_models_predict(classes):
+    _, trader = _trader()
+
+    rng = np.random.default_rng(0)
+    features = rng.normal(0, 1e-4, size=(500, 3))
+    # with flat returns among the targets, the model has a third class and one set of coefficients per class
+    target = np.sign(features @ [0.5, -0.2, 0.1] + rng.normal(0, 1e-4, 500))
+    if classes == 3:
+        target[rng.random(500) < 0.2] = 0
+
+    trader.set_model(LogisticRegression(C=1e6, max_iter=100000, multi_class="ovr").fit(features, target))
+
+    assert len(trader._model.classes_) == classes
+    np.testing.assert_array_equal([trader.predict(row) for row in features], trader._model.predict(features))
+
+
+def _later(seconds, seed):
+    # the history of a restart, IE the same bars plus the ones completed since
+    later = ReplayBroker.random_ticks(seconds, start=HISTORY.index[-1] + pd.Timedelta("1s"), seed=seed)
+    return pd.concat([HISTORY, later])
+
+
+def test_a_restart_within_the_retrain_period_loads_the_model():
+    _, trader = _trader(retrain_every=60)
+
+    # the window slid by 2 bars, but still ends in the same hour
+    _, restarted = _trader(history=_later(120, seed=3), retrain_every=60)
+
+    assert len(ModelStore()._load_index()) == 1
+    np.testing.assert_array_equal(restarted._model.coef_, trader._model.coef_)
+
+    # the next hour's window is fitted, warm started from the previous fit
+    _, next_hour = _trader(history=_later(3600, seed=3), retrain_every=60)
+
+    assert len(ModelStore()._load_index()) == 2
+    assert not np.array_equal(next_hour._model.coef_, trader._model.coef_)
+
+
+def test_the_features_are_the_latest_returns_first():
+    replay, trader = _trader(lags=5)
+    replay.run(TICKS)
+
+    prices = trader._bars.column("mid_price")
+    returns = np.log(prices[1:] / prices[:-1])
+
+    np.testing.assert_allclose(trader._features, returns[::-1][:5], rtol=1e-12)
+    assert trader._signal == trader._model.predict(trader._features[None, :])[0]
+
+
+class RecordingExecutor:
+
+    """A process pool keeping the arguments of every task it is handed."""
+    def __init__(self):
+        self.executor = ProcessPoolExecutor(max_workers=1)
+        self.tasks = []
+
+    def submit(self, function, *args):
+        self.tasks.append(args)
+        return self.executor.submit(function, *args)
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
+
+
+def test_retraining_swaps_in_the_refitted_model():
+    replay, trader = _trader(retrain_every=10)
+    executor = trader._executor = RecordingExecutor()
+    fitted = trader._model
+
+    replay.run(TICKS)
+
+    # the retrainings fit a copy of the bars in the background process
+    assert len(executor.tasks) >= 1
+    prices, lags, spec, window = executor.tasks[-1]
+    assert lags == 3 and spec == trader.model_spec()
+    # named by the 10 minute retrain period its last bar falls in
+    assert pd.Timestamp(window) == pd.Timestamp(window).floor("10min") <= trader._bars.last_time()
+    assert not np.shares_memory(prices, trader._bars.column("mid_price"))
+
+    # the last retraining is swapped in between two bars, once it is done
+    if trader._retraining is not None:
+        trader._retraining.result()
+        trader.retrain()
+
+    expected = _fit(prices, lags, spec, window)
+
+    assert trader._model is not fitted
+    np.testing.assert_allclose(trader._model.coef_, expected.coef_, rtol=1e-9)
+    assert trader._params[0] is trader._model.coef_
+    assert trader.predict(trader._features) == trader._model.predict(trader._features[None, :])[0]
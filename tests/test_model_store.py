@@ -0,0 +1,81 @@
+import glob
+import json
+import os
+from multiprocessing import Pool
+
+import numpy as np
+from sklearn.linear_model import LinearRegression, LogisticRegression
+
+from helpers.ModelStore import ModelStore
+
+
+def _fit_many(directory, worker, fits, max_entries):
+    store = ModelStore(directory, max_entries=max_entries)
+    rng = np.random.default_rng(worker)
+
+    for _ in range(fits):
+        features = rng.normal(size=(50, 3))
+        store.fit(LinearRegression(), features, features @ [1.0, 2.0, 3.0], worker=worker)
+
+
+def _stored(directory):
+    with open(os.path.join(directory, "index.json")) as f:
+        index = json.load(f)
+
+    files = {os.path.basename(path)[:-len(".pkl")] for path in glob.glob(os.path.join(directory, "*.pkl"))}
+
+    return set(index), files
+
+
+def test_hit_loads_the_stored_model(tmp_path):
+    store = ModelStore(str(tmp_path))
+    features = np.arange(20.0).reshape(10, 2)
+    target = features.sum(axis=1)
+
+    fitted = store.fit(LinearRegression(), features, target, instrument="EUR_USD")
+    loaded = store.fit(LinearRegression(), features, target, instrument="EUR_USD")
+
+    assert loaded is not fitted
+    np.testing.assert_array_equal(loaded.coef_, fitted.coef_)
+
+
+def test_concurrent_writers_keep_the_index_and_files_in_sync(tmp_path):
+    with Pool(6) as pool:
+        pool.starmap(_fit_many, [(str(tmp_path), worker, 15, 1000) for worker in range(6)])
+
+    index, files = _stored(str(tmp_path))
+
+    assert len(index) == 90
+    assert index == files
+    assert not glob.glob(os.path.join(str(tmp_path), "*.tmp"))
+
+
+def test_concurrent_writers_respect_max_entries(tmp_path):
+    with Pool(6) as pool:
+        pool.starmap(_fit_many, [(str(tmp_path), worker, 15, 20) for worker in range(6)])
+
+    index, files = _stored(str(tmp_path))
+
+    assert len(index) == 20
+    assert index == files
+
+
+def test_warm_start_keeps_the_callers_parameters(tmp_path):
+    store = ModelStore(str(tmp_path))
+    rng = np.random.default_rng(0)
+    features = rng.normal(size=(200, 2))
+    target = np.sign(features[:, 0] + rng.normal(size=200))
+
+    store.fit(LogisticRegression(C=1e6), features, target, lags=2)
+
+    # another C, the previous model must not be warm started from
+    strong = store.fit(LogisticRegression(C=0.01), features[1:], target[1:], warm_start=True, lags=2)
+    assert strong.C == 0.01
+    np.testing.assert_allclose(
+        strong.coef_, LogisticRegression(C=0.01).fit(features[1:], target[1:]).coef_, rtol=1e-4, atol=1e-6
+    )
+
+    # the same parameters, warm started, but stored as passed
+    weak = store.fit(LogisticRegression(C=1e6), features[2:], target[2:], warm_start=True, lags=2)
+    assert weak.C == 1e6
+    assert weak.get_params()["warm_start"] is False
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+tpqoa = pytest.importorskip("tpqoa")
+
+from livetrading.LiveTrader import LiveTrader
+from livetrading.MultiInstrumentTrader import MultiInstrumentTrader
+
+
+class BarRecorder(LiveTrader):
+
+    """A strategy that never trades, and keeps the mid price of every bar it is handed."""
+    def __init__(self, instrument, engine):
+        self.bars = []
+
+        super().__init__("oanda.cfg", instrument, "1min", 1000, broker=engine)
+
+    def on_bar(self, mid_price):
+        self.bars.append(mid_price)
+
+
+@pytest.fixture
+def engine(oanda, monkeypatch, tmp_path):
+    # the markets are always open, and the OANDA session is the fake one
+    oanda.weekends = True
+    monkeypatch.setattr(LiveTrader, "check_market_hours", staticmethod(lambda: None))
+
+    def connect(self, cfg):
+        vars(self).update(account_id=oanda.account_id, ctx=oanda, ctx_stream=oanda)
+
+    monkeypatch.setattr(tpqoa.tpqoa, "__init__", connect)
+    # the candles are cached in the working directory
+    monkeypatch.chdir(tmp_path)
+
+    return MultiInstrumentTrader("oanda.cfg")
+
+
+def _ticks(start, instrument, price, offset, seed):
+    # a tick every 2 seconds for 10 minutes, offset by a second between the instruments
+    rng = np.random.default_rng(seed)
+    times = pd.date_range(start + pd.Timedelta(seconds=1 + offset), periods=300, freq="2s")
+    bid = np.round(price + np.cumsum(rng.normal(0, 1e-5, len(times))), 5)
+
+    return pd.DataFrame({"instrument": instrument, "bid": bid, "ask": np.round(bid + 0.0001, 5)}, index=times)
+
+
+def test_each_strategy_only_sees_its_instrument(engine, oanda):
+    eur = BarRecorder("EUR_USD", engine)
+    gbp = BarRecorder("GBP_USD", engine)
+    history = {"EUR_USD": len(eur.bars), "GBP_USD": len(gbp.bars)}
+
+    # the streamed ticks start after the last history bar of both
+    start = max(eur._last_tick, gbp._last_tick)
+    ticks = {
+        "EUR_USD": _ticks(start, "EUR_USD", 1.1, 0, seed=0),
+        "GBP_USD": _ticks(start, "GBP_USD", 1.3, 1, seed=1),
+    }
+
+    interleaved = pd.concat(ticks.values()).sort_index()
+    oanda.ticks = [
+        (instrument, time.strftime("%Y-%m-%dT%H:%M:%S.%fZ"), bid, ask)
+        for time, (instrument, bid, ask) in zip(interleaved.index, interleaved.itertuples(index=False))
+    ]
+    # an instrument nobody trades is not streamed
+    oanda.ticks.insert(10, ("USD_JPY", oanda.ticks[10][1], 110.0, 110.01))
+
+    engine.run()
+
+    for trader in (eur, gbp):
+        own = ticks[trader._instrument]
+        mid = ((own["bid"] + own["ask"]) / 2).resample("1min", label="right").last().ffill().iloc[:-1]
+
+        streamed = trader.bars[history[trader._instrument]:]
+
+        assert len(streamed) == len(mid) >= 9
+        np.testing.assert_allclose(streamed, mid.values, rtol=1e-12)
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LinearRegression
+
+pytest.importorskip("tpqoa")
+
+from backtesting.MultipleRegressionModelPredictor import MultipleRegressionModelPredictor
+from helpers.CandleCache import CandleCache
+
+BACKTEST = ("2020-01-01", "2020-02-15")
+FORWARDTEST = ("2020-02-16", "2020-04-01")
+
+# the prices of every hour of 2020
+PRICES = (110000 + np.cumsum(np.random.default_rng(0).integers(-20, 21, size=366 * 24))) / 1e5
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch, tmp_path):
+    def get_history(self, instrument, start, end, granularity, price, localize=True):
+        # a random walk quoted in 5 decimals, each hour has the same price whatever range it is served in
+        times = pd.date_range(start, end, freq="60min")
+        times = times[times < pd.Timestamp(end)]
+        hours = (times - pd.Timestamp("2020-01-01")) // pd.Timedelta(hours=1)
+
+        return pd.DataFrame({"c": PRICES[hours.values]}, index=times)
+
+    monkeypatch.setattr(CandleCache, "get_history", get_history)
+    # the fitted models are stored in the working directory
+    monkeypatch.chdir(tmp_path)
+
+
+def _forward_test(lags, trading_cost):
+    """Fits a LinearRegression on the backtest range and forward tests it, like prepare_data() and test() do."""
+    predictor = MultipleRegressionModelPredictor("EUR_USD", BACKTEST, FORWARDTEST, lags=1, granularity="H1")
+
+    def lagged(df):
+        df = df.copy()
+        columns = [f"lag{lag}" for lag in range(1, lags + 1)]
+        for lag, column in enumerate(columns, 1):
+            df[column] = df.returns.shift(lag)
+
+        return df.dropna(), columns
+
+    backtest, columns = lagged(predictor._backtest_df)
+    forwardtest, _ = lagged(predictor._forwardtest_df[["price", "returns"]])
+
+    model = LinearRegression(fit_intercept=True).fit(backtest[columns].values, backtest.returns.values)
+    prediction = np.sign(model.predict(forwardtest[columns].values))
+
+    trades = np.abs(np.diff(prediction)).sum()
+    performance = np.exp(prediction @ forwardtest.returns.values - trades * trading_cost)
+    hitratio = np.mean(np.sign(forwardtest.returns.values * prediction) == 1)
+
+    return hitratio, performance, performance - np.exp(forwardtest.returns.sum()), trades
+
+
+@pytest.mark.parametrize("trading_cost", [0, 1e-4])
+def test_sweep_lags_fits_every_lag_count(trading_cost):
+    predictor = MultipleRegressionModelPredictor(
+        "EUR_USD", BACKTEST, FORWARDTEST, lags=1, granularity="H1", trading_cost=trading_cost
+    )
+    swept = predictor.sweep_lags((1, 9))
+
+    assert list(swept.index) == list(range(1, 9))
+
+    for lags in range(1, 9):
+        np.testing.assert_allclose(
+            swept.loc[lags, ["hitratio", "performance", "out_performance", "trades"]].values.astype(float),
+            _forward_test(lags, trading_cost),
+            rtol=1e-10,
+        )
+
+
+def test_sweep_lags_agrees_with_test():
+    swept = MultipleRegressionModelPredictor(
+        "EUR_USD", BACKTEST, FORWARDTEST, lags=1, granularity="H1", trading_cost=1e-4
+    ).sweep_lags((2, 6))
+
+    for lags in range(2, 6):
+        predictor = MultipleRegressionModelPredictor(
+            "EUR_USD", BACKTEST, FORWARDTEST, lags=lags, granularity="H1", trading_cost=1e-4
+        )
+
+        np.testing.assert_allclose(predictor.test(), swept.loc[lags, ["performance", "out_performance"]].values, rtol=1e-10)
+        assert predictor.get_hitratio() == pytest.approx(swept.loc[lags, "hitratio"], rel=1e-12)
@@ -0,0 +1,51 @@
+import threading
+import time
+
+from livetrading.OrderWorker import OrderWorker
+
+
+def test_orders_carry_their_tick_and_queue_times():
+    worker = OrderWorker()
+    orders = []
+
+    tick = time.perf_counter_ns()
+    worker.submit(1, lambda *order: orders.append(order), tick)
+    worker.flush()
+
+    assert len(orders) == 1
+
+    position, order_tick, queued = orders[0]
+    assert position == 1 and order_tick == tick and tick <= queued <= time.perf_counter_ns()
+
+    worker.stop()
+
+
+def test_a_burst_only_trades_its_latest_position():
+    worker = OrderWorker()
+    release = threading.Event()
+    orders = []
+
+    def execute(position, tick, queued):
+        release.wait()
+        orders.append((position, tick))
+
+    # the first order blocks the thread while the next ones queue up
+    worker.submit(1, execute, 10)
+    time.sleep(0.05)
+    worker.submit(-1, execute, 20)
+    worker.submit(0, execute, 30)
+
+    release.set()
+    worker.flush()
+    worker.stop()
+
+    assert orders == [(1, 10), (0, 30)]
+
+
+def test_inline_orders_are_placed_on_submit():
+    worker = OrderWorker(inline=True)
+    orders = []
+
+    worker.submit(-1, lambda *order: orders.append(order))
+
+    assert orders[0][:2] == (-1, None)
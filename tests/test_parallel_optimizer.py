@@ -0,0 +1,45 @@
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("tpqoa")
+
+import backtesting.ParallelOptimizer as parallel_optimizer
+from backtesting.Backtester import Backtester
+from backtesting.ParallelOptimizer import ParallelOptimizer
+from backtesting.SMABacktest import SMABacktest
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    def acquire_data(self):
+        rng = np.random.default_rng(0)
+        price = (110000 + np.cumsum(rng.choice([-3, -1, 0, 0, 0, 1, 3], size=1500))) / 1e5
+
+        df = pd.DataFrame({"price": price}, index=pd.date_range("2021-01-04", periods=1500, freq="60min"))
+        df["returns"] = np.log(df.price / df.price.shift(1))
+        return df
+
+    monkeypatch.setattr(Backtester, "acquire_data", acquire_data)
+
+
+def test_spawned_workers_find_the_serial_optimum(monkeypatch):
+    # spawned workers start from a fresh interpreter, so only the shared arrays and the pickled tasks reach them
+    monkeypatch.setattr(parallel_optimizer, "Pool", multiprocessing.get_context("spawn").Pool)
+
+    backtest = SMABacktest("EUR_USD", "2021-01-04", "2021-03-01", 10, 100, granularity="H1", trading_cost=1e-4)
+    ranked = ParallelOptimizer(backtest, processes=2).optimize(smas=range(5, 25), smal=range(30, 80))
+
+    max_return, best_smas, best_smal, surface = backtest.optimize((5, 25), (30, 80))
+
+    assert ranked.loc[0, "performance"] == max_return
+
+    # ties are ranked in another order, but the serial optimum is one of the best combinations
+    best = ranked[ranked["performance"] == max_return]
+    assert ((best["smas"] == best_smas) & (best["smal"] == best_smal)).any()
+
+    # and every combination scores the same in both
+    parallel = ranked.pivot(index="smas", columns="smal", values="performance")
+    np.testing.assert_allclose(parallel.values, surface.values, rtol=1e-12)
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("tpqoa")
+
+from livetrading.ReplayBroker import ReplayBroker
+from livetrading.SMALive import SMALive
+
+
+def _replay(ticks, history):
+    replay = ReplayBroker(history=history)
+    trader = SMALive("oanda.cfg", "EUR_USD", "1min", 5, 20, 1000, broker=replay)
+
+    replay.run(ticks)
+
+    return replay.get_fills(), trader
+
+
+def test_replays_are_deterministic():
+    history = ReplayBroker.random_ticks(200000, start="2022-01-03", seed=1)
+    ticks = ReplayBroker.random_ticks(50000, start=history.index[-1] + pd.Timedelta("1s"), seed=2)
+
+    fills, trader = _replay(ticks, history)
+    again, _ = _replay(ticks, history)
+
+    assert len(fills) > 10
+    pd.testing.assert_frame_equal(fills, again)
+
+    # every position is closed at the end, so the realized profit of the fills is the trader's profit
+    assert trader._position == 0
+    assert fills["units"].sum() == 0
+    assert fills["pl"].sum() == pytest.approx(trader._profit, abs=1e-9)
+
+
+def test_random_ticks_follow_the_seed():
+    ticks = ReplayBroker.random_ticks(1000, seed=3)
+
+    pd.testing.assert_frame_equal(ticks, ReplayBroker.random_ticks(1000, seed=3))
+    assert not ticks.equals(ReplayBroker.random_ticks(1000, seed=4))
+    assert np.all(ticks["ask_price"] > ticks["bid_price"])
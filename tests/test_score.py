@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("tpqoa")
+
+from backtesting.Backtester import Backtester
+from backtesting.BollingerBandsBacktest import BollingerBandsBacktest
+from backtesting.ContrarianBacktest import ContrarianBacktest
+from backtesting.MomentumBacktest import MomentumBacktest
+from backtesting.SMABacktest import SMABacktest
+
+
+def _prices(bars=600, seed=0):
+    # quoted in 5 decimals and often unchanged between bars, where float rolling means pick up rounding noise
+    rng = np.random.default_rng(seed)
+    ticks = 110000 + np.cumsum(rng.choice([-3, -1, 0, 0, 0, 1, 3], size=bars))
+    return ticks / 1e5
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    def acquire_data(self):
+        df = pd.DataFrame({"price": _prices()}, index=pd.date_range("2021-01-04", periods=600, freq="60min"))
+        df["returns"] = np.log(df.price / df.price.shift(1))
+        return df
+
+    monkeypatch.setattr(Backtester, "acquire_data", acquire_data)
+
+
+@pytest.mark.parametrize("trading_cost", [0, 1e-4])
+@pytest.mark.parametrize("strategy", [MomentumBacktest, ContrarianBacktest])
+def test_window_strategies_agree(strategy, trading_cost):
+    backtest = strategy("EUR_USD", "2021-01-04", "2021-02-01", granularity="H1", trading_cost=trading_cost)
+    evaluated = backtest.evaluate_windows((1, 60))
+
+    for window in range(1, 60):
+        tested = backtest.test(window, mute=True)
+
+        np.testing.assert_allclose(backtest.score(window), tested, rtol=1e-12, atol=1e-12)
+        np.testing.assert_allclose(evaluated.loc[window, "performance"], tested[0], rtol=1e-12)
+
+
+@pytest.mark.parametrize("strategy", [MomentumBacktest, ContrarianBacktest])
+def test_window_optimize_matches_its_results(strategy):
+    backtest = strategy("EUR_USD", "2021-01-04", "2021-02-01", granularity="H1", trading_cost=1e-4)
+
+    max_return, best_window = backtest.optimize((1, 60))
+
+    assert max_return == pytest.approx(backtest.get_results()["cstrategy"].iloc[-1], rel=1e-12)
+    assert max_return == pytest.approx(max(backtest.test(window, mute=True)[0] for window in range(1, 60)), rel=1e-12)
+
+
+@pytest.mark.parametrize("trading_cost", [0, 1e-4])
+def test_sma_agrees(trading_cost):
+    backtest = SMABacktest("EUR_USD", "2021-01-04", "2021-02-01", 5, 30, granularity="H1", trading_cost=trading_cost)
+    evaluated = backtest.evaluate_grid((5, 15), (30, 40))
+
+    for smas in range(5, 15):
+        for smal in range(30, 40):
+            backtest.set_params(smas, smal)
+            tested = backtest.test(mute=True)
+
+            np.testing.assert_allclose(backtest.score(), tested, rtol=1e-12, atol=1e-12)
+            np.testing.assert_allclose(evaluated.loc[smas, smal], tested[0], rtol=1e-12)
+
+
+def test_sma_optimize_returns_its_surface():
+    backtest = SMABacktest("EUR_USD", "2021-01-04", "2021-02-01", 5, 30, granularity="H1", trading_cost=1e-4)
+
+    max_return, best_smas, best_smal, surface = backtest.optimize((5, 15), (30, 40))
+
+    pd.testing.assert_frame_equal(surface, backtest.evaluate_grid((5, 15), (30, 40)))
+    assert backtest.get_surface() is surface
+    assert max_return == surface.values.max() == surface.loc[best_smas, best_smal]
+    assert max_return == pytest.approx(backtest.test(mute=True)[0], rel=1e-12)
+
+
+@pytest.mark.parametrize("trading_cost", [0, 1e-4])
+def test_bollinger_bands_agree(trading_cost):
+    backtest = BollingerBandsBacktest("EUR_USD", "2021-01-04", "2021-02-01", granularity="H1", trading_cost=trading_cost)
+    evaluated = backtest.evaluate_grid((2, 40), (1, 3), 0.5)
+
+    for sma in range(2, 40):
+        for deviation in evaluated.columns:
+            backtest.set_params(sma, deviation)
+            tested = backtest.test(mute=True)
+
+            np.testing.assert_allclose(backtest.score(), tested, rtol=1e-12, atol=1e-12)
+            np.testing.assert_allclose(evaluated.loc[sma, deviation], tested[0], rtol=1e-12)
+
+
+def test_bollinger_bands_optimize_keeps_the_grid_dtype():
+    backtest = BollingerBandsBacktest("EUR_USD", "2021-01-04", "2021-02-01", granularity="H1", trading_cost=1e-4)
+
+    _, best_sma, best_dev = backtest.optimize((2, 40), (1, 3))
+    assert type(best_sma) is int and type(best_dev) is int
+
+    _, _, best_dev = backtest.optimize((2, 40), (1, 3), 0.5)
+    assert type(best_dev) is float
+
+    grid = backtest._evaluate_grid(
+        backtest.get_data()["price"].values, backtest.get_data()["returns"].values, 0, sma=[5], deviation=[1, 2]
+    )
+    assert grid["deviation"].dtype.kind == "i" and grid["trades"].dtype.kind == "i"